@@ -0,0 +1,79 @@
+"""
+Compares write time and file size of compressed HDF5 field exports.
+
+A 3D salinity field is exported with different compression settings. For
+each setting reports the time spent in the export call, i.e. the time added
+to the time loop, the time until the compressed files are complete, and the
+file size relative to the uncompressed export.
+
+Usage:
+
+    python bench_hdf5_compression.py [--nx 40] [--n-layers 20] [--exports 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from thetis import *
+from thetis.exporter import HDF5Exporter
+
+
+SETTINGS = [
+    ('none', {}),
+    ('gzip-1', {'compression': 'gzip', 'compression_opts': 1}),
+    ('gzip-4', {'compression': 'gzip', 'compression_opts': 4}),
+    ('gzip-9', {'compression': 'gzip', 'compression_opts': 9}),
+    ('gzip-4-noshuffle', {'compression': 'gzip', 'compression_opts': 4, 'shuffle': False}),
+    ('lzf', {'compression': 'lzf'}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--nx', type=int, default=40,
+                        help='number of horizontal elements per direction')
+    parser.add_argument('--n-layers', type=int, default=20,
+                        help='number of vertical layers')
+    parser.add_argument('--exports', type=int, default=5,
+                        help='number of exports per setting')
+    args = parser.parse_args()
+
+    mesh2d = RectangleMesh(args.nx, args.nx, 10e3, 10e3)
+    p1_2d = get_functionspace(mesh2d, 'CG', 1)
+    bathymetry_2d = Function(p1_2d).assign(20.0)
+    mesh = extrude_mesh_sigma(mesh2d, args.n_layers, bathymetry_2d)
+    fs = get_functionspace(mesh, 'DG', 1)
+    x, y, z = SpatialCoordinate(mesh)
+    salt = Function(fs, name='Salinity')
+    salt.interpolate(30.0 + 2.0*sin(x/2e3)*cos(y/3e3) + 0.05*z)
+
+    print_output('{:18s} {:>10s} {:>10s} {:>10s} {:>7s}'.format(
+        'setting', 'export s', 'total s', 'size MB', 'ratio'))
+    ref_size = None
+    # all ranks write to the directory created on the first rank
+    tmpdir = tempfile.TemporaryDirectory() if COMM_WORLD.rank == 0 else None
+    outputdir = COMM_WORLD.bcast(tmpdir.name if tmpdir is not None else None, root=0)
+    for name, kwargs in SETTINGS:
+        e = HDF5Exporter(fs, outputdir, name, **kwargs)
+        t0 = time.perf_counter()
+        t_export = 0.
+        for i in range(args.exports):
+            t1 = time.perf_counter()
+            e.export(salt)
+            t_export += time.perf_counter() - t1
+        e.wait()
+        t_total = time.perf_counter() - t0
+        size = sum(os.path.getsize(e.gen_filename(i)) for i in range(args.exports))
+        if ref_size is None:
+            ref_size = size
+        print_output('{:18s} {:10.3f} {:10.3f} {:10.2f} {:7.2f}'.format(
+            name, t_export/args.exports, t_total/args.exports,
+            size/args.exports/1e6, size/ref_size))
+    COMM_WORLD.barrier()
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
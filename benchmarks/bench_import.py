@@ -0,0 +1,68 @@
+"""
+Measures the start-up time of importing Thetis.
+
+Each import statement is timed in a fresh interpreter. Reports the median
+wall-clock time over the repetitions and, with ``--modules``, the slowest
+modules from Python's ``-X importtime`` output.
+
+Usage:
+
+    python bench_import.py [--repeat 5] [--modules 15]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+import numpy
+
+
+STATEMENTS = [
+    'import firedrake',
+    'import thetis',
+    'import thetis.callback',
+    'from thetis import *',
+]
+
+
+def time_import(statement):
+    """Returns the wall-clock time of running a statement in a new interpreter"""
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-c', statement], check=True)
+    return time.perf_counter() - t0
+
+
+def slowest_modules(statement, n):
+    """Returns the n modules with the largest cumulative import time"""
+    p = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                       check=True, capture_output=True, text=True)
+    entries = []
+    for line in p.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        entries.append((int(cumulative)*1e-6, module.rstrip()))
+    return sorted(entries, reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of repetitions of each import')
+    parser.add_argument('--modules', type=int, default=0,
+                        help='number of slowest modules to list')
+    args = parser.parse_args()
+
+    print('{:24s} {:>9s} {:>9s}'.format('statement', 'median s', 'min s'))
+    for statement in STATEMENTS:
+        times = [time_import(statement) for i in range(args.repeat)]
+        print('{:24s} {:9.3f} {:9.3f}'.format(statement, numpy.median(times), min(times)))
+    if args.modules > 0:
+        for statement in STATEMENTS[1:]:
+            print('\nslowest modules for "{:}" (cumulative s):'.format(statement))
+            for t, module in slowest_modules(statement, args.modules):
+                print('{:9.3f} {:}'.format(t, module))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""
+Times the interpolation and forcing routines used in realistic simulations.
+
+All input files are synthetic and generated locally: a series of
+atmospheric forcing netCDF files on a regular lon-lat grid, and a regional
+tidal atlas in the TPXO9 netCDF format. The mesh covers part of the North Sea
+in UTM zone 31 coordinates. For each component the construction time and the
+cost per call are reported, as the median over the repetitions:
+
+- GridInterpolator: Delaunay-based interpolation from a regular grid to
+  scattered points, with constant and nearest neighbour fill
+- NetCDFTimeSearch: indexing of the forcing files and time stamp search
+- LinearTimeInterpolator: reading and interpolating the atmospheric fields
+  onto the mesh in a sequence of model time steps, i.e. mostly from cache
+- TPXOTidalBoundaryForcing: tidal elevation and velocity on the open
+  boundary, set_tidal_field is called once per time step
+- compute_wind_stress: all wind stress formulations
+- VectorCoordSysRotation: rotation of vectors from lon-lat to UTM
+
+The benchmark runs in serial.
+
+Usage:
+
+    python bench_interpolation.py [--grid-size 400] [--targets 100000]
+        [--nx 100] [--files 10] [--repeat 5] [--output results.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import tempfile
+import time
+
+import netCDF4
+import numpy
+
+from thetis import *
+from thetis.interpolation import (GridInterpolator, NetCDFTimeSearch, NetCDFTimeParser,
+                                  NetCDFLatLonInterpolator2d, NetCDFSpatialInterpolator,
+                                  LinearTimeInterpolator)
+from thetis.coordsys import UTMCoordinateSystem, VectorCoordSysRotation
+from thetis.forcing import compute_wind_stress, TPXOTidalBoundaryForcing
+from thetis.timezone import datetime_to_epoch
+import pyproj
+import pytz
+
+# tidal constituents in the synthetic atlas, with amplitude in m
+CONSTITUENTS = [('M2', 1.2), ('S2', 0.4), ('N2', 0.25), ('K2', 0.1),
+                ('K1', 0.1), ('O1', 0.08), ('P1', 0.03), ('Q1', 0.02)]
+# domain of the mesh in UTM zone 31 coordinates, roughly 1E-5E, 53N-56N
+UTM_ZONE = 31
+X_RANGE = (350e3, 600e3)
+Y_RANGE = (5.87e6, 6.2e6)
+# extent of the forcing grids in degrees
+LON_RANGE = (0.0, 9.0)
+LAT_RANGE = (50.0, 59.0)
+INIT_DATE = datetime.datetime(2022, 1, 1, tzinfo=pytz.utc)
+
+
+def time_call(func, repeat, number=1):
+    """
+    Returns the median wall-clock time of a call
+
+    :arg func: function without arguments
+    :arg int repeat: number of timed repetitions
+    :kwarg int number: number of calls per repetition
+    """
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        for j in range(number):
+            func()
+        times.append((time.perf_counter() - t0)/number)
+    return float(numpy.median(times))
+
+
+def write_atm_files(outputdir, nfiles, nsteps, grid_size):
+    """
+    Writes synthetic atmospheric forcing files
+
+    Each file contains ``nsteps`` hourly time steps of 10 m wind and sea level
+    pressure on a ``grid_size`` x ``grid_size`` lon-lat grid.
+
+    :returns: file name pattern of the files
+    """
+    lon = numpy.linspace(*LON_RANGE, grid_size)
+    lat = numpy.linspace(*LAT_RANGE, grid_size)
+    lon2d, lat2d = numpy.meshgrid(lon, lat)
+    pattern = os.path.join(outputdir, 'atm_{:03d}.nc')
+    for i in range(nfiles):
+        with netCDF4.Dataset(pattern.format(i), 'w') as d:
+            d.createDimension('time', None)
+            d.createDimension('lat', grid_size)
+            d.createDimension('lon', grid_size)
+            time_var = d.createVariable('time', 'f8', ('time', ))
+            time_var.standard_name = 'time'
+            time_var.units = 'seconds since 1970-01-01 00:00:00'
+            time_var.calendar = 'gregorian'
+            lat_var = d.createVariable('lat', 'f8', ('lat', ))
+            lat_var.standard_name = 'latitude'
+            lat_var[:] = lat
+            lon_var = d.createVariable('lon', 'f8', ('lon', ))
+            lon_var.standard_name = 'longitude'
+            lon_var[:] = lon
+            t = datetime_to_epoch(INIT_DATE) + 3600.*(numpy.arange(nsteps) + i*nsteps)
+            time_var[:] = t
+            phase = 2*numpy.pi*t[:, numpy.newaxis, numpy.newaxis]/86400.
+            for name, values in [
+                    ('uwind', 10*numpy.cos(phase + lon2d/3.)),
+                    ('vwind', 8*numpy.sin(phase + lat2d/2.)),
+                    ('prmsl', 101300. + 1500*numpy.sin(phase + (lon2d + lat2d)/4.))]:
+                var = d.createVariable(name, 'f4', ('time', 'lat', 'lon'))
+                var[:] = values
+    return os.path.join(outputdir, 'atm_*.nc')
+
+
+def write_tpxo_atlas(outputdir, resolution):
+    """
+    Writes a synthetic regional tidal atlas in the TPXO9 netCDF format
+
+    The atlas consists of a grid file, an elevation file and a transport
+    file, with all :data:`CONSTITUENTS`.
+
+    :arg float resolution: grid spacing in degrees
+    :returns: (grid file, elevation file, transport file) names
+    """
+    lon = numpy.arange(LON_RANGE[0], LON_RANGE[1], resolution)
+    lat = numpy.arange(LAT_RANGE[0], LAT_RANGE[1], resolution)
+    nx, ny = len(lon), len(lat)
+    lon2d, lat2d = numpy.meshgrid(lon, lat, indexing='ij')
+    names = ['grid_synthetic.nc', 'h_synthetic.nc', 'u_synthetic.nc']
+    grid_file, elev_file, uv_file = [os.path.join(outputdir, n) for n in names]
+
+    with netCDF4.Dataset(grid_file, 'w') as d:
+        d.createDimension('nx', nx)
+        d.createDimension('ny', ny)
+        for grid in ['z', 'u', 'v']:
+            d.createVariable('lon_' + grid, 'f8', ('nx', ))[:] = lon
+            d.createVariable('lat_' + grid, 'f8', ('ny', ))[:] = lat
+            d.createVariable('m' + grid, 'i4', ('nx', 'ny'))[:] = 1
+
+    def write_constituent_file(filename, fields):
+        with netCDF4.Dataset(filename, 'w') as d:
+            d.createDimension('nc', len(CONSTITUENTS))
+            d.createDimension('nx', nx)
+            d.createDimension('ny', ny)
+            d.createDimension('nct', 4)
+            con = d.createVariable('con', 'S1', ('nc', 'nct'))
+            con[:] = numpy.array([list('{:4s}'.format(c.lower())) for c, a in CONSTITUENTS],
+                                 dtype='S1')
+            for name, values in fields.items():
+                d.createVariable(name, 'f4', ('nc', 'nx', 'ny'))[:] = values
+
+    amplitude = numpy.array([a for c, a in CONSTITUENTS])[:, numpy.newaxis, numpy.newaxis]
+    # amphidromic-like phase pattern
+    phase = numpy.degrees(numpy.arctan2(lat2d - 55.0, lon2d - 3.0))[numpy.newaxis]
+    phase = phase + 10.*numpy.arange(len(CONSTITUENTS))[:, numpy.newaxis, numpy.newaxis]
+    ramp = 0.5 + 0.5*numpy.hypot(lat2d - 55.0, lon2d - 3.0)/8.
+    write_constituent_file(elev_file, {
+        'hRe': amplitude*ramp*numpy.cos(numpy.radians(phase)),
+        'hIm': -amplitude*ramp*numpy.sin(numpy.radians(phase)),
+    })
+    # transports in m2/s, velocity ~ transport/50 m
+    write_constituent_file(uv_file, {
+        'ua': 30*amplitude*ramp, 'up': phase + 90.,
+        'va': 20*amplitude*ramp, 'vp': phase,
+    })
+    return grid_file, elev_file, uv_file
+
+
+def bench_grid_interpolator(args):
+    """Times GridInterpolator from a regular grid to scattered points"""
+    rng = numpy.random.default_rng(1)
+    x = numpy.linspace(0., 1., args.grid_size)
+    X, Y = numpy.meshgrid(x, x)
+    grid_xy = numpy.vstack((X.ravel(), Y.ravel())).T
+    values = numpy.sin(4*grid_xy[:, 0])*numpy.cos(3*grid_xy[:, 1])
+    results = []
+    for fill_mode, margin in [(None, 0.0), ('nearest', 0.05)]:
+        target_xy = rng.uniform(-margin, 1.0 + margin, (args.targets, 2))
+
+        def construct():
+            return GridInterpolator(grid_xy, target_xy, fill_mode=fill_mode)
+
+        interp = construct()
+        results.append({
+            'component': 'GridInterpolator',
+            'case': 'fill_mode={:}'.format(fill_mode),
+            'size': '{:} -> {:} points'.format(len(grid_xy), args.targets),
+            'construct_s': time_call(construct, args.repeat),
+            'call_s': time_call(lambda: interp(values), args.repeat, number=10),
+        })
+    return results
+
+
+def bench_time_search(args, file_pattern):
+    """Times NetCDFTimeSearch on the atmospheric forcing files"""
+    def construct():
+        return NetCDFTimeSearch(file_pattern, INIT_DATE, NetCDFTimeParser)
+
+    timesearch = construct()
+    t_end = 3600.*(args.files*args.steps_per_file - 1)
+    times = numpy.random.default_rng(2).uniform(0., t_end, 100)
+
+    def find():
+        for t in times:
+            timesearch.find(t, previous=True)
+            timesearch.find(t, previous=False)
+
+    return [{
+        'component': 'NetCDFTimeSearch',
+        'case': 'find previous and next',
+        'size': '{:} files x {:} steps'.format(args.files, args.steps_per_file),
+        'construct_s': time_call(construct, args.repeat),
+        'call_s': time_call(find, args.repeat)/len(times),
+    }]
+
+
+def bench_time_interpolator(args, file_pattern, fs, coord_system):
+    """Times LinearTimeInterpolator of the atmospheric fields onto the mesh"""
+    variables = ['uwind', 'vwind', 'prmsl']
+    timesearch = NetCDFTimeSearch(file_pattern, INIT_DATE, NetCDFTimeParser)
+
+    def construct():
+        spatial = NetCDFLatLonInterpolator2d(fs, coord_system)
+        reader = NetCDFSpatialInterpolator(spatial, variables)
+        interp = LinearTimeInterpolator(timesearch, reader)
+        # the spatial interpolator is built on the first call
+        interp(0.)
+        return interp
+
+    interp = construct()
+    # model time steps over the first file
+    nsteps = int(3600.*(args.steps_per_file - 1)/args.timestep)
+    times = args.timestep*numpy.arange(nsteps)
+
+    def run():
+        interp.cache.clear()
+        for t in times:
+            interp(t)
+
+    return [{
+        'component': 'LinearTimeInterpolator',
+        'case': 'atmospheric fields, dt={:} s'.format(args.timestep),
+        'size': '{:} grid -> {:} nodes'.format(args.grid_size**2, fs.dim()),
+        'construct_s': time_call(construct, args.repeat),
+        'call_s': time_call(run, args.repeat)/nsteps,
+    }]
+
+
+def bench_tidal_forcing(args, atlas, mesh2d, coord_system):
+    """Times TPXOTidalBoundaryForcing on the open boundaries"""
+    grid_file, elev_file, uv_file = atlas
+    data_dir = os.path.dirname(grid_file)
+    elev = Function(get_functionspace(mesh2d, 'CG', 1))
+    uv = Function(get_functionspace(mesh2d, 'CG', 1, vector=True))
+    results = []
+    for label, boundary_ids in [('open boundary', [1, 2, 4]), ('whole domain', None)]:
+        def construct():
+            return TPXOTidalBoundaryForcing(
+                elev, INIT_DATE, coord_system, uv_field=uv,
+                constituents=[c for c, a in CONSTITUENTS],
+                boundary_ids=boundary_ids, data_dir=data_dir,
+                elev_file=os.path.basename(elev_file),
+                uv_file=os.path.basename(uv_file),
+                grid_file=os.path.basename(grid_file))
+
+        tbnd = construct()
+        counter = iter(range(10**9))
+        results.append({
+            'component': 'TPXOTidalBoundaryForcing',
+            'case': 'set_tidal_field, ' + label,
+            'size': '{:} nodes, {:} constituents'.format(len(tbnd.nodes), len(CONSTITUENTS)),
+            'construct_s': time_call(construct, args.repeat),
+            'call_s': time_call(lambda: tbnd.set_tidal_field(args.timestep*next(counter)),
+                                args.repeat, number=5),
+        })
+    return results
+
+
+def bench_wind_stress(args):
+    """Times compute_wind_stress for all formulations"""
+    rng = numpy.random.default_rng(3)
+    wind_u = rng.normal(0., 10., args.targets)
+    wind_v = rng.normal(0., 10., args.targets)
+    return [{
+        'component': 'compute_wind_stress',
+        'case': method,
+        'size': '{:} points'.format(args.targets),
+        'construct_s': None,
+        'call_s': time_call(lambda: compute_wind_stress(wind_u, wind_v, method=method),
+                            args.repeat, number=10),
+    } for method in ['LargeYeager2009', 'LargePond1981', 'SmithBanke1975']]
+
+
+def bench_vector_rotation(args, coord_system):
+    """Times VectorCoordSysRotation from lon-lat to UTM coordinates"""
+    rng = numpy.random.default_rng(4)
+    lon = rng.uniform(1., 5., args.targets)
+    lat = rng.uniform(53., 56., args.targets)
+    v_x = rng.normal(size=args.targets)
+    v_y = rng.normal(size=args.targets)
+    trans = coord_system.transformer_xy
+
+    def construct():
+        return VectorCoordSysRotation(trans, lon, lat)
+
+    rotator = construct()
+    return [{
+        'component': 'VectorCoordSysRotation',
+        'case': 'lon-lat to UTM',
+        'size': '{:} points'.format(args.targets),
+        'construct_s': time_call(construct, args.repeat),
+        'call_s': time_call(lambda: rotator(v_x, v_y), args.repeat, number=10),
+    }]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--grid-size', type=int, default=400,
+                        help='number of points per direction of the forcing grids')
+    parser.add_argument('--targets', type=int, default=100000,
+                        help='number of target points of the array benchmarks')
+    parser.add_argument('--nx', type=int, default=100,
+                        help='number of mesh elements per direction')
+    parser.add_argument('--files', type=int, default=10,
+                        help='number of atmospheric forcing files')
+    parser.add_argument('--steps-per-file', type=int, default=24,
+                        help='number of hourly time steps per forcing file')
+    parser.add_argument('--atlas-resolution', type=float, default=1./30,
+                        help='grid spacing of the tidal atlas in degrees')
+    parser.add_argument('--timestep', type=float, default=300.,
+                        help='model time step in seconds')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of repetitions of each measurement')
+    parser.add_argument('--data-dir',
+                        help='directory for the synthetic files, a temporary directory by default')
+    parser.add_argument('--output', help='write the results to a JSON file')
+    args = parser.parse_args()
+
+    coord_system = UTMCoordinateSystem(utm_zone=UTM_ZONE)
+    mesh2d = RectangleMesh(args.nx, args.nx, X_RANGE[1] - X_RANGE[0], Y_RANGE[1] - Y_RANGE[0],
+                           comm=COMM_SELF)
+    mesh2d.coordinates.dat.data[:, 0] += X_RANGE[0]
+    mesh2d.coordinates.dat.data[:, 1] += Y_RANGE[0]
+    fs = get_functionspace(mesh2d, 'CG', 1)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_dir = args.data_dir or tmpdir
+        create_directory(data_dir, comm=COMM_SELF)
+        t0 = time.perf_counter()
+        file_pattern = write_atm_files(data_dir, args.files, args.steps_per_file, args.grid_size)
+        atlas = write_tpxo_atlas(data_dir, args.atlas_resolution)
+        print_output('Generated synthetic input files in {:.1f} s'.format(time.perf_counter() - t0))
+
+        results = []
+        results += bench_grid_interpolator(args)
+        results += bench_time_search(args, file_pattern)
+        results += bench_time_interpolator(args, file_pattern, fs, coord_system)
+        results += bench_tidal_forcing(args, atlas, mesh2d, coord_system)
+        results += bench_wind_stress(args)
+        results += bench_vector_rotation(args, coord_system)
+
+    print_output('{:26s} {:34s} {:>12s} {:>12s}  {:}'.format(
+        'component', 'case', 'construct s', 'call s', 'size'))
+    for r in results:
+        construct = '-' if r['construct_s'] is None else '{:.4e}'.format(r['construct_s'])
+        print_output('{:26s} {:34s} {:>12s} {:12.4e}  {:}'.format(
+            r['component'], r['case'], construct, r['call_s'], r['size']))
+    if args.output:
+        metadata = {'date': datetime.datetime.now().isoformat(),
+                    'pyproj_version': pyproj.__version__,
+                    'netcdf4_version': netCDF4.__version__,
+                    'options': vars(args)}
+        with open(args.output, 'w') as f:
+            json.dump({'metadata': metadata, 'results': results}, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+"""
+Measures the performance of the 2D and 3D solvers on a set of benchmark cases.
+
+Every combination of case, mesh refinement and number of MPI ranks is run in
+a separate ``mpiexec`` process, see solver_cases.py for the cases. The time
+loop is monitored with the performance telemetry of the solver, one record
+per time step. The first ``--warmup`` steps, which include the compilation of
+the kernels, are excluded from the statistics. For each run the following
+metrics are reported:
+
+- wall time of the setup, i.e. construction of the solver, equations and
+  initial conditions
+- wall time per time step and of its phases: advance, callbacks and export
+- wall time per time step of the named log stages, e.g. 'mode2d' or
+  'momentum_eq' of the 3D solver
+- time and count per time step of PETSc log events, in the time loop and in
+  the setup stage
+- nonlinear solves, Jacobian evaluations, linear solves and preconditioner
+  applications per time step
+- peak resident memory, maximum over ranks and total
+- bytes written per time step
+
+The results are written as JSON, together with the git commit and the
+versions of the software, so that runs on different commits can be compared
+with ``--compare``. Detailed PETSc logs of every run can be obtained by
+adding ``--petsc-options=-log_view``.
+
+Usage:
+
+    python bench_solvers.py [--cases channel2d north_sea] [--refinements 1 2 4]
+        [--nranks 1 2 4] [--steps 20] [--warmup 2] [--export-interval 10]
+        [--output results.json]
+    python bench_solvers.py --compare base.json results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CASE_NAMES = ['channel2d', 'north_sea', 'lock_exchange', 'sediment_trench_2d', 'tidalfarm']
+
+# PETSc log events reported in the time loop and in the setup stage
+EVENTS = [
+    'SNESSolve',
+    'SNESFunctionEval',
+    'SNESJacobianEval',
+    'KSPSolve',
+    'PCSetUp',
+    'PCApply',
+    'MatMult',
+    'ParLoopExecute',
+]
+
+# telemetry counts reported as solver statistics, name: event
+SOLVER_COUNTS = [
+    ('nonlinear_solves', 'SNESSolve'),
+    ('jacobian_evaluations', 'SNESJacobianEval'),
+    ('linear_solves', 'KSPSolve'),
+    ('pc_applications', 'PCApply'),
+]
+
+
+def get_git_commit():
+    """Returns the hash of the checked out commit, and whether the tree is modified"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCHMARK_DIR, check=True,
+                                capture_output=True, text=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                cwd=BENCHMARK_DIR, check=True,
+                                capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, len(status) > 0
+
+
+def summarize_telemetry(filename, warmup):
+    """
+    Computes per time step statistics from a telemetry file
+
+    Times and counts are the maximum over ranks of each time step, i.e. the
+    critical path of the parallel run.
+
+    :arg str filename: JSON lines telemetry file written with interval 1
+    :arg int warmup: number of leading time steps to exclude
+    :returns: dict of statistics
+    """
+    with open(filename) as f:
+        records = [json.loads(line) for line in f][warmup:]
+    if len(records) == 0:
+        raise ValueError('No time steps left after the warm-up')
+
+    def series(name):
+        return numpy.array([r[name]['max'] for r in records])
+
+    step = series('wall_step')
+    result = {
+        'steps': len(records),
+        'time_per_step': {
+            'mean': step.mean(),
+            'median': float(numpy.median(step)),
+            'min': step.min(),
+            'max': step.max(),
+        },
+        'phases': {p: series('wall_' + p).mean()
+                   for p in ['advance', 'callbacks', 'export']},
+        'stages': {name[len('wall_stage_'):]: series(name).mean()
+                   for name in records[0] if name.startswith('wall_stage_')},
+        'events': {e: {'time': series(e + '_time').mean(),
+                       'count': series(e + '_count').mean()}
+                   for e in EVENTS},
+        'solver': {name: series(e + '_count').mean() for name, e in SOLVER_COUNTS},
+        'io_write_bytes_per_step': float(numpy.nansum(
+            [r['io_write_bytes']['mean']*r['nranks'] for r in records]))/len(records),
+    }
+    result['overhead_fraction'] = ((result['phases']['callbacks'] + result['phases']['export'])
+                                   / result['time_per_step']['mean'])
+    return result
+
+
+def run_worker(args):
+    """Runs a single benchmark in the current MPI job and writes the result"""
+    from thetis import COMM_WORLD, MPI, PETSc
+    from solver_cases import CASES
+
+    comm = COMM_WORLD
+    outputdir = os.path.join(args.workdir, 'outputs')
+    settings = {
+        'steps': args.steps,
+        'export_interval': args.export_interval,
+        'output_directory': outputdir,
+        'telemetry_file': 'telemetry.jsonl',
+        'telemetry_interval': 1,
+        'telemetry_events': EVENTS,
+    }
+    PETSc.Log.begin()
+    setup_stage = PETSc.Log.Stage('Benchmark setup')
+    setup_stage.push()
+    t0 = time.perf_counter()
+    solver_obj, update_forcings = CASES[args.case](args.refinement, settings)
+    comm.barrier()
+    setup_time = time.perf_counter() - t0
+    setup_stage.pop()
+
+    loop_stage = PETSc.Log.Stage('Benchmark time loop')
+    loop_stage.push()
+    t0 = time.perf_counter()
+    solver_obj.iterate(update_forcings=update_forcings)
+    comm.barrier()
+    loop_time = time.perf_counter() - t0
+    loop_stage.pop()
+
+    setup_events = {}
+    for e in EVENTS:
+        info = PETSc.Log.Event(e).getPerfInfo(setup_stage.id)
+        setup_events[e] = {'time': comm.allreduce(info['time'], op=MPI.MAX),
+                           'count': comm.allreduce(info['count'], op=MPI.MAX)}
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.
+    peak_rss_max = comm.allreduce(peak_rss, op=MPI.MAX)
+    peak_rss_total = comm.allreduce(peak_rss)
+
+    if comm.rank == 0:
+        fields = solver_obj.fields
+        dofs = {'solution_2d': fields.solution_2d.function_space().dim()}
+        for name in ['uv_3d', 'temp_3d', 'salt_3d', 'sediment_2d']:
+            if name in fields:
+                dofs[name] = fields[name].function_space().dim()
+        result = {
+            'case': args.case,
+            'refinement': args.refinement,
+            'nranks': comm.size,
+            'timestep': solver_obj.options.timestep,
+            'dofs': dofs,
+            'setup_time': setup_time,
+            'loop_time': loop_time,
+            'setup_events': setup_events,
+            'memory_mb': {'peak_rss_max': peak_rss_max, 'peak_rss_total': peak_rss_total},
+        }
+        result.update(summarize_telemetry(
+            os.path.join(outputdir, 'telemetry.jsonl'), args.warmup))
+        with open(args.result_file, 'w') as f:
+            json.dump(result, f, indent=1, default=float)
+
+
+def run_case(case, refinement, nranks, args):
+    """
+    Runs a benchmark in a new MPI job
+
+    :returns: dict of results, or of the error if the run failed
+    """
+    with tempfile.TemporaryDirectory(prefix='thetis_bench_') as workdir:
+        result_file = os.path.join(workdir, 'result.json')
+        cmd = shlex.split(args.mpiexec) + ['-n', str(nranks), sys.executable, os.path.abspath(__file__),
+                                           '--worker', '--case', case,
+                                           '--refinement', str(refinement),
+                                           '--steps', str(args.steps),
+                                           '--warmup', str(args.warmup),
+                                           '--export-interval', str(args.export_interval),
+                                           '--workdir', workdir,
+                                           '--result-file', result_file]
+        cmd += shlex.split(args.petsc_options)
+        p = subprocess.run(cmd, cwd=BENCHMARK_DIR, capture_output=not args.verbose, text=True)
+        if p.returncode != 0 or not os.path.exists(result_file):
+            log = '' if args.verbose else p.stderr[-2000:]
+            return {'case': case, 'refinement': refinement, 'nranks': nranks,
+                    'status': 'failed', 'returncode': p.returncode, 'log': log}
+        with open(result_file) as f:
+            result = json.load(f)
+    result['status'] = 'ok'
+    return result
+
+
+def compare(base_file, new_file):
+    """Prints the change in time per step between two result files"""
+    def load(filename):
+        with open(filename) as f:
+            data = json.load(f)
+        runs = {(r['case'], r['refinement'], r['nranks']): r
+                for r in data['runs'] if r['status'] == 'ok'}
+        return data['metadata'], runs
+
+    base_meta, base = load(base_file)
+    new_meta, new = load(new_file)
+    print('base: {:} {:}'.format(base_meta['git_commit'], base_meta['date']))
+    print('new:  {:} {:}'.format(new_meta['git_commit'], new_meta['date']))
+    print('{:20s} {:>3s} {:>6s} {:>12s} {:>12s} {:>7s} {:>7s}'.format(
+        'case', 'ref', 'ranks', 'base s/step', 'new s/step', 'ratio', 'mem'))
+    for key in sorted(set(base) & set(new)):
+        b = base[key]
+        n = new[key]
+        print('{:20s} {:3d} {:6d} {:12.4e} {:12.4e} {:7.3f} {:7.3f}'.format(
+            *key, b['time_per_step']['median'], n['time_per_step']['median'],
+            n['time_per_step']['median']/b['time_per_step']['median'],
+            n['memory_mb']['peak_rss_max']/b['memory_mb']['peak_rss_max']))
+    for key in sorted(set(base) ^ set(new)):
+        print('{:20s} {:3d} {:6d} only in {:}'.format(
+            *key, 'base' if key in base else 'new'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cases', nargs='+', choices=CASE_NAMES, default=CASE_NAMES,
+                        help='benchmark cases to run')
+    parser.add_argument('--refinements', nargs='+', type=int, default=[1, 2],
+                        help='mesh refinement factors, powers of two')
+    parser.add_argument('--nranks', nargs='+', type=int, default=[1],
+                        help='numbers of MPI ranks')
+    parser.add_argument('--steps', type=int, default=20,
+                        help='number of time steps, including the warm-up')
+    parser.add_argument('--warmup', type=int, default=2,
+                        help='number of time steps excluded from the statistics')
+    parser.add_argument('--export-interval', type=int, default=10,
+                        help='number of time steps between exports, 0 disables exports')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='output file')
+    parser.add_argument('--mpiexec', default='mpiexec',
+                        help='MPI launcher command')
+    parser.add_argument('--petsc-options', default='',
+                        help='extra command line options passed to the runs')
+    parser.add_argument('--verbose', action='store_true',
+                        help='show the output of the runs')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'),
+                        help='compare two result files and exit')
+    # options of a single run, used internally
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--refinement', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    # unknown arguments are PETSc options of the worker
+    args, _ = parser.parse_known_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.warmup >= args.steps:
+        parser.error('--steps must be larger than --warmup')
+
+    import thetis
+    import firedrake
+    commit, modified = get_git_commit()
+    metadata = {
+        'git_commit': commit,
+        'git_modified': modified,
+        'thetis_version': thetis.__version__,
+        'firedrake_version': getattr(firedrake, '__version__', None),
+        'python_version': platform.python_version(),
+        'hostname': platform.node(),
+        'date': datetime.datetime.now().isoformat(),
+        'steps': args.steps,
+        'warmup': args.warmup,
+        'export_interval': args.export_interval,
+        'petsc_options': args.petsc_options,
+    }
+    runs = []
+    print('{:20s} {:>3s} {:>6s} {:>9s} {:>12s} {:>9s} {:>9s} {:>9s}'.format(
+        'case', 'ref', 'ranks', 'setup s', 's/step', 'overhead', 'KSP/step', 'mem MB'))
+    for case in args.cases:
+        for refinement in args.refinements:
+            for nranks in args.nranks:
+                r = run_case(case, refinement, nranks, args)
+                runs.append(r)
+                if r['status'] == 'ok':
+                    print('{:20s} {:3d} {:6d} {:9.2f} {:12.4e} {:9.3f} {:9.1f} {:9.1f}'.format(
+                        case, refinement, nranks, r['setup_time'],
+                        r['time_per_step']['median'], r['overhead_fraction'],
+                        r['solver']['linear_solves'], r['memory_mb']['peak_rss_max']))
+                else:
+                    print('{:20s} {:3d} {:6d} failed with return code {:}'.format(
+                        case, refinement, nranks, r['returncode']))
+                    print(r['log'])
+                # write after every run so that partial results are kept
+                with open(args.output, 'w') as f:
+                    json.dump({'metadata': metadata, 'runs': runs}, f, indent=1, default=float)
+    print('Results written to {:}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares direct and lookup-table evaluation of turbulence stability functions.
+
+For each stability function the limited functions S_m and S_rho are evaluated
+at random normalized frequencies, both directly and by interpolating in a
+:class:`StabilityFunctionTable`. Reports the table size, the estimated and
+the observed maximum error, and the evaluation times.
+
+Usage:
+
+    python bench_stability_functions.py [-n 1000000] [--tolerance 1e-3]
+"""
+import argparse
+import time
+
+import numpy
+
+from thetis import stability_functions
+
+
+STABILITY_FUNCTIONS = [
+    'StabilityFunctionCanutoA',
+    'StabilityFunctionCanutoB',
+    'StabilityFunctionCheng',
+    'GOTMStabilityFunctionCanutoA',
+    'GOTMStabilityFunctionCanutoB',
+    'GOTMStabilityFunctionCheng',
+    'GOTMStabilityFunctionKanthaClayson',
+]
+
+
+def best_time(func, repeat):
+    """Returns the minimum wall-clock time of ``repeat`` calls"""
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', type=int, default=1000000,
+                        help='number of evaluation points')
+    parser.add_argument('--tolerance', type=float, default=1e-3,
+                        help='tolerance of the lookup table')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of timed repetitions')
+    args = parser.parse_args()
+
+    # sample normalized frequencies, mostly within the table domain
+    rng = numpy.random.default_rng(1)
+    alpha_buoy = numpy.sinh(rng.uniform(numpy.arcsinh(-20.), numpy.arcsinh(2000.), args.n))
+    alpha_shear = numpy.sinh(rng.uniform(0., numpy.arcsinh(2000.), args.n))
+
+    header = '{:36s} {:6s} {:5s} {:>9s} {:>9s} {:>9s} {:>9s} {:>9s}'.format(
+        'function', 'smooth', 'size', 'est. err', 'max err', 'build s', 'direct s', 'table s')
+    print(header)
+    for name in STABILITY_FUNCTIONS:
+        for smooth in [False, True]:
+            func = getattr(stability_functions, name)(smooth_alpha_buoy_lim=smooth)
+            t0 = time.perf_counter()
+            table = stability_functions.StabilityFunctionTable(func, tolerance=args.tolerance)
+            t_build = time.perf_counter() - t0
+
+            exact = numpy.array(func.evaluate_normalized(alpha_buoy, alpha_shear))
+            approx = numpy.array(table.evaluate(alpha_buoy, alpha_shear))
+            max_err = numpy.abs(exact - approx).max()
+
+            t_direct = best_time(lambda: func.evaluate_normalized(alpha_buoy, alpha_shear), args.repeat)
+            t_table = best_time(lambda: table.evaluate(alpha_buoy, alpha_shear), args.repeat)
+            print('{:36s} {:6s} {:5d} {:9.2e} {:9.2e} {:9.3f} {:9.3f} {:9.3f}'.format(
+                name, str(smooth), table.size, table.error, max_err,
+                t_build, t_direct, t_table))
+
+
+if __name__ == '__main__':
+    main()
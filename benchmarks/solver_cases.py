@@ -0,0 +1,340 @@
+"""
+Benchmark cases of the 2D and 3D solvers, used by bench_solvers.py.
+
+The cases are derived from the examples but are self-contained: they do not
+need spin-up runs or external forcing data. Every case is a function
+
+.. code-block:: python
+
+    solver_obj, update_forcings = setup_case(refinement, settings)
+
+where ``refinement`` scales the horizontal (and for 3D cases, vertical)
+resolution and ``settings`` is a dict of options that are applied to the
+solver before the equations are created, see
+:func:`apply_benchmark_options`. The time step decreases with the mesh
+size, so the runs remain stable at all resolutions.
+"""
+import math
+import os
+
+from thetis import *
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            os.pardir, 'examples')
+
+
+def apply_benchmark_options(options, timestep, settings):
+    """
+    Sets the time step, run length and output options of a benchmark run
+
+    :arg options: the :class:`.ModelOptions2d` or :class:`.ModelOptions3d`
+        of the solver
+    :arg float timestep: time step of the case
+    :arg dict settings: dict with keys 'steps' (total number of time steps),
+        'export_interval' (number of time steps between exports, 0 disables
+        exports) and any further options that are passed to
+        ``options.update``
+    """
+    settings = dict(settings)
+    steps = settings.pop('steps')
+    export_interval = settings.pop('export_interval')
+    options.timestep = timestep
+    options.simulation_end_time = steps*timestep
+    if export_interval > 0:
+        options.simulation_export_time = export_interval*timestep
+    else:
+        options.simulation_export_time = options.simulation_end_time
+        options.no_exports = True
+    options.update(settings)
+
+
+def refine_mesh(mesh2d, refinement):
+    """
+    Uniformly refines a mesh
+
+    :arg mesh2d: the coarse mesh
+    :arg int refinement: refinement factor, must be a power of two
+    :returns: the refined mesh and the mesh hierarchy
+    """
+    levels = int(round(math.log2(refinement)))
+    if 2**levels != refinement:
+        raise ValueError('Refinement of a mesh file must be a power of two')
+    hierarchy = MeshHierarchy(mesh2d, levels)
+    return hierarchy[-1], hierarchy
+
+
+def setup_channel2d(refinement, settings):
+    """
+    Shock-forming wave in a channel with sloping bathymetry (2D, explicit)
+
+    See examples/channel2d/channel2d.py.
+    """
+    lx = 100e3
+    ly = 3750
+    mesh2d = RectangleMesh(80*refinement, 3*refinement, lx, ly)
+    p1_2d = get_functionspace(mesh2d, 'CG', 1)
+    bathymetry_2d = Function(p1_2d, name='Bathymetry')
+    x, y = SpatialCoordinate(mesh2d)
+    depth_oce = 20.0
+    depth_riv = 5.0
+    bathymetry_2d.interpolate(depth_oce + (depth_riv - depth_oce)*x/lx)
+
+    solver_obj = solver2d.FlowSolver2d(mesh2d, bathymetry_2d)
+    options = solver_obj.options
+    options.horizontal_velocity_scale = Constant(6.0)
+    options.check_volume_conservation_2d = True
+    options.fields_to_export = ['uv_2d', 'elev_2d']
+    options.swe_timestepper_type = 'SSPRK33'
+    options.swe_timestepper_options.use_automatic_timestep = False
+    apply_benchmark_options(options, 10.0/refinement, settings)
+
+    elev_init = Function(p1_2d)
+    elev_ramp_lx = 30e3
+    elev_init.interpolate(conditional(x < elev_ramp_lx, 6.0*(1 - x/elev_ramp_lx), 0.0))
+    solver_obj.assign_initial_conditions(elev=elev_init)
+    return solver_obj, None
+
+
+def setup_north_sea(refinement, settings):
+    """
+    Tidal flow in the North Sea (2D, semi-implicit DIRK22)
+
+    See examples/north_sea. The mesh and bathymetry are read from the
+    checkpoint of the example. The TPXO forcing is replaced by an M2 tide of
+    uniform amplitude on the open boundary and Coriolis forcing uses an
+    f-plane approximation, so that no external data is needed.
+    """
+    h5_file_name = os.path.join(EXAMPLES_DIR, 'north_sea', 'north_sea_bathymetry.h5')
+    coarse_mesh = read_mesh_from_checkpoint(h5_file_name)
+    with CheckpointFile(h5_file_name, 'r') as f:
+        coarse_bathymetry = f.load_function(coarse_mesh, 'Bathymetry')
+    if refinement > 1:
+        mesh2d, hierarchy = refine_mesh(coarse_mesh, refinement)
+        bathymetry_2d = Function(get_functionspace(mesh2d, 'CG', 1), name='Bathymetry')
+        prolong(coarse_bathymetry, bathymetry_2d)
+    else:
+        mesh2d = coarse_mesh
+        bathymetry_2d = coarse_bathymetry
+
+    solver_obj = solver2d.FlowSolver2d(mesh2d, bathymetry_2d)
+    options = solver_obj.options
+    options.element_family = 'dg-dg'
+    options.polynomial_degree = 1
+    options.coriolis_frequency = Constant(2*7.292e-05*math.sin(math.radians(55.0)))
+    options.manning_drag_coefficient = Constant(3.0e-02)
+    options.horizontal_velocity_scale = Constant(1.5)
+    options.use_lax_friedrichs_velocity = True
+    options.swe_timestepper_type = 'DIRK22'
+    options.swe_timestepper_options.use_semi_implicit_linearization = True
+    options.swe_timestepper_options.solver_parameters = {
+        'snes_type': 'newtonls',
+        'ksp_type': 'preonly',
+        'pc_type': 'lu',
+        'pc_factor_mat_solver_type': 'mumps',
+    }
+    options.fields_to_export = ['elev_2d', 'uv_2d']
+    options.fields_to_export_hdf5 = []
+    apply_benchmark_options(options, 3600.0/refinement, settings)
+
+    tidal_period = 12.42*3600
+    bnd_time = Constant(0.0)
+    tide_elev = 1.0*sin(2*pi/tidal_period*bnd_time)
+    solver_obj.bnd_functions['shallow_water'] = {
+        100: {'elev': tide_elev, 'uv': Constant(as_vector([0, 0]))},
+    }
+    solver_obj.assign_initial_conditions()
+
+    def update_forcings(t):
+        bnd_time.assign(t)
+
+    return solver_obj, update_forcings
+
+
+def setup_lock_exchange(refinement, settings):
+    """
+    Baroclinic lock exchange with the GLS turbulence closure (3D)
+
+    See examples/lockExchange/lockExchange.py. The 'coarse' resolution of
+    the example corresponds to ``refinement=1``.
+    """
+    depth = 20.0
+    delta_x = 2000.0/refinement
+    layers = 10*refinement
+    x_max = 32.0e3
+    x_min = -32.0e3
+    mesh2d = UnitSquareMesh(int((x_max - x_min)/delta_x), 2)
+    coords = mesh2d.coordinates
+    coords.dat.data[:, 0] = coords.dat.data[:, 0]*(x_max - x_min) + x_min
+    coords.dat.data[:, 1] = coords.dat.data[:, 1]*2*delta_x - delta_x
+
+    temp_left = 5.0
+    temp_right = 30.0
+    rho_0 = 1000.0
+    physical_constants['rho0'].assign(rho_0)
+
+    bathymetry_2d = Function(get_functionspace(mesh2d, 'CG', 1), name='Bathymetry')
+    bathymetry_2d.assign(depth)
+
+    solver_obj = solver.FlowSolver(mesh2d, bathymetry_2d, layers)
+    options = solver_obj.options
+    options.element_family = 'dg-dg'
+    options.timestepper_type = 'SSPRK22'
+    options.timestepper_options.use_automatic_timestep = False
+    options.solve_salinity = False
+    options.constant_salinity = Constant(35.0)
+    options.solve_temperature = True
+    options.use_implicit_vertical_diffusion = True
+    options.use_bottom_friction = True
+    options.bottom_roughness = Constant(1e-3)
+    options.use_turbulence = True
+    options.turbulence_model_type = 'gls'
+    options.use_ale_moving_mesh = True
+    options.use_baroclinic_formulation = True
+    options.use_limiter_for_tracers = True
+    options.use_limiter_for_velocity = True
+    options.horizontal_viscosity = Constant(0.5*delta_x)
+    options.horizontal_velocity_scale = Constant(1.0)
+    options.vertical_velocity_scale = Constant(1.2e-2)
+    options.check_volume_conservation_2d = True
+    options.check_volume_conservation_3d = True
+    options.check_temperature_conservation = True
+    options.fields_to_export = ['uv_2d', 'elev_2d', 'uv_3d', 'w_3d', 'temp_3d',
+                                'density_3d', 'eddy_visc_3d', 'tke_3d']
+    options.equation_of_state_type = 'linear'
+    options.equation_of_state_options.rho_ref = rho_0
+    options.equation_of_state_options.s_ref = 35.0
+    options.equation_of_state_options.th_ref = 5.0
+    options.equation_of_state_options.alpha = 0.2
+    options.equation_of_state_options.beta = 0.0
+    apply_benchmark_options(options, 60.0/refinement, settings)
+
+    solver_obj.create_equations()
+    temp_init3d = Function(solver_obj.function_spaces.H, name='initial temperature')
+    x, y, z = SpatialCoordinate(solver_obj.mesh)
+    temp_init3d.interpolate(temp_left - (temp_left - temp_right)*0.5*(tanh(x/10.0) + 1.0))
+    solver_obj.assign_initial_conditions(temp=temp_init3d)
+    return solver_obj, None
+
+
+def setup_sediment_trench_2d(refinement, settings):
+    """
+    Migrating trench with suspended sediment, bedload and Exner equation (2D)
+
+    See examples/sediment_trench_2d. The hydrodynamic spin-up of the example
+    is replaced by a uniform initial flow, as in
+    test/sediment/test_migrating_trench.py.
+    """
+    lx = 16
+    ly = 1.1
+    mesh2d = RectangleMesh(lx*5*refinement, 5*refinement, lx, ly)
+    x, y = SpatialCoordinate(mesh2d)
+    bathymetry_2d = Function(get_functionspace(mesh2d, 'CG', 1), name='bathymetry_2d')
+    depth_riv = Constant(0.0)
+    depth_trench = Constant(depth_riv - 0.15)
+    depth_diff = depth_trench - depth_riv
+    trench = conditional(le(x, 5), depth_riv, conditional(le(x, 6.5), (1/1.5)*depth_diff*(x-6.5) + depth_trench,
+                         conditional(le(x, 9.5), depth_trench, conditional(le(x, 11), -(1/1.5)*depth_diff*(x-11) + depth_riv, depth_riv))))
+    bathymetry_2d.interpolate(-trench)
+
+    solver_obj = solver2d.FlowSolver2d(mesh2d, bathymetry_2d)
+    options = solver_obj.options
+    sed_options = options.sediment_model_options
+    sed_options.solve_suspended_sediment = True
+    sed_options.use_bedload = True
+    sed_options.solve_exner = True
+    sed_options.average_sediment_size = Constant(160e-6)
+    sed_options.bed_reference_height = Constant(0.025)
+    sed_options.morphological_acceleration_factor = Constant(100)
+    sed_options.horizontal_diffusivity = Constant(0.15)
+    sed_options.check_sediment_conservation = True
+    options.nikuradse_bed_roughness = Constant(3*sed_options.average_sediment_size)
+    options.horizontal_viscosity = Constant(1e-6)
+    options.check_volume_conservation_2d = True
+    options.fields_to_export = ['sediment_2d', 'uv_2d', 'elev_2d', 'bathymetry_2d']
+    options.set_timestepper_type('CrankNicolson', implicitness_theta=1.0)
+    options.norm_smoother = Constant(0.1)
+    apply_benchmark_options(options, 0.3/refinement, settings)
+
+    left_bnd_id = 1
+    right_bnd_id = 2
+    solver_obj.bnd_functions['shallow_water'] = {
+        left_bnd_id: {'flux': Constant(-0.22)},
+        right_bnd_id: {'elev': Constant(0.397)}}
+    solver_obj.bnd_functions['sediment'] = {
+        left_bnd_id: {'flux': Constant(-0.22), 'equilibrium': None},
+        right_bnd_id: {'elev': Constant(0.397)}}
+    solver_obj.assign_initial_conditions(uv=as_vector((0.51, 0.0)), elev=Constant(0.4))
+    return solver_obj, None
+
+
+def setup_tidalfarm(refinement, settings):
+    """
+    Tidal flow around a headland with a continuous turbine farm (2D, implicit)
+
+    Forward model of examples/tidalfarm/tidalfarm.py with a uniform turbine
+    density in the farm. The turbine functional is evaluated every time step,
+    so its cost shows up in the callback overhead.
+    """
+    mesh2d = Mesh(os.path.join(EXAMPLES_DIR, 'tidalfarm', 'headland.msh'))
+    if refinement > 1:
+        mesh2d, hierarchy = refine_mesh(mesh2d, refinement)
+
+    tidal_amplitude = 5.
+    tidal_period = 12.42*60*60
+    H = 40
+
+    solver_obj = solver2d.FlowSolver2d(mesh2d, Constant(H))
+    options = solver_obj.options
+    options.check_volume_conservation_2d = True
+    options.element_family = 'dg-cg'
+    options.swe_timestepper_type = 'CrankNicolson'
+    options.swe_timestepper_options.implicitness_theta = 0.6
+    options.swe_timestepper_options.solver_parameters = {
+        'snes_rtol': 1e-9,
+        'ksp_type': 'preonly',
+        'pc_type': 'lu',
+        'pc_factor_mat_solver_type': 'mumps',
+        'mat_type': 'aij',
+    }
+    options.horizontal_viscosity = Constant(100.0)
+    options.quadratic_drag_coefficient = Constant(0.0025)
+    options.fields_to_export = ['uv_2d', 'elev_2d']
+
+    D = 16.0
+    turbine_density = Function(get_functionspace(mesh2d, 'CG', 1), name='turbine_density')
+    turbine_density.assign(0.5/(2.5*D*5*D))
+    farm_options = TidalTurbineFarmOptions()
+    farm_options.turbine_density = turbine_density
+    farm_options.turbine_options.diameter = D
+    farm_options.break_even_wattage = 200
+    options.tidal_turbine_farms[2] = [farm_options]
+    apply_benchmark_options(options, 800.0/refinement, settings)
+
+    tidal_elev = Function(get_functionspace(mesh2d, 'CG', 1), name='tidal_elev')
+    tidal_elev_bc = {'elev': tidal_elev}
+    solver_obj.bnd_functions['shallow_water'] = {
+        1: tidal_elev_bc,
+        2: tidal_elev_bc,
+        3: {'un': Constant(0.0)},
+    }
+    x = SpatialCoordinate(mesh2d)
+    omega = 2*pi/tidal_period
+    g = 9.81
+
+    def update_forcings(t):
+        tidal_elev.project(tidal_amplitude*sin(omega*t + omega/pow(g*H, 0.5)*x[0]))
+
+    update_forcings(0.0)
+    cb = turbines.TurbineFunctionalCallback(solver_obj, append_to_log=False)
+    solver_obj.add_callback(cb, 'timestep')
+    solver_obj.assign_initial_conditions(uv=as_vector((1e-7, 0.0)), elev=tidal_elev)
+    return solver_obj, update_forcings
+
+
+CASES = OrderedDict([
+    ('channel2d', setup_channel2d),
+    ('north_sea', setup_north_sea),
+    ('lock_exchange', setup_lock_exchange),
+    ('sediment_trench_2d', setup_sediment_trench_2d),
+    ('tidalfarm', setup_tidalfarm),
+])
@@ -43,9 +43,10 @@ for i, sta in enumerate(station_names):
         time = h5file['time'][:].flatten()
         vals = h5file['elev'][:].flatten()
 
-    g = f'{inv_dir}/diagnostic_timeseries_progress_{sta}_elev.hdf5'
+    g = f'{inv_dir}/diagnostic_timeseries_progress_elev.hdf5'
     with h5py.File(g, 'r') as h5file:
-        iter_vals = h5file['elev'][:]
+        names = [n.decode() for n in h5file['station_names'][:]]
+        iter_vals = h5file['elev'][:, names.index(sta), :]
 
     niter = iter_vals.shape[0] - 1
 
@@ -25,10 +25,11 @@ for i, sta in enumerate(stations):
     for fpath in fpaths:
         source_model = fpath.split(inv_dir + "_")[-1]
 
-        f = f"{fpath}/diagnostic_timeseries_progress_{sta}_elev.hdf5"
+        f = f"{fpath}/diagnostic_timeseries_progress_elev.hdf5"
         with h5py.File(f, "r") as h5file:
             time = h5file["time"][:].flatten() / 60.0
-            vals = h5file["elev"][:]
+            names = [n.decode() for n in h5file["station_names"][:]]
+            vals = h5file["elev"][:, names.index(sta), :]
 
         v = vals[-1]
         v -= v[time >= time_obs[0]][0]
@@ -22,10 +22,11 @@ for fpath in fpaths:
             time_obs = h5file["time"][:].flatten() / 60.0
             vals_obs = h5file["elev"][:].flatten()
 
-        f = f"{fpath}/diagnostic_timeseries_progress_{sta}_elev.hdf5"
+        f = f"{fpath}/diagnostic_timeseries_progress_elev.hdf5"
         with h5py.File(f, "r") as h5file:
             time = h5file["time"][:].flatten() / 60.0
-            vals = h5file["elev"][:]
+            names = [n.decode() for n in h5file["station_names"][:]]
+            vals = h5file["elev"][:, names.index(sta), :]
 
         ax = axes[i // 4, i % 4]
         ax.plot(time_obs, vals_obs, "k", zorder=3, label="Observation", lw=1.3)
@@ -5,6 +5,7 @@ from thetis.interpolation import *
 from scipy.interpolate import interp1d
 import netCDF4
 import numpy
+import pytz
 import pytest
 import os
 
@@ -0,0 +1,146 @@
+"""
+Tests the cost function, gradient and progress output of the inversion tools.
+"""
+from thetis import *
+from firedrake.adjoint import *
+from pyadjoint.tape import Tape, set_working_tape
+import thetis.inversion_tools as inversion_tools
+import h5py
+import pytest
+
+station_names = ['stationA', 'stationB']
+station_x = [2.5e3, 7.5e3]
+station_y = [500., 500.]
+
+
+@pytest.fixture(autouse=True)
+def tape():
+    """Records each test on a new tape"""
+    tape = Tape()
+    set_working_tape(tape)
+    continue_annotation()
+    yield tape
+    pause_annotation()
+
+
+def setup_inversion(output_dir, comm=COMM_WORLD, obs_value=0.05, **kwargs):
+    """
+    Runs a channel model whose initial elevation is the control
+
+    Keyword arguments are passed to :class:`InversionManager`.
+
+    :returns: the solver object and the inversion manager
+    """
+    with stop_annotating():
+        mesh2d = RectangleMesh(10, 1, 10e3, 1e3, comm=comm)
+        p1_2d = get_functionspace(mesh2d, 'CG', 1)
+        bathymetry_2d = Function(p1_2d, name='Bathymetry').assign(10.)
+        elev_init_2d = Function(p1_2d, name='Initial elevation')
+        x, y = SpatialCoordinate(mesh2d)
+        elev_init_2d.interpolate(0.1*cos(pi*x/10e3))
+
+    # observations are constant in time, with opposite signs at the stations
+    time = numpy.linspace(0., 500., 11)
+    values = [obs_value*numpy.ones_like(time), -obs_value*numpy.ones_like(time)]
+    sta_manager = inversion_tools.StationObservationManager(mesh2d, output_directory=output_dir)
+    sta_manager.register_observation_data(
+        station_names, 'elev', [time, time], values, station_x, station_y)
+    sta_manager.construct_evaluator()
+    # NOTE the inversion manager must be created before the solver is set up
+    inv_manager = inversion_tools.InversionManager(
+        sta_manager, output_dir=output_dir, no_exports=True,
+        test_consistency=False, test_gradient=False, **kwargs)
+
+    solver_obj = solver2d.FlowSolver2d(mesh2d, bathymetry_2d)
+    options = solver_obj.options
+    options.swe_timestepper_type = 'CrankNicolson'
+    options.timestep = 100.
+    options.simulation_export_time = 100.
+    options.simulation_end_time = 500.
+    options.no_exports = True
+    options.output_directory = output_dir
+    solver_obj.create_equations()
+    sta_manager.set_model_field(solver_obj.fields.elev_2d)
+
+    inv_manager.add_control(elev_init_2d)
+    cost_function = inv_manager.get_cost_function(solver_obj)
+    solver_obj.assign_initial_conditions(elev=elev_init_2d)
+    solver_obj.iterate(update_forcings=cost_function)
+    return solver_obj, inv_manager
+
+
+@pytest.mark.parallel(nprocs=2)
+def test_ensemble_sum(tmpdir):
+    ensemble = Ensemble(COMM_WORLD, 1)
+    member = ensemble.ensemble_comm.rank
+    output_dir = COMM_WORLD.bcast(str(tmpdir), root=0)
+    # each member observes a different scenario
+    solver_obj, inv_manager = setup_inversion(
+        output_dir, comm=ensemble.comm, obs_value=0.05*(member + 1), ensemble=ensemble)
+    controls = inv_manager.control_coeff_list
+    J = inv_manager.reduced_functional(controls)
+    dJdm, = inv_manager.reduced_functional.derivative()
+
+    # sum of the cost functions and gradients of the individual members
+    Jhat_local = ReducedFunctional(inv_manager.J, inv_manager.control_list)
+    J_local = Jhat_local(controls)
+    dJdm_local, = Jhat_local.derivative()
+    dJdm_expected = dJdm_local.copy(deepcopy=True)
+    ensemble.allreduce(dJdm_local, dJdm_expected)
+    assert numpy.isclose(J, ensemble.ensemble_comm.allreduce(J_local))
+    assert not numpy.isclose(J, 2*J_local)
+    assert numpy.allclose(dJdm.dat.data_ro, dJdm_expected.dat.data_ro)
+
+    # each member stores its own station time series
+    inv_manager.sta_manager.dump_time_series()
+    COMM_WORLD.barrier()
+    for i in range(ensemble.ensemble_comm.size):
+        fn = os.path.join(output_dir, f'diagnostic_timeseries_progress_elev_member{i}.hdf5')
+        assert os.path.isfile(fn)
+
+
+def compute_gradient(output_dir, **kwargs):
+    """Returns the cost function and its gradient with respect to the initial elevation"""
+    solver_obj, inv_manager = setup_inversion(output_dir, **kwargs)
+    Jhat = inv_manager.reduced_functional
+    J = Jhat(inv_manager.control_coeff_list)
+    dJdm, = Jhat.derivative()
+    return J, dJdm.dat.data_ro.copy()
+
+
+@pytest.mark.parametrize('checkpoint_options', [
+    {'checkpoint_schedule': 'revolve', 'nb_timesteps': 5, 'nb_checkpoints_in_ram': 2},
+    {'checkpoint_schedule': 'memory'},
+], ids=['revolve', 'memory'])
+def test_checkpointing_gradient(tmpdir, checkpoint_options):
+    J, dJdm = compute_gradient(str(tmpdir))
+    set_working_tape(Tape())
+    J_cp, dJdm_cp = compute_gradient(str(tmpdir), **checkpoint_options)
+    assert numpy.isclose(J_cp, J)
+    assert numpy.allclose(dJdm_cp, dJdm)
+
+
+def test_progress_time_series(tmpdir):
+    output_dir = str(tmpdir)
+    solver_obj, inv_manager = setup_inversion(output_dir)
+    sta_manager = inv_manager.sta_manager
+    sta_manager.dump_time_series()
+    values = [numpy.array(sta_manager.model_values).T]
+    # the station values are recorded again when the tape is recomputed
+    elev_init_2d, = inv_manager.control_coeff_list
+    inv_manager.reduced_functional([elev_init_2d.copy(deepcopy=True).assign(0.2)])
+    sta_manager.dump_time_series()
+    values.append(numpy.array(sta_manager.model_values).T)
+
+    fn = os.path.join(output_dir, 'diagnostic_timeseries_progress_elev.hdf5')
+    with h5py.File(fn, 'r') as h5file:
+        ds = h5file['elev']
+        assert ds.shape == (2, len(station_names), 5)
+        assert ds.maxshape == (None, len(station_names), 5)
+        ix = sta_manager.local_station_index
+        for i in range(2):
+            assert numpy.allclose(ds[i][ix, :], values[i])
+        assert not numpy.allclose(ds[0], ds[1])
+        assert numpy.allclose(h5file['time'][:], [100., 200., 300., 400., 500.])
+        assert [n.decode() for n in h5file['station_names'][:]] == station_names
+        assert numpy.allclose(h5file['x'][:], station_x)
@@ -0,0 +1,97 @@
+"""
+Tests the compilation cache statistics and precompilation.
+"""
+from thetis import *
+from thetis.compilation_cache import get_cache_dirs, set_cache_dir, compile_solver
+from thetis.precompile import precompile
+from firedrake.tsfc_interface import TSFCKernel
+from pyop2.configuration import configuration as pyop2_configuration
+from pyop2.global_kernel import GlobalKernel
+import pytest
+
+config = """
+from thetis import *
+
+
+def create_solver():
+    mesh2d = RectangleMesh(6, 2, 1000., 200.)
+    p1_2d = get_functionspace(mesh2d, 'CG', 1)
+    bathymetry_2d = Function(p1_2d).assign(20.)
+    solver_obj = solver2d.FlowSolver2d(mesh2d, bathymetry_2d)
+    options = solver_obj.options
+    options.swe_timestepper_type = 'CrankNicolson'
+    options.timestep = 10.
+    options.no_exports = True
+    solver_obj.assign_initial_conditions(elev=Constant(0.1))
+    return solver_obj
+"""
+
+
+@pytest.fixture
+def cache_dir(tmpdir, monkeypatch):
+    """Uses an empty compilation cache, restores the original caches afterwards"""
+    cache_dirs = get_cache_dirs()
+    monkeypatch.setenv('PYOP2_CACHE_DIR', cache_dirs['pyop2'])
+    monkeypatch.setenv('FIREDRAKE_TSFC_KERNEL_CACHE_DIR', cache_dirs['tsfc'])
+    yield str(tmpdir.join('cache'))
+    TSFCKernel._cachedir = cache_dirs['tsfc']
+    pyop2_configuration['cache_dir'] = cache_dirs['pyop2']
+
+
+def test_precompile(tmpdir, cache_dir):
+    config_file = str(tmpdir.join('config.py'))
+    with open(config_file, 'w') as f:
+        f.write(config)
+
+    stats = precompile(config_file, cache_dir=cache_dir)
+    assert stats['tsfc']['disk_entries'] > 0
+    assert stats['pyop2']['disk_entries'] > 0
+    assert get_cache_dirs()['tsfc'].startswith(cache_dir)
+
+    # a new process only loads the kernels from the disk caches
+    TSFCKernel._cache.clear()
+    GlobalKernel._cache.clear()
+    stats = precompile(config_file, cache_dir=cache_dir)
+    assert stats['tsfc']['kernels'] > 0
+    assert stats['tsfc']['disk_entries'] == 0
+    assert stats['pyop2']['disk_entries'] == 0
+    assert stats['tsfc']['hits'] == stats['tsfc']['kernels']
+    assert stats['tsfc']['misses'] == 0
+
+
+def test_set_cache_dir(cache_dir):
+    cache_dirs = set_cache_dir(cache_dir)
+    assert os.path.isdir(cache_dirs['tsfc'])
+    assert os.environ['PYOP2_CACHE_DIR'] == cache_dirs['pyop2']
+    assert get_cache_dirs() == cache_dirs
+
+
+@pytest.mark.parametrize('report', [False, True])
+def test_solver_report_option(report):
+    mesh2d = RectangleMesh(6, 2, 1000., 200.)
+    p1_2d = get_functionspace(mesh2d, 'CG', 1)
+    bathymetry_2d = Function(p1_2d).assign(20.)
+    solver_obj = solver2d.FlowSolver2d(mesh2d, bathymetry_2d)
+    solver_obj.options.report_compilation_cache = report
+    solver_obj.create_function_spaces()
+    # the disk caches are only scanned if requested
+    assert (solver_obj.compilation_cache_monitor is not None) == report
+
+
+def test_compile_solver_3d():
+    mesh2d = RectangleMesh(6, 2, 1000., 200.)
+    p1_2d = get_functionspace(mesh2d, 'CG', 1)
+    bathymetry_2d = Function(p1_2d).assign(20.)
+    solver_obj = solver.FlowSolver(mesh2d, bathymetry_2d, 3)
+    options = solver_obj.options
+    options.timestep = 10.
+    options.no_exports = True
+    options.use_ale_moving_mesh = True
+    x, y = SpatialCoordinate(mesh2d)
+    solver_obj.assign_initial_conditions(elev=0.1*cos(pi*x/1000.))
+    elev_init = solver_obj.fields.elev_2d.copy(deepcopy=True)
+    coords_init = solver_obj.mesh.coordinates.copy(deepcopy=True)
+    assert compile_solver(solver_obj) > 0
+    # the auxiliary operators do not modify the model state
+    assert errornorm(elev_init, solver_obj.fields.elev_2d) < 1e-12
+    assert numpy.allclose(coords_init.dat.data_ro, solver_obj.mesh.coordinates.dat.data_ro)
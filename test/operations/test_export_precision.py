@@ -0,0 +1,48 @@
+"""
+Tests single precision field exports.
+"""
+from thetis import *
+from thetis.exporter import HDF5Exporter, VTKExporter, get_visu_space
+import glob
+import re
+import pytest
+
+
+@pytest.fixture(scope='session')
+def tmp_outputdir(tmpdir_factory):
+    fn = tmpdir_factory.mktemp('outputs')
+    return str(fn)
+
+
+@pytest.fixture
+def elev():
+    mesh2d = UnitSquareMesh(10, 10)
+    fs = get_functionspace(mesh2d, 'DG', 1)
+    x, y = SpatialCoordinate(mesh2d)
+    return Function(fs, name='Elevation').interpolate(sin(x) + y)
+
+
+def test_single_precision_hdf5(tmp_outputdir, elev):
+    e = HDF5Exporter(elev.function_space(), tmp_outputdir, 'elev_float32', precision='float32')
+    e.export(elev)
+    with CheckpointFile(e.gen_filename(0), 'r') as h5file:
+        mesh = h5file.load_mesh()
+        g = h5file.load_function(mesh, 'Elevation')
+    assert numpy.allclose(g.dat.data_ro, elev.dat.data_ro, rtol=1e-6)
+    assert not numpy.array_equal(g.dat.data_ro, elev.dat.data_ro)
+
+
+@pytest.mark.parametrize('precision', ['float32', 'float64'])
+def test_single_precision_vtk(tmp_outputdir, elev, precision):
+    outputdir = os.path.join(tmp_outputdir, 'vtk_' + precision)
+    fs_visu = get_visu_space(elev.function_space())
+    e = VTKExporter(fs_visu, 'Elevation', outputdir, 'Elevation2d', precision=precision)
+    e.export(elev)
+    e.export(elev)
+    vtu_files = sorted(glob.glob(os.path.join(outputdir, '**', '*.vtu'), recursive=True))
+    assert len(vtu_files) == 2
+    with open(vtu_files[0], 'rb') as f:
+        header = f.read().split(b'<AppendedData')[0].decode('ascii')
+    field_type, = re.findall(r'<DataArray Name="Elevation" type="(\w+)"', header)
+    vtk_type = {'float32': 'Float32', 'float64': 'Float64'}[precision]
+    assert field_type == vtk_type
@@ -0,0 +1,54 @@
+"""
+Tests compressed hdf5 field exports.
+"""
+from thetis import *
+from thetis.exporter import HDF5Exporter
+from thetis import hdf5_compression
+import h5py
+import pytest
+
+
+@pytest.fixture(scope='session')
+def tmp_outputdir(tmpdir_factory):
+    fn = tmpdir_factory.mktemp('outputs')
+    return str(fn)
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'lzf'])
+def test_compressed_export(tmp_outputdir, compression):
+    mesh2d = UnitSquareMesh(10, 10)
+    fs = get_functionspace(mesh2d, 'DG', 1)
+    x, y = SpatialCoordinate(mesh2d)
+    f = Function(fs, name='Elevation').interpolate(sin(x) + y)
+    prefix = 'elev_{:}'.format(compression)
+    e = HDF5Exporter(fs, tmp_outputdir, prefix, compression=compression,
+                     chunk_size=32)
+    e.export(f)
+    e.wait()
+    filename = e.gen_filename(0)
+    with h5py.File(filename, 'r') as h5file:
+        filters = []
+        h5file.visititems(lambda name, obj: filters.append(obj.compression)
+                          if isinstance(obj, h5py.Dataset) and obj.ndim > 0 and obj.size > 0 else None)
+    assert compression in filters
+    if compression == 'gzip':
+        # files compressed with standard filters can be read back
+        with CheckpointFile(filename, 'r') as h5file:
+            mesh = h5file.load_mesh()
+            g = h5file.load_function(mesh, 'Elevation')
+        assert numpy.allclose(g.dat.data_ro, f.dat.data_ro)
+
+
+def test_compress_in_blocks(tmp_outputdir, monkeypatch):
+    # copy the dataset in several blocks of whole chunks
+    monkeypatch.setattr(hdf5_compression, 'copy_block_bytes', 1000)
+    filename = os.path.join(tmp_outputdir, 'blocks.h5')
+    data = numpy.random.rand(1003, 3)
+    with h5py.File(filename, 'w') as h5file:
+        h5file.create_dataset('group/data', data=data)
+        h5file['link'] = h5py.SoftLink('/group/data')
+    hdf5_compression.compress_hdf5_file(filename, chunk_size=10)
+    with h5py.File(filename, 'r') as h5file:
+        assert h5file['group/data'].compression == 'gzip'
+        assert h5file['group/data'].chunks == (10, 3)
+        assert numpy.array_equal(h5file['link'][()], data)
@@ -0,0 +1,49 @@
+"""
+Tests that the solvers and optional dependencies are imported lazily.
+"""
+import subprocess
+import sys
+
+
+def run_python(code):
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_lazy_import():
+    run_python(
+        'import sys, thetis\n'
+        'lazy = ["thetis.solver", "thetis.solver2d", "thetis.interpolation", "thetis.coordsys", '
+        '"thetis.forcing", "netCDF4", "pyproj", "uptide"]\n'
+        'assert not [m for m in lazy if m in sys.modules], [m for m in lazy if m in sys.modules]\n'
+        'assert thetis.solver2d.FlowSolver2d is not None\n'
+        'assert "thetis.solver2d" in sys.modules\n'
+    )
+
+
+def test_star_import():
+    run_python(
+        'import sys\n'
+        'from thetis import *\n'
+        'lazy = ["thetis.forcing", "netCDF4", "cftime", "pyproj", "uptide"]\n'
+        'assert not [m for m in lazy if m in sys.modules], [m for m in lazy if m in sys.modules]\n'
+        'assert timezone.pytz.utc is not None\n'
+        'assert solver2d.FlowSolver2d is not None\n'
+        'assert DiagnosticCallback is not None\n'
+        'assert thetis.diagnostics.KineticEnergyCalculator is not None\n'
+    )
+
+
+def test_star_import_names():
+    # names exported by the former eager imports of thetis/__init__.py
+    run_python(
+        'from thetis import *\n'
+        'star = set(globals())\n'
+        'import importlib\n'
+        'eager = ["timeintegrator", "solver", "solver2d", "callback", "limiter", "interpolation", '
+        '"coordsys", "timezone", "turbines", "optimisation", "diagnostics", "assembledschur", "options"]\n'
+        'for m in eager:\n'
+        '    importlib.import_module("thetis." + m)\n'
+        'baseline = {k for k in vars(thetis) if not k.startswith("_")} - {"importlib"}\n'
+        'assert baseline <= star, sorted(baseline - star)\n'
+        'assert exporter.ExportManager is not None\n'
+    )
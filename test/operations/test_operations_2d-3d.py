@@ -184,6 +184,56 @@ def test_copy_2d_field_to_3d_vec(uv_2d, uv_3d):
     assert numpy.allclose(uv_3d.dat.data_ro[:, 1], 8.0)
 
 
+def test_column_map(p1_2d, p1):
+    column_map = utility.get_column_map(p1_2d, p1)
+    assert utility.get_column_map(p1_2d, p1) is column_map
+    # every 3D node belongs to exactly one column
+    n_nodes_2d = p1_2d.dof_dset.total_size
+    parent = column_map.parent_nodes[column_map.column_nodes]
+    assert numpy.array_equal(parent[:, 0], numpy.arange(n_nodes_2d))
+    assert numpy.all(parent == parent[:, :1])
+
+
+def test_column_map_periodic():
+    # coordinates of a periodic mesh are discontinuous, bathymetry is not
+    mesh2d = PeriodicRectangleMesh(4, 2, 1000., 500.)
+    x, y = SpatialCoordinate(mesh2d)
+    p1_2d = utility.get_functionspace(mesh2d, 'CG', 1)
+    bathymetry_2d = Function(p1_2d).interpolate(10. + sin(2*pi*x/1000.))
+    mesh = utility.extrude_mesh_sigma(mesh2d, 3, bathymetry_2d)
+    assert numpy.allclose(mesh.coordinates.dat.data_ro[:, 2].min(), -11.)
+    assert numpy.allclose(mesh.coordinates.dat.data_ro[:, 2].max(), 0.)
+
+    p1dg = utility.get_functionspace(mesh, 'DG', 1, 'CG', 1)
+    column_map = utility.get_column_map(p1_2d, p1dg)
+    assert numpy.all(column_map.parent_nodes >= 0)
+    assert numpy.all(column_map.column_nodes >= 0)
+    f_3d = Function(p1dg)
+    column_map.expand(bathymetry_2d, f_3d)
+    x, y, z = SpatialCoordinate(mesh)
+    f_ref = Function(p1dg).interpolate(10. + sin(2*pi*x/1000.))
+    assert numpy.allclose(f_3d.dat.data_ro, f_ref.dat.data_ro)
+
+
+@pytest.mark.parametrize('family', ['CG', 'DG'])
+def test_smagorinsky_local_evaluation(mesh, family):
+    fs_uv = utility.get_functionspace(mesh, 'DG', 1, vector=True)
+    fs = utility.get_functionspace(mesh, family, 1)
+    x, y, z = SpatialCoordinate(mesh)
+    # constant shear, nu = c_s**2*h**2*sqrt(1.5**2 + 0**2)
+    uv = Function(fs_uv).interpolate(as_vector((2*x + y, -x + 0.5*y, 0)))
+    max_val = Function(fs).assign(1.0)
+    results = []
+    for local_evaluation in [False, True]:
+        nu = Function(fs)
+        smag = utility3d.SmagorinskyViscosity(uv, nu, Constant(0.1), Constant(0.2), max_val,
+                                              local_evaluation=local_evaluation)
+        smag.solve()
+        results.append(nu)
+    assert numpy.allclose(results[0].dat.data_ro, 6e-4)
+    assert numpy.allclose(results[1].dat.data_ro, results[0].dat.data_ro)
+
+
 def test_minimum_angle(mesh2d):
     min_angle = utility.get_minimum_angles_2d(mesh2d).vector().gather().min()
     assert numpy.allclose(min_angle, pi/4)
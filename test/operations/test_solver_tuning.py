@@ -0,0 +1,90 @@
+"""
+Tests the automatic selection of solver parameters.
+"""
+from thetis import *
+from thetis.solver_tuning import SolverTuner, get_solver_candidates, get_options_hash
+import json
+
+
+def make_solver(outputdir, cache_file):
+    mesh2d = RectangleMesh(10, 2, 1000., 200.)
+    p1_2d = get_functionspace(mesh2d, 'CG', 1)
+    bathymetry_2d = Function(p1_2d).assign(20.)
+    solver_obj = solver2d.FlowSolver2d(mesh2d, bathymetry_2d)
+    options = solver_obj.options
+    options.swe_timestepper_type = 'CrankNicolson'
+    options.timestep = 20.
+    options.simulation_export_time = 100.
+    options.simulation_end_time = 100.
+    options.no_exports = True
+    options.output_directory = outputdir
+    options.tune_solver_parameters = True
+    options.solver_tuning_steps = 2
+    options.solver_tuning_cache_file = cache_file
+    solver_obj.create_equations()
+    x, y = SpatialCoordinate(mesh2d)
+    solver_obj.assign_initial_conditions(elev=0.1*cos(pi*x/1000.))
+    return solver_obj
+
+
+def test_solver_tuning(tmpdir):
+    catalogue = {
+        'shallow_water': OrderedDict([
+            ('fails', ({'ksp_type': 'gmres', 'ksp_max_it': 1, 'pc_type': 'none'}, None)),
+            ('lu', ({'ksp_type': 'preonly', 'pc_type': 'lu', 'mat_type': 'aij'}, None)),
+            ('other-family', ({'ksp_type': 'preonly', 'pc_type': 'lu'}, ('cg-cg', ))),
+        ]),
+    }
+    outputdir = str(tmpdir)
+    cache_file = str(tmpdir.join('tuning.json'))
+    solver_obj = make_solver(outputdir, cache_file)
+    elev_init = solver_obj.fields.elev_2d.copy(deepcopy=True)
+
+    tuner = SolverTuner(solver_obj, steps=2, cache_file=cache_file, catalogue=catalogue)
+    choices = tuner.tune()
+    assert choices['swe2d'] in ['initial', 'lu']
+    results = tuner.results['swe2d']
+    assert list(results) == ['initial', 'fails', 'lu']
+    assert not results['fails'][2]
+    assert results['lu'][2]
+    # model state is restored after tuning
+    assert errornorm(elev_init, solver_obj.fields.elev_2d) < 1e-12
+
+    with open(cache_file) as f:
+        cache = json.load(f)
+    entry, = cache.values()
+    assert entry['candidate'] == choices['swe2d']
+    assert entry['key']['nranks'] == solver_obj.comm.size
+    assert entry['key']['cells'] == 40
+    assert entry['key']['options'] == get_options_hash(solver_obj.options)
+
+    # the cached choice is used without tuning
+    solver_obj = make_solver(outputdir, cache_file)
+    solver_obj.iterate()
+    assert solver_obj.solver_tuner.choices == choices
+    assert solver_obj.solver_tuner.results == {}
+
+
+def test_options_hash(tmpdir):
+    solver_obj = make_solver(str(tmpdir), str(tmpdir.join('tuning.json')))
+    options = solver_obj.options
+    digest = get_options_hash(options)
+    options.output_directory = str(tmpdir.join('other'))
+    assert get_options_hash(options) == digest
+    options.use_nonlinear_equations = not options.use_nonlinear_equations
+    assert get_options_hash(options) != digest
+
+
+def test_unavailable_candidates():
+    catalogue = {
+        'scalar': OrderedDict([
+            ('hypre', ({'ksp_type': 'gmres', 'pc_type': 'hypre'}, None)),
+            ('mumps', ({'ksp_type': 'preonly', 'pc_type': 'lu',
+                        'pc_factor_mat_solver_type': 'mumps'}, None)),
+            ('ilu', ({'ksp_type': 'gmres', 'pc_type': 'ilu'}, None)),
+        ]),
+    }
+    candidates = get_solver_candidates('scalar', 'dg-dg', catalogue=catalogue)
+    assert 'ilu' in candidates
+    assert ('hypre' in candidates) == PETSc.Sys.hasExternalPackage('hypre')
+    assert ('mumps' in candidates) == PETSc.Sys.hasExternalPackage('mumps')
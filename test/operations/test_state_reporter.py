@@ -0,0 +1,37 @@
+"""
+Tests the batched field statistics of StateReporter.
+"""
+from thetis import *
+from thetis.state_reporter import StateReporter
+import pytest
+
+
+@pytest.fixture(scope='module')
+def fields():
+    mesh2d = UnitSquareMesh(5, 5)
+    mesh = extrude_mesh_sigma(mesh2d, 3, Function(get_functionspace(mesh2d, 'CG', 1)).assign(1.0))
+    x, y = SpatialCoordinate(mesh2d)
+    elev = Function(get_functionspace(mesh2d, 'DG', 1)).interpolate(x - 2*y)
+    uv = Function(get_functionspace(mesh2d, 'DG', 1, vector=True)).interpolate(as_vector((x, 3*y)))
+    x, y, z = SpatialCoordinate(mesh)
+    salt = Function(get_functionspace(mesh, 'DG', 1)).interpolate(35 + z)
+    return OrderedDict([('eta', elev), ('u', uv), ('salt', salt)])
+
+
+def test_state_reporter(fields):
+    reporter = StateReporter(fields, statistics=['norm', 'min', 'max', 'nan'])
+    values = reporter.evaluate()
+    assert list(values) == reporter.keys
+    for label, f in fields.items():
+        assert numpy.isclose(values[label, 'norm'], norm(f))
+        assert numpy.isclose(values[label, 'min'], f.dat.data_ro.min())
+        assert numpy.isclose(values[label, 'max'], f.dat.data_ro.max())
+        assert values[label, 'nan'] == 0
+
+
+def test_state_reporter_nan(fields):
+    f = Function(fields['eta'])
+    f.dat.data[0] = numpy.nan
+    values = StateReporter({'eta': f}, statistics=['nan', 'max']).evaluate()
+    assert values['eta', 'nan'] == 1
+    assert numpy.isclose(values['eta', 'max'], fields['eta'].dat.data_ro.max())
@@ -0,0 +1,62 @@
+"""
+Tests the performance telemetry stream.
+"""
+from thetis import *
+from thetis.telemetry import Telemetry
+import h5py
+import json
+import pytest
+
+
+@pytest.mark.parametrize('suffix', ['jsonl', 'hdf5'])
+def test_telemetry(tmpdir, suffix):
+    mesh2d = UnitSquareMesh(5, 5)
+    fs = get_functionspace(mesh2d, 'CG', 1)
+    x, y = SpatialCoordinate(mesh2d)
+    f = Function(fs)
+    filename = str(tmpdir.join('telemetry.' + suffix))
+    telemetry = Telemetry(filename, interval=2, events=['thetis.test_event'])
+    for i in range(5):
+        telemetry.start_step()
+        with telemetry.phase('advance'):
+            f.project(sin(x*i) + y)
+        telemetry.end_step(i + 1, float(i + 1))
+    telemetry.flush(5, 5.0)
+
+    if suffix == 'jsonl':
+        with open(filename) as jsonfile:
+            records = [json.loads(line) for line in jsonfile]
+        assert [r['steps'] for r in records] == [2, 2, 1]
+        for r in records:
+            assert r['wall_step']['max'] >= r['wall_advance']['max'] > 0
+            assert r['KSPSolve_count']['min'] == r['steps']
+            assert r['thetis.test_event_count']['max'] == 0
+    else:
+        with h5py.File(filename, 'r') as h5file:
+            assert h5file['time'].shape == (3, 1)
+            assert numpy.allclose(h5file['KSPSolve_count_mean'][:, 0], [2, 2, 1])
+
+
+def test_telemetry_stages(tmpdir):
+    mesh2d = UnitSquareMesh(5, 5)
+    fs = get_functionspace(mesh2d, 'CG', 1)
+    x, y = SpatialCoordinate(mesh2d)
+    f = Function(fs)
+    filename = str(tmpdir.join('telemetry.jsonl'))
+    telemetry = Telemetry(filename, interval=2)
+    for i in range(2):
+        telemetry.start_step()
+        with telemetry.phase('advance'):
+            # solves in nested log stages are counted too
+            with timed_stage('telemetry test'):
+                f.project(sin(x*i) + y)
+                with timed_stage('telemetry test inner'):
+                    f.project(cos(x*i) + y)
+        telemetry.end_step(i + 1, float(i + 1))
+
+    with open(filename) as jsonfile:
+        record = json.loads(jsonfile.readline())
+    assert record['KSPSolve_count']['min'] == 4
+    outer = record['wall_stage_telemetry_test']['max']
+    inner = record['wall_stage_telemetry_test_inner']['max']
+    assert record['wall_advance']['max'] >= outer >= inner > 0
@@ -18,7 +18,7 @@ import os
 from sediment_callback import SedimentTotalMassConservation2DCallback
 
 
-def run_migrating_trench(conservative):
+def run_migrating_trench(conservative, fused_update=False, subcycling_intervals=None):
 
     # define mesh
     lx = 16
@@ -63,6 +63,9 @@ def run_migrating_trench(conservative):
     options.sediment_model_options.solve_exner = True
 
     options.sediment_model_options.use_sediment_conservative_form = conservative
+    options.sediment_model_options.use_fused_update = fused_update
+    if subcycling_intervals is not None:
+        options.subcycling_intervals = subcycling_intervals
     options.sediment_model_options.average_sediment_size = Constant(160*(10**(-6)))
     options.sediment_model_options.bed_reference_height = Constant(0.025)
     options.sediment_model_options.morphological_acceleration_factor = Constant(morfac)
@@ -155,5 +158,13 @@ def test_trench(conservative):
     run_migrating_trench(conservative)
 
 
+def test_trench_fused_update():
+    run_migrating_trench(False, fused_update=True)
+
+
+def test_trench_subcycled_exner():
+    run_migrating_trench(False, subcycling_intervals={'exner': 2})
+
+
 if __name__ == '__main__':
     test_trench(False)
@@ -0,0 +1,58 @@
+"""
+Tests parameter sweeps that reuse the solver object.
+"""
+from thetis import *
+import pytest
+
+
+def make_solver(manning, outputdir):
+    mesh2d = RectangleMesh(10, 2, 1000., 200.)
+    p1_2d = get_functionspace(mesh2d, 'CG', 1)
+    bathymetry_2d = Function(p1_2d).assign(5.)
+    solver_obj = solver2d.FlowSolver2d(mesh2d, bathymetry_2d)
+    options = solver_obj.options
+    options.swe_timestepper_type = 'CrankNicolson'
+    options.timestep = 20.
+    options.simulation_export_time = 100.
+    options.simulation_end_time = 200.
+    options.no_exports = True
+    options.output_directory = outputdir
+    options.manning_drag_coefficient = Constant(manning)
+    return solver_obj
+
+
+def test_parameter_sweep(tmpdir):
+    outputdir = str(tmpdir)
+    tide = Constant(0.)
+    solver_obj = make_solver(0.02, outputdir)
+    sweep = ParameterSweep(solver_obj, ['manning_drag_coefficient'])
+    solver_obj.bnd_functions['shallow_water'] = {1: {'elev': tide}}
+    solver_obj.assign_initial_conditions(elev=Constant(0.))
+
+    results = []
+    for manning in [0.02, 0.05]:
+        sweep.run({'manning_drag_coefficient': manning, tide: 0.2})
+        assert solver_obj.simulation_time == pytest.approx(200.)
+        results.append(solver_obj.fields.elev_2d.copy(deepcopy=True))
+    assert errornorm(results[0], results[1]) > 1e-6
+
+    # the last run matches a solver built with the same parameters
+    ref_obj = make_solver(0.05, outputdir)
+    ref_obj.bnd_functions['shallow_water'] = {1: {'elev': Constant(0.2)}}
+    ref_obj.assign_initial_conditions(elev=Constant(0.))
+    ref_obj.iterate()
+    assert numpy.allclose(results[1].dat.data_ro, ref_obj.fields.elev_2d.dat.data_ro)
+
+    with pytest.raises(ValueError):
+        sweep.update({'horizontal_viscosity': 1.0})
+
+
+def test_parameter_sweep_declaration(tmpdir):
+    solver_obj = make_solver(0.02, str(tmpdir))
+    with pytest.raises(ValueError):
+        ParameterSweep(solver_obj, ['timestep'])
+    with pytest.raises(ValueError):
+        ParameterSweep(solver_obj, ['horizontal_viscosity'])
+    solver_obj.create_equations()
+    with pytest.raises(ValueError):
+        ParameterSweep(solver_obj, ['manning_drag_coefficient'])
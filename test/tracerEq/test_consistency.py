@@ -180,6 +180,24 @@ def test_ale_nonconst_tracer(element_family, meshtype, timestepper_type):
                            no_exports=True)
 
 
+@pytest.mark.parametrize('use_local_smagorinsky_evaluation', [False, True])
+def test_smagorinsky_const_tracer(use_local_smagorinsky_evaluation):
+    """
+    Test ALE timeintegrators with Smagorinsky viscosity
+    One constant tracer, should remain constants
+    """
+    run_tracer_consistency(element_family='dg-dg',
+                           meshtype='regular',
+                           use_ale_moving_mesh=True,
+                           solve_salinity=True,
+                           solve_temperature=False,
+                           use_limiter_for_tracers=False,
+                           use_smagorinsky_viscosity=True,
+                           use_local_smagorinsky_evaluation=use_local_smagorinsky_evaluation,
+                           timestepper_type='SSPRK22',
+                           no_exports=True)
+
+
 if __name__ == '__main__':
     run_tracer_consistency(element_family='dg-dg',
                            meshtype='regular',
@@ -0,0 +1,32 @@
+"""
+Tests lookup-table evaluation of stability functions
+"""
+import numpy
+import pytest
+from thetis.stability_functions import *
+
+
+@pytest.fixture(params=['CanutoA', 'CanutoB', 'Cheng', 'KanthaClayson'])
+def stability_function(request):
+    if request.param == 'KanthaClayson':
+        return GOTMStabilityFunctionKanthaClayson(smooth_alpha_buoy_lim=True)
+    return globals()['StabilityFunction' + request.param](smooth_alpha_buoy_lim=True)
+
+
+def test_lookup_table(stability_function):
+    rng = numpy.random.default_rng(2)
+    alpha_buoy = numpy.sinh(rng.uniform(numpy.arcsinh(-10.), numpy.arcsinh(1000.), 10000))
+    alpha_shear = numpy.sinh(rng.uniform(0., numpy.arcsinh(1000.), 10000))
+    exact = numpy.array(stability_function.evaluate_normalized(alpha_buoy, alpha_shear))
+    table = stability_function.enable_lookup_table(tolerance=1e-3)
+    approx = numpy.array(table.evaluate(alpha_buoy, alpha_shear))
+    assert numpy.abs(exact - approx).max() < 2e-3
+
+
+def test_lookup_table_outside_domain(stability_function):
+    alpha_buoy = numpy.array([-50., 0.5, 5000.])
+    alpha_shear = numpy.array([0.5, 5000., 1.0])
+    exact = numpy.array(stability_function.evaluate_normalized(alpha_buoy, alpha_shear))
+    table = stability_function.enable_lookup_table()
+    approx = numpy.array(table.evaluate(alpha_buoy, alpha_shear))
+    assert numpy.allclose(exact, approx, rtol=1e-12)
@@ -1,22 +1,17 @@
+"""
+Thetis, a finite element coastal ocean model
+
+Importing the package loads the core utilities only. The solvers and the
+modules that depend on heavy optional packages (e.g. scipy, netCDF4, pyproj,
+uptide) are imported on first access, e.g. ``thetis.solver2d`` or
+``from thetis import *``.
+"""
 from thetis.utility import *
 from thetis.utility3d import *
 from thetis.log import *
-import thetis.timeintegrator as timeintegrator  # NOQA
-import thetis.solver as solver  # NOQA
-import thetis.solver2d as solver2d  # NOQA
-from thetis.callback import DiagnosticCallback, DetectorsCallback  # NOQA
-from thetis.callback import TimeSeriesCallback2D, TimeSeriesCallback3D  # NOQA
-from thetis.callback import VerticalProfileCallback  # NOQA
-import thetis.limiter as limiter      # NOQA
-import thetis.interpolation as interpolation      # NOQA
-import thetis.coordsys as coordsys      # NOQA
-import thetis.timezone as timezone      # NOQA
-import thetis.turbines  # NOQA
-import thetis.optimisation  # NOQA
-import thetis.diagnostics  # NOQA
 from thetis._version import get_versions
-from thetis.assembledschur import AssembledSchurPC  # NOQA
-from thetis.options import TidalTurbineFarmOptions, DiscreteTidalTurbineFarmOptions  # NOQA
+import thetis  # NOQA
+import importlib
 import os  # NOQA
 import datetime  # NOQA
 import numpy  # NOQA
@@ -24,5 +19,83 @@ import numpy  # NOQA
 __version__ = get_versions()['version']
 del get_versions
 
+# submodules that are imported on first access, and exported by
+# ``from thetis import *`` like the eagerly imported submodules used to be
+_lazy_submodules = [
+    'assembledschur',
+    'callback',
+    'compilation_cache',
+    'configuration',
+    'coordsys',
+    'coupled_timeintegrator',
+    'coupled_timeintegrator_2d',
+    'diagnostics',
+    'equation',
+    'exner_eq',
+    'exporter',
+    'hdf5_compression',
+    'implicitexplicit',
+    'interpolation',
+    'limiter',
+    'momentum_eq',
+    'optimisation',
+    'options',
+    'rungekutta',
+    'sediment_eq_2d',
+    'sediment_model',
+    'shallowwater_eq',
+    'solver',
+    'solver2d',
+    'solver_tuning',
+    'stability_functions',
+    'state_reporter',
+    'sweep',
+    'telemetry',
+    'timeintegrator',
+    'timezone',
+    'tracer_eq',
+    'tracer_eq_2d',
+    'turbines',
+    'turbulence',
+]
+
+# submodules that are only imported on attribute access, e.g.
+# ``thetis.forcing``, as they require netCDF4 and uptide
+_lazy_optional_submodules = [
+    'forcing',
+]
+
+# objects that are imported on first access, name: module
+_lazy_objects = {
+    'DiagnosticCallback': 'thetis.callback',
+    'DetectorsCallback': 'thetis.callback',
+    'TimeSeriesCallback2D': 'thetis.callback',
+    'TimeSeriesCallback3D': 'thetis.callback',
+    'VerticalProfileCallback': 'thetis.callback',
+    'AssembledSchurPC': 'thetis.assembledschur',
+    'TidalTurbineFarmOptions': 'thetis.options',
+    'DiscreteTidalTurbineFarmOptions': 'thetis.options',
+    'ParameterSweep': 'thetis.sweep',
+}
+
+
+def __getattr__(name):
+    if name in _lazy_submodules or name in _lazy_optional_submodules:
+        return importlib.import_module('thetis.' + name)
+    if name in _lazy_objects:
+        value = getattr(importlib.import_module(_lazy_objects[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module 'thetis' has no attribute '{:}'".format(name))
+
+
+def __dir__():
+    return sorted(list(globals()) + _lazy_submodules + _lazy_optional_submodules
+                  + list(_lazy_objects))
+
+
+__all__ = [name for name in globals() if not name.startswith('_') and name != 'importlib']
+__all__ += _lazy_submodules + list(_lazy_objects)
+
 thetis_log_level(DEBUG)
 set_thetis_loggers(comm=COMM_WORLD)
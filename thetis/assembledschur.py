@@ -1,5 +1,6 @@
 from firedrake import *
 from petsc4py import PETSc
+from mpi4py import MPI
 
 
 class AssembledSchurPC(PCBase):
@@ -20,6 +21,17 @@ class AssembledSchurPC(PCBase):
         where :math:`v` and :math:`u` are the test and trial of the :math:`A00`
         block. This gives the exact inverse of the mass matrix for a DG
         discretisation.
+
+    On updates, only the sub-blocks whose coefficients have been modified
+    are reassembled, and the matrix products reuse their symbolic structure.
+    Modifications are detected from the data versions of the coefficients,
+    which are incremented on every write. If none of the coefficients have
+    been modified, e.g. if the depth is not updated by the linearization,
+    the Schur complement is not recomputed.
+
+    The preconditioner of the Schur system (e.g. the multigrid hierarchy) is
+    rebuilt every :code:`schur_pc_refresh_interval` updates (default 1),
+    and reused otherwise.
     """
     def initialize(self, pc):
         _, P = pc.getOperators()
@@ -30,6 +42,7 @@ class AssembledSchurPC(PCBase):
         test, trial = a.arguments()
         W = test.function_space()
         V, Q = W.subfunctions
+        self.comm = W.mesh().comm
         v = TestFunction(V)
         u = TrialFunction(V)
         mass = dot(v, u)*dx
@@ -45,28 +58,71 @@ class AssembledSchurPC(PCBase):
         self.A01 = None
         self.A10 = None
         self.A11 = None
+        self._form_state = {}
         self.ksp = PETSc.KSP().create()
         self.ksp.setOptionsPrefix(options_prefix + 'schur_')
         self.ksp.setFromOptions()
+        opts = PETSc.Options(options_prefix + 'schur_')
+        self.pc_refresh_interval = max(opts.getInt('pc_refresh_interval', 1), 1)
+        self.nb_updates = 0
         self.update(pc)
 
+    @staticmethod
+    def _coefficient_state(form):
+        """Returns the data versions of all coefficients in the form"""
+        coeffs = list(form.coefficients())
+        if hasattr(form, 'constants'):
+            coeffs += list(form.constants())
+        coeffs.append(form.ufl_domain().coordinates)
+        return [(id(d), d.dat_version) for c in coeffs for d in c.dat]
+
+    def _needs_assembly(self, key, form):
+        """
+        Checks whether a block needs to be reassembled.
+
+        Returns True on the first call and whenever the coefficients of the form
+        have been written to since the previous call on any rank.
+        """
+        state = self._coefficient_state(form)
+        changed = self._form_state.get(key) != state
+        # assembly is collective, all ranks must take the same decision
+        changed = self.comm.allreduce(changed, op=MPI.LOR)
+        if changed:
+            self._form_state[key] = state
+        return changed
+
     def update(self, pc):
-        self.A01 = assemble(self.a01, tensor=self.A01)
-        self.A10 = assemble(self.a10, tensor=self.A10)
-        self.A11 = assemble(self.a11, tensor=self.A11)
+        changed_01 = self._needs_assembly('a01', self.a01)
+        changed_10 = self._needs_assembly('a10', self.a10)
+        changed_11 = self._needs_assembly('a11', self.a11)
+        if changed_01:
+            self.A01 = assemble(self.a01, tensor=self.A01)
+        if changed_10:
+            self.A10 = assemble(self.a10, tensor=self.A10)
+        if changed_11:
+            self.A11 = assemble(self.a11, tensor=self.A11)
         A01 = self.A01.M.handle
         A10 = self.A10.M.handle
         A11 = self.A11.M.handle
 
-        self.A10_A00_inv = A10.matMult(self.A00_inv, self.A10_A00_inv, 2.0)
-        self.schur = self.A10_A00_inv.matMult(A01, self.schur, 2.0)
+        if changed_10:
+            # NOTE passing an existing result matrix only does the numeric product
+            self.A10_A00_inv = A10.matMult(self.A00_inv, self.A10_A00_inv, 2.0)
+        if changed_01 or changed_10:
+            self.schur = self.A10_A00_inv.matMult(A01, self.schur, 2.0)
         if self.schur_plus is None:
+            # the sparsity of schur_plus is the union of the two patterns
             self.schur_plus = self.schur.duplicate(copy=True)
             self.schur_plus.aypx(-1.0, A11, PETSc.Mat.Structure.DIFFERENT_NONZERO_PATTERN)
-        else:
-            self.schur_plus = self.schur.copy(self.schur_plus, PETSc.Mat.Structure.DIFFERENT_NONZERO_PATTERN)
-            self.schur_plus.aypx(-1.0, A11, PETSc.Mat.Structure.SAME_NONZERO_PATTERN)
+        elif changed_01 or changed_10 or changed_11:
+            self.schur_plus.zeroEntries()
+            self.schur_plus.axpy(-1.0, self.schur, PETSc.Mat.Structure.SUBSET_NONZERO_PATTERN)
+            self.schur_plus.axpy(1.0, A11, PETSc.Mat.Structure.SUBSET_NONZERO_PATTERN)
+
+        reuse_pc = self.nb_updates % self.pc_refresh_interval != 0
+        self.ksp.getPC().setReusePreconditioner(reuse_pc)
         self.ksp.setOperators(self.schur_plus)
+        self.nb_updates += 1
 
     def apply(self, pc, X, Y):
         self.ksp.solve(X, Y)
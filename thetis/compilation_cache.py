@@ -0,0 +1,256 @@
+"""
+Monitoring and warming of the form compilation caches.
+
+Firedrake stores the TSFC kernels of all assembled forms, and PyOP2 the
+compiled shared libraries of all parallel loops, in disk caches. The cache
+directories are set with the ``FIREDRAKE_TSFC_KERNEL_CACHE_DIR`` and
+``PYOP2_CACHE_DIR`` environment variables, or with :func:`set_cache_dir`.
+
+Firedrake and PyOP2 have no public interface for the cache locations and
+statistics, so this module reads the private class attributes of
+:class:`TSFCKernel` and :class:`GlobalKernel` that hold them. If a Firedrake
+version does not have these attributes, the TSFC cache directory is taken
+from the environment and the in-memory kernel counts are not reported.
+"""
+from .utility import *
+from firedrake.tsfc_interface import TSFCKernel
+from pyop2.global_kernel import GlobalKernel
+from pyop2.configuration import configuration as pyop2_configuration
+
+__all__ = ['get_cache_dirs', 'set_cache_dir', 'CompilationCacheMonitor',
+           'compile_solver']
+
+cache_env_variables = OrderedDict([
+    ('tsfc', 'FIREDRAKE_TSFC_KERNEL_CACHE_DIR'),
+    ('pyop2', 'PYOP2_CACHE_DIR'),
+])
+
+
+def _memory_cache_size(cls):
+    """Returns the number of kernels in the memory cache of a kernel class, or None"""
+    cache = getattr(cls, '_cache', None)
+    if cache is None:
+        return None
+    return len(cache)
+
+
+def get_cache_dirs():
+    """
+    Returns the current TSFC and PyOP2 disk cache directories
+
+    :returns: :class:`OrderedDict` with keys 'tsfc' and 'pyop2'. The TSFC
+        directory is None if it is not known.
+    """
+    tsfc_dir = getattr(TSFCKernel, '_cachedir', None)
+    if tsfc_dir is None:
+        tsfc_dir = os.environ.get(cache_env_variables['tsfc'])
+    return OrderedDict([
+        ('tsfc', tsfc_dir),
+        ('pyop2', pyop2_configuration['cache_dir']),
+    ])
+
+
+def set_cache_dir(path, comm=COMM_WORLD):
+    """
+    Stores the TSFC and PyOP2 disk caches in subdirectories of a directory
+
+    The corresponding environment variables are set too, so that child
+    processes use the same caches.
+
+    :arg str path: cache directory
+    :kwarg comm: MPI communicator
+    :returns: :class:`OrderedDict` of the new cache directories
+    """
+    if not hasattr(TSFCKernel, '_cachedir'):
+        raise RuntimeError(
+            'The TSFC kernel cache directory cannot be changed in this Firedrake '
+            'version. Set the {:} and {:} environment variables before starting '
+            'Python instead.'.format(*cache_env_variables.values()))
+    cache_dirs = OrderedDict((k, os.path.join(os.path.abspath(path), k))
+                             for k in cache_env_variables)
+    for k, d in cache_dirs.items():
+        create_directory(d, comm=comm)
+        os.environ[cache_env_variables[k]] = d
+    TSFCKernel._cachedir = cache_dirs['tsfc']
+    pyop2_configuration['cache_dir'] = cache_dirs['pyop2']
+    return cache_dirs
+
+
+def _count_disk_entries(path, suffix=None):
+    """Counts the files in a sharded disk cache directory"""
+    count = 0
+    if path is None or not os.path.isdir(path):
+        return count
+    for shard in os.scandir(path):
+        if shard.is_dir():
+            count += sum(1 for f in os.scandir(shard.path)
+                         if f.is_file() and (suffix is None or f.name.endswith(suffix)))
+    return count
+
+
+class CompilationCacheMonitor(object):
+    """
+    Counts the kernels created and the entries added to the compilation disk caches
+
+    Kernels created in this process since the monitor was constructed are
+    either loaded from a disk cache (hits) or compiled and added to it
+    (misses). The misses are counted as the new disk cache entries and the
+    hits as the created kernels minus the misses. The disk caches are
+    scanned on the first rank only, at construction and in :meth:`get_stats`.
+    The new disk entries equal the kernels compiled by this process only if
+    no other process writes to the same caches, e.g. when precompiling into a
+    private cache directory. Otherwise the misses are an upper bound.
+
+    .. code-block:: python
+
+        monitor = CompilationCacheMonitor()
+        solver_obj.create_equations()
+        compile_solver(solver_obj)
+        monitor.report()
+
+    """
+    def __init__(self, comm=COMM_WORLD):
+        """
+        :kwarg comm: MPI communicator
+        """
+        self.comm = comm
+        self.start = self._snapshot()
+
+    def _snapshot(self):
+        """Returns the number of kernels in the memory and disk caches"""
+        cache_dirs = get_cache_dirs()
+        disk = None
+        if self.comm.rank == 0:
+            disk = {'tsfc': _count_disk_entries(cache_dirs['tsfc']),
+                    'pyop2': _count_disk_entries(cache_dirs['pyop2'], suffix='.so')}
+        disk = self.comm.bcast(disk, root=0)
+        memory = {'tsfc': _memory_cache_size(TSFCKernel),
+                  'pyop2': _memory_cache_size(GlobalKernel)}
+        return {'memory': memory, 'disk': disk}
+
+    def get_stats(self):
+        """
+        Returns the cache statistics since the monitor was constructed
+
+        :returns: dict with keys 'tsfc' and 'pyop2', each a dict of the
+            number of 'kernels' created in this process, the number of
+            'disk_entries' added to the disk cache, and the number of cache
+            'hits' and 'misses'. The number of kernels and hits is None if
+            the memory cache of the kernels is not available.
+        """
+        end = self._snapshot()
+        stats = OrderedDict()
+        for k in cache_env_variables:
+            disk_entries = max(end['disk'][k] - self.start['disk'][k], 0)
+            kernels = hits = None
+            if end['memory'][k] is not None and self.start['memory'][k] is not None:
+                kernels = max(end['memory'][k] - self.start['memory'][k], 0)
+                hits = max(kernels - disk_entries, 0)
+            stats[k] = {
+                'kernels': kernels,
+                'disk_entries': disk_entries,
+                'hits': hits,
+                'misses': disk_entries,
+            }
+        return stats
+
+    def report(self):
+        """
+        Prints the cache statistics
+
+        :returns: the statistics, see :meth:`get_stats`
+        """
+        def fmt(value):
+            return 'n/a' if value is None else str(value)
+
+        stats = self.get_stats()
+        names = {'tsfc': 'TSFC', 'pyop2': 'PyOP2'}
+        msg = 'Compilation cache: ' + ', '.join(
+            '{:} {:} kernels {:} hits {:} misses'.format(
+                names[k], fmt(s['kernels']), fmt(s['hits']), s['misses'])
+            for k, s in stats.items())
+        print_output(msg)
+        return stats
+
+
+def _find_objects(obj, classes, found, visited):
+    """Collects the instances of classes held by Thetis objects recursively"""
+    if id(obj) in visited:
+        return
+    visited.add(id(obj))
+    if isinstance(obj, classes):
+        found.append(obj)
+        return
+    if isinstance(obj, dict):
+        children = obj.values()
+    elif isinstance(obj, (list, tuple)):
+        children = obj
+    elif type(obj).__module__.startswith('thetis'):
+        children = getattr(obj, '__dict__', {}).values()
+    else:
+        return
+    for c in children:
+        _find_objects(c, classes, found, visited)
+
+
+def _run_auxiliary_operators(solver_obj):
+    """
+    Runs the auxiliary operators of a 3D solver once
+
+    The fields and the mesh coordinates are restored afterwards.
+    """
+    from . import utility3d
+    operators = []
+    _find_objects(solver_obj, (utility3d.ExpandFunctionTo3d, utility3d.SubFunctionExtractor,
+                               utility3d.VerticalIntegrator, utility3d.Mesh3DConsistencyCalculator),
+                  operators, set())
+    mesh_updater = getattr(solver_obj, 'mesh_updater', None)
+    if not operators and mesh_updater is None:
+        return
+    functions = [f for f in solver_obj.fields.values() if isinstance(f, Function)]
+    functions.append(solver_obj.mesh.coordinates)
+    state = [f.copy(deepcopy=True) for f in functions]
+    for op in operators:
+        op.solve()
+    if mesh_updater is not None:
+        elev_2d_state = getattr(mesh_updater, '_elev_2d_state', None)
+        mesh_updater.update_elem_height()
+        if solver_obj.options.use_ale_moving_mesh:
+            mesh_updater.update_mesh_coordinates()
+            mesh_updater._elev_2d_state = elev_2d_state
+    for f, saved in zip(functions, state):
+        f.assign(saved)
+    solver_obj.mesh.clear_spatial_index()
+
+
+@PETSc.Log.EventDecorator("thetis.compile_solver")
+def compile_solver(solver_obj):
+    """
+    Compiles the kernels of all variational solvers of a solver object
+
+    The residual and Jacobian forms of all solvers held by the solver
+    object, its time steppers and its auxiliary operators are assembled
+    once, so that their kernels are compiled and stored in the disk caches.
+    The auxiliary operators of the 3D solver that run PyOP2 kernels, i.e.
+    the ALE mesh update, the element height computation and the 2D-3D
+    transfers, are run once too. The model state is not modified. Other
+    kernels that are only executed during time stepping (e.g. limiters,
+    callbacks) are not compiled.
+
+    :arg solver_obj: a :class:`.FlowSolver` or :class:`.FlowSolver2d` object
+    :returns: number of compiled variational solvers
+    """
+    if not solver_obj._initialized:
+        solver_obj.initialize()
+    solvers = []
+    _find_objects(solver_obj, NonlinearVariationalSolver, solvers, set())
+    for solver in solvers:
+        problem = solver._problem
+        ctx = solver._ctx
+        assemble(problem.F)
+        assemble(problem.J, bcs=problem.bcs, mat_type=ctx.mat_type)
+        if problem.Jp is not None:
+            assemble(problem.Jp, bcs=problem.bcs, mat_type=ctx.pmat_type)
+    if hasattr(solver_obj, 'mesh'):
+        _run_auxiliary_operators(solver_obj)
+    return len(solvers)
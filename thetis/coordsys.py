@@ -3,11 +3,30 @@ Generic methods for converting data between different spatial coordinate systems
 Uses pyproj library.
 """
 import firedrake as fd
-import pyproj
 import numpy
 from abc import ABC, abstractmethod
 
-LL_WGS84 = pyproj.Proj(proj='latlong', datum='WGS84', errcheck=True)
+_ll_wgs84 = None
+
+
+def get_ll_wgs84():
+    """
+    Returns the WGS84 longitude-latitude projection
+
+    pyproj is imported on first use. The projection is also available as
+    ``LL_WGS84``.
+    """
+    global _ll_wgs84
+    if _ll_wgs84 is None:
+        import pyproj
+        _ll_wgs84 = pyproj.Proj(proj='latlong', datum='WGS84', errcheck=True)
+    return _ll_wgs84
+
+
+def __getattr__(name):
+    if name == 'LL_WGS84':
+        return get_ll_wgs84()
+    raise AttributeError("module 'thetis.coordsys' has no attribute '{:}'".format(name))
 
 
 class CoordinateSystem(ABC):
@@ -60,12 +79,14 @@ class UTMCoordinateSystem(CoordinateSystem):
     Represents Universal Transverse Mercator coordinate systems
     """
     def __init__(self, utm_zone, south=False):
+        import pyproj
+        ll_wgs84 = get_ll_wgs84()
         self.proj_obj = pyproj.Proj(proj='utm', zone=utm_zone, datum='WGS84',
                                     units='m', errcheck=True, south=south)
         self.transformer_lonlat = pyproj.Transformer.from_crs(
-            self.proj_obj.srs, LL_WGS84.srs)
+            self.proj_obj.srs, ll_wgs84.srs)
         self.transformer_xy = pyproj.Transformer.from_crs(
-            LL_WGS84.srs, self.proj_obj.srs)
+            ll_wgs84.srs, self.proj_obj.srs)
 
     def to_lonlat(self, x, y, positive_lon=False):
         """
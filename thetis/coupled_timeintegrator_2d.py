@@ -44,6 +44,7 @@ class CoupledTimeIntegrator2D(timeintegrator.TimeIntegratorBase, ABC):
         self._initialized = False
 
         self._create_integrators()
+        self._create_schedule()
 
     def _create_integrators(self):
         """
@@ -58,14 +59,72 @@ class CoupledTimeIntegrator2D(timeintegrator.TimeIntegratorBase, ABC):
         if self.solver.options.sediment_model_options.solve_exner:
             self.timesteppers.exner = self.solver.get_exner_timestepper(self.exner_integrator)
 
+    def _create_schedule(self):
+        """
+        Sets the update interval of each time stepper
+
+        Intervals are read from :attr:`.ModelOptions2d.subcycling_intervals`,
+        in number of shallow water time steps.
+        """
+        intervals = getattr(self.options, 'subcycling_intervals', {})
+        valid_keys = ['tracer', 'sediment', 'exner'] + list(self.options.tracer_fields)
+        for key in intervals:
+            if key not in valid_keys:
+                raise ValueError('Unknown subcycled subsystem "{:}", valid keys are {:}'.format(key, valid_keys))
+        self.intervals = {}
+        for name in self.timesteppers:
+            if name in self.options.tracer_fields:
+                n = intervals.get(name, intervals.get('tracer', 1))
+            else:
+                n = intervals.get(name, 1)
+            self.intervals[name] = n
+            if n > 1:
+                print_output('  {:} updated every {:} time steps'.format(name, n))
+                self.timesteppers[name].set_dt(self.solver.dt*n)
+        self.dt = self.solver.dt
+        self.iteration = 0
+
+    def _is_due(self, name):
+        """Returns True if the given time stepper is advanced at the current iteration"""
+        return (self.iteration + 1) % self.intervals.get(name, 1) == 0
+
+    def _start_time(self, name, t):
+        """Returns the start time of the (possibly subcycled) step of a time stepper"""
+        return t - (self.intervals.get(name, 1) - 1)*self.dt
+
+    def _update_sediment_model(self):
+        """Updates the sediment model if any of its users is advanced"""
+        sediment_model = self.solver.sediment_model
+        if sediment_model is None:
+            return
+        averaging = sediment_model.average_forcing is not None
+        if averaging or self._is_due('sediment') or self._is_due('exner'):
+            sediment_model.update()
+        if averaging:
+            sediment_model.accumulate_forcing()
+
+    def _advance_sediment_and_exner(self, t, update_forcings=None):
+        """Advances the sediment and Exner equations if they are due"""
+        if self.options.sediment_model_options.solve_suspended_sediment and self._is_due('sediment'):
+            self.timesteppers.sediment.advance(self._start_time('sediment', t), update_forcings=update_forcings)
+            if self.options.use_limiter_for_tracers:
+                self.solver.tracer_limiter.apply(self.fields.sediment_2d)
+        if self.options.sediment_model_options.solve_exner and self._is_due('exner'):
+            self.timesteppers.exner.advance(self._start_time('exner', t), update_forcings=update_forcings)
+            if self.solver.sediment_model.average_forcing is not None:
+                self.solver.sediment_model.reset_forcing_average()
+
     def set_dt(self, dt):
         """
         Set time step for the coupled time integrator
 
+        Subcycled time steppers use a multiple of the time step.
+
         :arg float dt: Time step.
         """
+        self.dt = dt
         for stepper in sorted(self.timesteppers):
-            self.timesteppers[stepper].set_dt(dt)
+            self.timesteppers[stepper].set_dt(dt*self.intervals.get(stepper, 1))
 
     @PETSc.Log.EventDecorator("thetis.CoupledTimeIntegrator2D.initialize")
     def initialize(self, solution2d):
@@ -98,19 +157,16 @@ class CoupledTimeIntegrator2D(timeintegrator.TimeIntegratorBase, ABC):
             if not self.options.tracer_only:
                 self.timesteppers.swe2d.advance(t, update_forcings=update_forcings)
             for system in self.options.tracer_fields:
-                self.timesteppers[system].advance(t, update_forcings=update_forcings)
+                if not self._is_due(system):
+                    continue
+                self.timesteppers[system].advance(self._start_time(system, t), update_forcings=update_forcings)
                 if self.options.use_limiter_for_tracers:
                     if ',' in system:
                         raise NotImplementedError("Slope limiters not supported for mixed systems of tracers")
                     self.solver.tracer_limiter.apply(self.fields[system])
-            if self.solver.sediment_model is not None:
-                self.solver.sediment_model.update()
-            if self.options.sediment_model_options.solve_suspended_sediment:
-                self.timesteppers.sediment.advance(t, update_forcings=update_forcings)
-                if self.options.use_limiter_for_tracers:
-                    self.solver.tracer_limiter.apply(self.fields.sediment_2d)
-            if self.options.sediment_model_options.solve_exner:
-                self.timesteppers.exner.advance(t, update_forcings=update_forcings)
+            self._update_sediment_model()
+            self._advance_sediment_and_exner(t, update_forcings=update_forcings)
+            self.iteration += 1
 
     @PETSc.Log.EventDecorator("thetis.CoupledTimeIntegrator2D.advance_picard")
     def advance_picard(self, t, update_forcings=None):
@@ -120,19 +176,16 @@ class CoupledTimeIntegrator2D(timeintegrator.TimeIntegratorBase, ABC):
         for i in range(p):
             kwargs = {'update_lagged': i == 0, 'update_fields': i == p-1}
             for system in self.options.tracer_fields:
-                self.timesteppers[system].advance_picard(t, update_forcings=update_forcings, **kwargs)
+                if not self._is_due(system):
+                    continue
+                self.timesteppers[system].advance_picard(self._start_time(system, t), update_forcings=update_forcings, **kwargs)
                 if self.options.use_limiter_for_tracers:
                     if ',' in system:
                         raise NotImplementedError("Slope limiters not supported for mixed systems of tracers")
                     self.solver.tracer_limiter.apply(self.fields[system])
-        if self.solver.sediment_model is not None:
-            self.solver.sediment_model.update()
-        if self.options.sediment_model_options.solve_suspended_sediment:
-            self.timesteppers.sediment.advance(t, update_forcings=update_forcings)
-            if self.options.use_limiter_for_tracers:
-                self.solver.tracer_limiter.apply(self.fields.sediment_2d)
-        if self.options.sediment_model_options.solve_exner:
-            self.timesteppers.exner.advance(t, update_forcings=update_forcings)
+        self._update_sediment_model()
+        self._advance_sediment_and_exner(t, update_forcings=update_forcings)
+        self.iteration += 1
 
 
 class GeneralCoupledTimeIntegrator2D(CoupledTimeIntegrator2D):
@@ -73,13 +73,17 @@ class ExnerSourceTerm(ExnerTerm):
         porosity = fields.get('porosity')
 
         fac = Constant(morfac/(1.0-porosity))
-        H = self.depth.get_total_depth(fields_old['elev_2d'])
-
-        erosion = self.sediment_model.get_erosion_term()
-        deposition = self.sediment_model.get_deposition_coefficient() * sediment
-        if self.depth_integrated_sediment:
-            deposition = deposition/H
-        f = self.test*fac*(erosion - deposition)*self.dx
+        if self.sediment_model.average_forcing is not None:
+            source = self.sediment_model.get_averaged_source_term()
+        else:
+            H = self.depth.get_total_depth(fields_old['elev_2d'])
+
+            erosion = self.sediment_model.get_erosion_term()
+            deposition = self.sediment_model.get_deposition_coefficient() * sediment
+            if self.depth_integrated_sediment:
+                deposition = deposition/H
+            source = erosion - deposition
+        f = self.test*fac*source*self.dx
 
         return f
 
@@ -100,7 +104,10 @@ class ExnerBedloadTerm(ExnerTerm):
     def residual(self, solution, solution_old, fields, fields_old, bnd_conditions):
         f = 0
 
-        qbx, qby = self.sediment_model.get_bedload_term(solution)
+        if self.sediment_model.average_forcing is not None:
+            qbx, qby = self.sediment_model.get_averaged_bedload_term()
+        else:
+            qbx, qby = self.sediment_model.get_bedload_term(solution)
 
         morfac = fields.get('morfac')
         porosity = fields.get('porosity')
@@ -3,8 +3,13 @@ Routines for handling file exports.
 """
 from .utility import *
 from firedrake.output import is_cg
+from .hdf5_compression import compress_hdf5_file, compression_arguments  # NOQA
+from . import hdf5_compression
 from collections import OrderedDict
+import atexit
 import itertools
+import subprocess
+import sys
 
 
 def is_2d(fs):
@@ -36,6 +41,63 @@ def get_visu_space(fs):
     return visu_fs
 
 
+def get_output_dtype(precision):
+    """
+    Returns the numpy dtype for an output precision
+
+    :arg precision: 'float64' (or 'd') for double precision, 'float32' (or
+        'f') for single precision
+    """
+    dtype = numpy.dtype(precision)
+    if dtype not in (numpy.float64, numpy.float32):
+        raise ValueError('Unsupported output precision: {:}'.format(precision))
+    return dtype
+
+
+# runs the compression script without adding its directory to sys.path
+_compression_command = "import runpy, sys; runpy.run_path(sys.argv.pop(1), run_name='__main__')"
+
+_compression_processes = OrderedDict()
+"""Running compression processes of this process, filename: process"""
+
+
+def start_compression(filename, **kwargs):
+    """
+    Starts compressing an HDF5 file in a separate process
+
+    The file must not be accessed until :func:`wait_for_compression` has
+    returned.
+
+    :arg str filename: HDF5 file to compress
+    :kwarg kwargs: compression options of :func:`compress_hdf5_file`
+    """
+    filename = os.path.abspath(filename)
+    wait_for_compression(filename)
+    cmd = [sys.executable, '-c', _compression_command, hdf5_compression.__file__,
+           filename] + compression_arguments(**kwargs)
+    _compression_processes[filename] = subprocess.Popen(cmd)
+
+
+def wait_for_compression(filename=None):
+    """
+    Waits until the compression processes of this process have finished
+
+    :kwarg str filename: only wait for the given file. If None, waits for
+        all files.
+    """
+    if filename is None:
+        filenames = list(_compression_processes)
+    else:
+        filenames = [os.path.abspath(filename)]
+    for f in filenames:
+        process = _compression_processes.pop(f, None)
+        if process is not None and process.wait() != 0:
+            raise IOError('Compressing file {:} failed'.format(f))
+
+
+atexit.register(wait_for_compression)
+
+
 class ExporterBase(object):
     """
     Base class for exporter objects.
@@ -68,7 +130,8 @@ class VTKExporter(ExporterBase):
     """
     @PETSc.Log.EventDecorator("thetis.VTKExporter.__init__")
     def __init__(self, fs_visu, func_name, outputdir, filename,
-                 next_export_ix=0, project_output=False, verbose=False):
+                 next_export_ix=0, project_output=False, verbose=False,
+                 precision='float64'):
         """
         :arg fs_visu: function space where input function will be cast
             before exporting
@@ -79,12 +142,15 @@ class VTKExporter(ExporterBase):
         :kwarg bool project_output: project function to output space instead of
             interpolating
         :kwarg bool verbose: print debug info to stdout
+        :kwarg precision: precision of the stored field values, 'float64' or
+            'float32'
         """
         super(VTKExporter, self).__init__(filename, outputdir, next_export_ix,
                                           verbose)
         self.fs_visu = fs_visu
         self.func_name = func_name
         self.project_output = project_output
+        self.dtype = get_output_dtype(precision)
         suffix = '.pvd'
         path = os.path.join(outputdir, filename)
         # append suffix if missing
@@ -93,6 +159,10 @@ class VTKExporter(ExporterBase):
         path = os.path.join(path, self.filename)
         self.outfile = File(path)
         self.cast_operators = {}
+        self.output_func = None
+        if self.dtype != numpy.float64:
+            # the VTK writer stores data arrays in the dtype of the function
+            self.output_func = Function(self.fs_visu, name=self.func_name, dtype=self.dtype)
 
     def set_next_export_ix(self, next_export_ix):
         """Sets the index of next export"""
@@ -121,7 +191,11 @@ class VTKExporter(ExporterBase):
         # ensure correct output function name
         old_name = tmp_proj_func.name()
         tmp_proj_func.rename(name=self.func_name)
-        self.outfile.write(tmp_proj_func, time=self.next_export_ix)
+        if self.output_func is not None:
+            self.output_func.dat.data_with_halos[:] = tmp_proj_func.dat.data_ro_with_halos
+            self.outfile.write(self.output_func, time=self.next_export_ix)
+        else:
+            self.outfile.write(tmp_proj_func, time=self.next_export_ix)
         self.next_export_ix += 1
         # restore old name
         tmp_proj_func.rename(name=old_name)
@@ -134,7 +208,9 @@ class HDF5Exporter(ExporterBase):
     """
     @PETSc.Log.EventDecorator("thetis.HDF5Exporter.__init__")
     def __init__(self, function_space, outputdir, filename_prefix,
-                 next_export_ix=0, legacy_mode=False, verbose=False):
+                 next_export_ix=0, legacy_mode=False, verbose=False,
+                 precision='float64', compression=None, compression_opts=None,
+                 shuffle=True, chunk_size=None):
         """
         Create exporter object for given function.
 
@@ -146,11 +222,56 @@ class HDF5Exporter(ExporterBase):
         :kwarg int next_export_ix: index for next export (default 0)
         :kwarg bool legacy_mode: use legacy DumbCheckpoint format
         :kwarg bool verbose: print debug info to stdout
+        :kwarg precision: precision of the stored field values, 'float64' or
+            'float32'. The mesh is always stored in double precision. Single
+            precision is not supported in legacy mode.
+        :kwarg str compression: compression filter, 'gzip', 'lzf' or None
+        :kwarg int compression_opts: compression level for 'gzip'
+        :kwarg bool shuffle: apply the shuffle filter before compression
+        :kwarg int chunk_size: number of rows per chunk, chosen automatically
+            if None
+
+        The PETSc HDF5 viewer does not support compression. Compressed files
+        are written uncompressed first and then rewritten with
+        :func:`compress_hdf5_file` in a separate process on the first rank,
+        while the time loop continues. Each exporter compresses one file at a
+        time: the next export waits until the previous file is compressed.
         """
         super(HDF5Exporter, self).__init__(filename_prefix, outputdir,
                                            next_export_ix, verbose)
         self.function_space = function_space
         self.dumb_checkpoint = legacy_mode
+        self.dtype = get_output_dtype(precision)
+        if self.dumb_checkpoint and self.dtype != numpy.float64:
+            raise ValueError('Single precision output is not supported in legacy mode')
+        self.compression = compression
+        self.compression_kwargs = {
+            'compression': compression,
+            'compression_opts': compression_opts if compression == 'gzip' else None,
+            'shuffle': shuffle,
+            'chunk_size': chunk_size,
+        }
+        self.compressed_filename = None
+
+    def _compress(self, filename, comm):
+        """Starts compressing a written file on the first process"""
+        if comm.rank == 0:
+            if self.compressed_filename is not None:
+                wait_for_compression(self.compressed_filename)
+            start_compression(filename, **self.compression_kwargs)
+        self.compressed_filename = filename
+
+    def wait(self):
+        """
+        Waits until the exported files have been compressed
+
+        Must be called on all processes.
+        """
+        comm = self.function_space.mesh().comm
+        if comm.rank == 0 and self.compressed_filename is not None:
+            wait_for_compression(self.compressed_filename)
+        self.compressed_filename = None
+        comm.barrier()
 
     def gen_filename(self, iexport):
         """
@@ -175,6 +296,11 @@ class HDF5Exporter(ExporterBase):
         filename = self.gen_filename(iexport)
         if self.verbose:
             print_output('saving {:} state to {:}'.format(function.name(), filename))
+        if self.compression is not None:
+            # the file may still be compressed from an earlier export
+            if function.comm.rank == 0:
+                wait_for_compression(filename)
+            function.comm.barrier()
         if self.dumb_checkpoint:
             with DumbCheckpoint(filename, mode=FILE_CREATE, comm=function.comm) as f:
                 f.store(function)
@@ -182,7 +308,18 @@ class HDF5Exporter(ExporterBase):
             with CheckpointFile(filename, 'w') as f:
                 mesh = function.function_space().mesh()
                 f.save_mesh(mesh)
+                if self.dtype == numpy.float32:
+                    # store field values in single precision, converted
+                    # back to double precision on load
+                    prefix = 'thetis_export_'
+                    opts = PETSc.Options(prefix)
+                    opts['viewer_hdf5_sp_output'] = True
+                    f.viewer.setOptionsPrefix(prefix)
+                    f.viewer.setFromOptions()
+                    opts.delValue('viewer_hdf5_sp_output')
                 f.save_function(function)
+            if self.compression is not None:
+                self._compress(filename, function.comm)
         self.next_export_ix = iexport + 1
 
     @PETSc.Log.EventDecorator("thetis.HDF5Exporter.export")
@@ -209,6 +346,9 @@ class HDF5Exporter(ExporterBase):
         filename = self.gen_filename(iexport)
         if self.verbose:
             print_output('loading {:} state from {:}'.format(function.name(), filename))
+        if function.comm.rank == 0:
+            wait_for_compression(filename)
+        function.comm.barrier()
         if self.dumb_checkpoint:
             with DumbCheckpoint(filename, mode=FILE_READ, comm=function.comm) as f:
                 f.load(function)
@@ -240,21 +380,28 @@ class ExportManager(object):
     def __init__(self, outputdir, fields_to_export, functions, field_metadata,
                  export_type='vtk', next_export_ix=0, verbose=False,
                  legacy_mode=False,
-                 preproc_funcs={}):
+                 preproc_funcs={}, restart_fields=(), hdf5_compression=None):
         """
         :arg string outputdir: directory where files are stored
         :arg fields_to_export: list of fields to export
         :type fields_to_export: list of strings
         :arg functions: dict that contains all existing :class:`Function` s
         :arg field_metadata: dict of all field metadata.
-            See :mod:`.field_defs`
+            See :mod:`.field_defs`. The optional 'precision' entry sets the
+            output precision of the field, 'float64' (default) or 'float32'.
         :kwarg str export_type: export format, either 'vtk' or 'hdf5'
         :kwarg int next_export_ix: index for next export (default 0)
         :kwarg bool verbose: print debug info to stdout
         :kwarg bool legacy_mode: use legacy `DumbCheckpoint` hdf5 format
+        :kwarg restart_fields: fields whose hdf5 exports are used for restarting
+            a simulation. These are always stored in double precision.
+        :kwarg dict hdf5_compression: compression keyword arguments of
+            :class:`HDF5Exporter`. If None, hdf5 files are not compressed.
         """
         self.outputdir = outputdir
         self.fields_to_export = fields_to_export
+        self.restart_fields = restart_fields
+        self.hdf5_compression = hdf5_compression or {}
         # functions dict must be mutable for custom exports
         self.functions = {}
         self.functions.update(functions)
@@ -273,7 +420,7 @@ class ExportManager(object):
     def add_export(self, fieldname, function,
                    export_type='vtk', next_export_ix=0, outputdir=None,
                    shortname=None, filename=None, legacy_mode=False,
-                   preproc_func=None):
+                   preproc_func=None, precision=None):
         """
         Adds a new field exporter in the manager.
 
@@ -291,6 +438,8 @@ class ExportManager(object):
         :kwarg bool legacy_mode: use legacy `DumbCheckpoint` hdf5 format
         :kwarg preproc_func: optional funtion that will be called prior to
             exporting. E.g. for computing diagnostic fields.
+        :kwarg precision: override output precision defined in field_metadata,
+            'float64' or 'float32'
         """
         if outputdir is None:
             outputdir = self.outputdir
@@ -302,6 +451,14 @@ class ExportManager(object):
             shortname = self.field_metadata[fieldname]['shortname']
         if filename is None:
             filename = self.field_metadata[fieldname]['filename']
+        if precision is None:
+            precision = self.field_metadata.get(fieldname, {}).get('precision', 'float64')
+        compression = dict(self.hdf5_compression)
+        if export_type.lower() == 'hdf5' and fieldname in self.restart_fields:
+            precision = 'float64'
+            if compression.get('compression') == 'lzf':
+                # lzf files cannot be read by CheckpointFile
+                compression['compression'] = 'gzip'
         field = self.functions.get(fieldname)
         if preproc_func is not None:
             self.preproc_callbacks[fieldname] = preproc_func
@@ -311,18 +468,27 @@ class ExportManager(object):
             if export_type.lower() == 'vtk':
                 self.exporters[fieldname] = VTKExporter(visu_space, shortname,
                                                         outputdir, filename,
-                                                        next_export_ix=next_export_ix)
+                                                        next_export_ix=next_export_ix,
+                                                        precision=precision)
             elif export_type.lower() == 'hdf5':
                 self.exporters[fieldname] = HDF5Exporter(native_space,
                                                          outputdir, filename,
                                                          legacy_mode=legacy_mode,
-                                                         next_export_ix=next_export_ix)
+                                                         next_export_ix=next_export_ix,
+                                                         precision=precision,
+                                                         **compression)
 
     def set_next_export_ix(self, next_export_ix):
         """Set export index to all child exporters"""
         for k in self.exporters:
             self.exporters[k].set_next_export_ix(next_export_ix)
 
+    def wait(self):
+        """Waits until all exported hdf5 files have been compressed"""
+        for e in self.exporters.values():
+            if isinstance(e, HDF5Exporter):
+                e.wait()
+
     def export(self):
         """
         Export all designated functions to disk
@@ -0,0 +1,116 @@
+"""
+Compression of HDF5 files written by the PETSc HDF5 viewer.
+
+The PETSc HDF5 viewer used by :class:`CheckpointFile` cannot create chunked
+or compressed datasets. :func:`compress_hdf5_file` rewrites a file with
+compressed datasets. :class:`.HDF5Exporter` runs it in a separate process
+on the first rank, so that the compression does not delay the time loop.
+
+This module does not depend on Firedrake, so that it can be run as a
+script in a lightweight process::
+
+    python hdf5_compression.py file.h5 [--compression gzip] [--level 4]
+        [--no-shuffle] [--chunk-size N]
+"""
+import argparse
+import os
+import h5py
+
+copy_block_bytes = 32*1024**2
+"""Approximate number of bytes copied at once from each dataset"""
+
+
+def _copy_dataset(src, dst, name, compression, compression_opts, shuffle,
+                  chunk_size):
+    """Copies a numeric dataset into a compressed dataset block by block"""
+    chunks = True
+    if chunk_size is not None:
+        chunks = (min(chunk_size, src.shape[0]), ) + src.shape[1:]
+    d = dst.create_dataset(name, shape=src.shape, dtype=src.dtype,
+                           chunks=chunks, compression=compression,
+                           compression_opts=compression_opts,
+                           shuffle=shuffle)
+    d.attrs.update(src.attrs)
+    # copy whole chunk rows, at most copy_block_bytes at once
+    row_bytes = max(src.dtype.itemsize*src.size//src.shape[0], 1)
+    nrows = max(copy_block_bytes//row_bytes//d.chunks[0], 1)*d.chunks[0]
+    for i in range(0, src.shape[0], nrows):
+        d[i:i + nrows] = src[i:i + nrows]
+
+
+def compress_hdf5_file(filename, compression='gzip', compression_opts=None,
+                       shuffle=True, chunk_size=None):
+    """
+    Rewrites an HDF5 file with chunked and compressed datasets
+
+    Groups, attributes and links are copied as is. Numeric datasets with at
+    least one dimension are chunked and compressed, other datasets are copied
+    unchanged. Datasets are copied in blocks of whole chunks, so that memory
+    use is bounded by :data:`copy_block_bytes`. The file is replaced only
+    after the compressed copy is complete.
+
+    :arg str filename: HDF5 file to compress
+    :kwarg str compression: compression filter, 'gzip' or 'lzf'
+    :kwarg int compression_opts: compression level for 'gzip'
+    :kwarg bool shuffle: apply the shuffle filter before compression
+    :kwarg int chunk_size: number of rows per chunk. If None, the chunk shape
+        is chosen by h5py.
+    """
+    def copy_group(src, dst):
+        dst.attrs.update(src.attrs)
+        for name in src:
+            link = src.get(name, getlink=True)
+            if isinstance(link, (h5py.SoftLink, h5py.ExternalLink)):
+                dst[name] = link
+                continue
+            obj = src[name]
+            if isinstance(obj, h5py.Group):
+                copy_group(obj, dst.create_group(name))
+            elif obj.ndim > 0 and obj.size > 0 and obj.dtype.kind in 'iuf':
+                _copy_dataset(obj, dst, name, compression, compression_opts,
+                              shuffle, chunk_size)
+            else:
+                src.copy(obj, dst, name=name)
+
+    tmp_filename = filename + '.tmp'
+    with h5py.File(filename, 'r') as src, h5py.File(tmp_filename, 'w') as dst:
+        copy_group(src, dst)
+    os.replace(tmp_filename, filename)
+
+
+def compression_arguments(compression='gzip', compression_opts=None,
+                          shuffle=True, chunk_size=None):
+    """
+    Returns the command line arguments of the compression options
+
+    :returns: list of arguments for :func:`main`
+    """
+    args = ['--compression', compression]
+    if compression_opts is not None:
+        args += ['--level', str(compression_opts)]
+    if not shuffle:
+        args.append('--no-shuffle')
+    if chunk_size is not None:
+        args += ['--chunk-size', str(chunk_size)]
+    return args
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compress HDF5 files in place')
+    parser.add_argument('filename', nargs='+', help='HDF5 files to compress')
+    parser.add_argument('--compression', default='gzip', choices=['gzip', 'lzf'],
+                        help='compression filter')
+    parser.add_argument('--level', type=int, help='gzip compression level')
+    parser.add_argument('--no-shuffle', action='store_true',
+                        help='do not apply the shuffle filter')
+    parser.add_argument('--chunk-size', type=int, help='number of rows per chunk')
+    args = parser.parse_args(argv)
+    for f in args.filename:
+        compress_hdf5_file(f, compression=args.compression,
+                           compression_opts=args.level,
+                           shuffle=not args.no_shuffle,
+                           chunk_size=args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
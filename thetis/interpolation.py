@@ -38,19 +38,17 @@ Usage:
     simulation_time = 3600.
     wrf_atm.set_fields(simulation_time)
 """
+import datetime
 import glob
 import os
-from .timezone import *
+from .timezone import epoch, FixedTimeZone, datetime_to_epoch, epoch_to_datetime  # NOQA
 from .log import *
-import scipy.spatial.qhull as qhull
-import netCDF4
 from abc import ABC, abstractmethod
 from firedrake import *
 from firedrake.petsc import PETSc
 import re
 import string
 import numpy
-import cftime
 
 TIMESEARCH_TOL = 1e-6
 
@@ -187,6 +185,7 @@ class GridInterpolator(object):
             ngrid_xyz = grid_xyz
             ntarget_xyz = target_xyz
 
+        import scipy.spatial.qhull as qhull
         self.cannot_interpolate = False
         try:
             d = ngrid_xyz.shape[1]
@@ -294,6 +293,7 @@ class NetCDFTimeSeriesReader(FileTreeReader):
         :arg int time_index: time index to read
         :return: a float or numpy.array_like value
         """
+        import netCDF4
         assert os.path.isfile(filename), 'File not found: {:}'.format(filename)
         with netCDF4.Dataset(filename) as ncfile:
             if self.time_dim is None:
@@ -309,6 +309,7 @@ def _get_subset_nodes(grid_x, grid_y, target_x, target_y):
     """
     Retuns grid nodes that are necessary for intepolating onto target_x,y
     """
+    import scipy.spatial.qhull as qhull
     orig_shape = grid_x.shape
     grid_xy = numpy.array((grid_x.ravel(), grid_y.ravel())).T
     target_xy = numpy.array((target_x.ravel(), target_y.ravel())).T
@@ -452,6 +453,7 @@ class NetCDFLatLonInterpolator2d(SpatialInterpolator2d):
         :arg int itime: time index to read
         :returns: list of numpy.arrays corresponding to variable_list
         """
+        import netCDF4
         with netCDF4.Dataset(nc_filename, 'r') as ncfile:
             if not self._initialized:
                 name_lat = get_ncvar_name(
@@ -532,6 +534,8 @@ class NetCDFTimeParser(TimeParser):
         :kwarg bool allow_gaps: if False, an error is raised if time step is
             not constant.
         """
+        import netCDF4
+        import cftime
         self.filename = filename
         self.time_variable_name = time_variable_name
 
@@ -541,7 +545,7 @@ class NetCDFTimeParser(TimeParser):
             """
             d = cftime.num2pydate(time, units, calendar)
             if d.tzinfo is None:
-                d = pytz.utc.localize(d)  # assume UTC
+                d = d.replace(tzinfo=datetime.timezone.utc)  # assume UTC
             return d
 
         with netCDF4.Dataset(filename) as d:
@@ -691,7 +695,7 @@ class DailyFileTimeSearch(TimeSearch):
     """
     @PETSc.Log.EventDecorator("thetis.DailyFileTimeSearch.__init__")
     def __init__(self, file_pattern, init_date, verbose=False,
-                 center_hour=12, center_timezone=pytz.utc):
+                 center_hour=12, center_timezone=datetime.timezone.utc):
         self.file_pattern = file_pattern
 
         self.init_date = init_date
@@ -1,6 +1,11 @@
 import firedrake as fd
 from firedrake.adjoint import *
+from pyadjoint import AdjFloat, Block
+from pyadjoint.enlisting import Enlist
+from pyadjoint.tape import annotate_tape
+from mpi4py import MPI
 import ufl
+from .callback import DiagnosticCallback
 from .configuration import FrozenHasTraits
 from .solver2d import FlowSolver2d
 from .utility import create_directory, print_function_value_range, get_functionspace, unfrozen
@@ -10,21 +15,169 @@ from .exporter import HDF5Exporter
 import abc
 import numpy
 import h5py
-from scipy.interpolate import interp1d
+from scipy.spatial import cKDTree
 import time as time_mod
 import os
 
 
+class ValueRecorderBlock(Block):
+    """
+    Tape block that passes the value of its dependency to a callable.
+
+    The callable is invoked whenever the tape is recomputed. Values that
+    are evaluated during the forward run thus remain accessible even if
+    adjoint checkpointing has discarded the intermediate tape values.
+    """
+    def __init__(self, obj, recorder, ad_block_tag=None):
+        """
+        :arg obj: the overloaded object (e.g. :class:`Function` or
+            :class:`AdjFloat`) whose value is recorded
+        :arg recorder: callable that takes the value of `obj` as an argument
+        :kwarg ad_block_tag: tag for the block
+        """
+        super().__init__(ad_block_tag=ad_block_tag)
+        self.recorder = recorder
+        self.add_dependency(obj)
+        self.add_output(AdjFloat(0.0).create_block_variable())
+
+    def recompute_component(self, inputs, block_variable, idx, prepared):
+        self.recorder(inputs[0])
+        return AdjFloat(0.0)
+
+
+def record_value(obj, recorder, ad_block_tag=None):
+    """
+    Pass the value of `obj` to `recorder` now and on every tape recompute.
+
+    :arg obj: the overloaded object whose value is recorded
+    :arg recorder: callable that takes the value of `obj` as an argument
+    :kwarg ad_block_tag: tag for the tape block
+    """
+    recorder(obj)
+    if annotate_tape():
+        block = ValueRecorderBlock(obj, recorder, ad_block_tag=ad_block_tag)
+        get_working_tape().add_block(block)
+
+
+class EndTimestepCallback(DiagnosticCallback):
+    """
+    Marks the end of a time step on the adjoint tape.
+
+    Required by the checkpointing schedules of the adjoint solver.
+    """
+    name = 'end timestep'
+    variable_names = []
+
+    def __init__(self, solver_obj):
+        super().__init__(solver_obj, export_to_hdf5=False, append_to_log=False)
+
+    def __call__(self):
+        if annotate_tape():
+            get_working_tape().end_timestep()
+        return ()
+
+    def message_str(self, *args):
+        return ''
+
+
+class EnsembleSumReducedFunctional(ReducedFunctional):
+    """
+    A :class:`ReducedFunctional` whose value and gradient are summed over
+    the members of an :class:`Ensemble`.
+
+    Each ensemble member records its own scenario (e.g. a different forcing
+    or observation window) on the spatial communicator, using the same
+    controls. The optimiser sees the sum of the cost functions and the sum
+    of the gradients over all members.
+
+    Unlike :class:`firedrake.adjoint.EnsembleReducedFunctional`, which wraps
+    a separate local :class:`ReducedFunctional`, this class is itself a
+    :class:`ReducedFunctional` on the local tape. It therefore accepts the
+    same keyword arguments, e.g. the `derivative_cb_post` callback that
+    :class:`InversionManager` uses to stash the optimization progress, and
+    the callbacks receive the ensemble sums.
+
+    Only :class:`Function` controls are supported.
+    """
+    def __init__(self, functional, controls, ensemble, **kwargs):
+        """
+        :arg functional: the local cost function of this ensemble member
+        :arg controls: list of :class:`Control` objects
+        :arg ensemble: the :class:`Ensemble` object
+        :kwarg kwargs: any additional keyword arguments to pass to the
+            :class:`ReducedFunctional` class
+        """
+        self.ensemble = ensemble
+        derivative_cb_post = kwargs.pop('derivative_cb_post', lambda j, djdm, m: djdm)
+
+        def ensemble_derivative_cb(j, djdm, m):
+            return derivative_cb_post(self.ensemble_sum(j), self.ensemble_sum_derivative(djdm), m)
+
+        super().__init__(functional, controls, derivative_cb_post=ensemble_derivative_cb, **kwargs)
+
+    def ensemble_sum(self, value):
+        """
+        Sum a scalar value over all ensemble members.
+        """
+        return self.ensemble.ensemble_comm.allreduce(float(value), op=MPI.SUM)
+
+    def ensemble_sum_derivative(self, djdm):
+        """
+        Sum gradient :class:`Function` (or a list thereof) over all ensemble members.
+        """
+        djdm = Enlist(djdm)
+        djdm_sum = []
+        for f in djdm:
+            if not isinstance(f, fd.Function):
+                raise NotImplementedError('Ensemble mode only supports Function controls')
+            f_sum = fd.Function(f.function_space(), name=f.name())
+            self.ensemble.allreduce(f, f_sum)
+            djdm_sum.append(f_sum)
+        return djdm.delist(djdm_sum)
+
+    def __call__(self, values):
+        return self.ensemble_sum(super().__call__(values))
+
+
 class InversionManager(FrozenHasTraits):
     """
     Class for handling inversion problems and stashing
     the progress of the associated optimization routines.
+
+    By default the whole forward run is stored on the adjoint tape. For long
+    simulations the tape can be checkpointed instead, by setting
+    `checkpoint_schedule` to
+
+    * `'revolve'`: binomial checkpointing with `nb_checkpoints_in_ram`
+      checkpoints in memory,
+    * `'multistage'`: binomial checkpointing with `nb_checkpoints_in_ram`
+      checkpoints in memory and `nb_checkpoints_on_disk` checkpoints on disk,
+    * `'memory'`: store the forward data of every time step in memory,
+    * `'disk'`: store the forward data of every time step on disk.
+
+    Checkpointing must be enabled before any operation is recorded on the
+    tape, so the :class:`InversionManager` must be created before the
+    solver is set up. The checkpointing schedules that use disk storage
+    additionally require that the mesh is created with
+    :func:`checkpointable_mesh`.
+
+    Several independent scenarios can be evaluated in parallel by passing an
+    :class:`Ensemble` object. Each ensemble member sets up its own mesh and
+    solver on `ensemble.comm`, runs one scenario and registers the same
+    controls. The cost functions and gradients are summed over all members
+    (see :class:`EnsembleSumReducedFunctional`). Optimization progress is only
+    stored by the first ensemble member, whereas station time series are
+    stored by each member in a separate file (see
+    :meth:`StationObservationManager.dump_time_series`).
     """
 
     @unfrozen
     def __init__(self, sta_manager, output_dir='outputs', no_exports=False, real=False,
                  penalty_parameters=[], cost_function_scaling=None,
-                 test_consistency=True, test_gradient=True):
+                 test_consistency=True, test_gradient=True,
+                 checkpoint_schedule=None, nb_timesteps=None,
+                 nb_checkpoints_in_ram=None, nb_checkpoints_on_disk=0,
+                 checkpoint_directory=None, ensemble=None):
         """
         :arg sta_manager: the :class:`StationManager` instance
         :kwarg output_dir: model output directory
@@ -38,16 +191,30 @@ class InversionManager(FrozenHasTraits):
             which the :class:`ReducedFunctional` can recompute values
         :kwarg test_gradient: toggle testing the correctness with
             which the :class:`ReducedFunctional` can recompute gradients
+        :kwarg checkpoint_schedule: adjoint checkpointing schedule, one of
+            `None`, `'revolve'`, `'multistage'`, `'memory'` or `'disk'`
+        :kwarg nb_timesteps: number of time steps in the forward run.
+            Required by the `'revolve'` and `'multistage'` schedules.
+        :kwarg nb_checkpoints_in_ram: number of checkpoints stored in memory
+        :kwarg nb_checkpoints_on_disk: number of checkpoints stored on disk
+        :kwarg checkpoint_directory: directory for disk checkpoints. By
+            default a temporary directory is used.
+        :kwarg ensemble: optional :class:`Ensemble` for evaluating several
+            scenarios in parallel
         """
         assert isinstance(sta_manager, StationObservationManager)
         self.sta_manager = sta_manager
         self.reg_manager = None
         self.output_dir = output_dir
+        self.ensemble = ensemble
+        self.is_main_member = ensemble is None or ensemble.ensemble_comm.rank == 0
         self.no_exports = no_exports or real
         self.real = real
         self.penalty_parameters = penalty_parameters
         self.cost_function_scaling = cost_function_scaling or fd.Constant(1.0)
         self.sta_manager.cost_function_scaling = self.cost_function_scaling
+        if ensemble is not None:
+            self.sta_manager.ensemble_member = ensemble.ensemble_comm.rank
         self.test_consistency = test_consistency
         self.test_gradient = test_gradient
         self.outfiles_m = []
@@ -72,8 +239,68 @@ class InversionManager(FrozenHasTraits):
         self.control_coeff_list = []
         self.control_list = []
 
+        self.checkpoint_schedule = checkpoint_schedule
+        self.nb_timesteps = nb_timesteps
+        self.nb_checkpoints_in_ram = nb_checkpoints_in_ram
+        self.nb_checkpoints_on_disk = nb_checkpoints_on_disk
+        self.checkpoint_directory = checkpoint_directory
+        if self.checkpoint_schedule is not None:
+            self.enable_checkpointing()
+
+    def enable_checkpointing(self):
+        """
+        Enable checkpointing of the adjoint tape.
+
+        Called on initialization if :attr:`checkpoint_schedule` is set.
+        """
+        from checkpoint_schedules import (
+            Revolve, MultistageCheckpointSchedule,
+            SingleMemoryStorageSchedule, SingleDiskStorageSchedule)
+
+        tape = get_working_tape()
+        if len(tape.get_blocks()) > 0:
+            raise ValueError(
+                'Checkpointing must be enabled before any operation is '
+                'recorded on the tape: create the InversionManager before '
+                'setting up the solver.')
+        name = self.checkpoint_schedule
+        if name in ['revolve', 'multistage']:
+            if self.nb_timesteps is None:
+                raise ValueError(f'nb_timesteps must be set for the {name} checkpointing schedule')
+            if self.nb_checkpoints_in_ram is None:
+                raise ValueError(f'nb_checkpoints_in_ram must be set for the {name} checkpointing schedule')
+        if name == 'revolve':
+            schedule = Revolve(self.nb_timesteps, self.nb_checkpoints_in_ram)
+        elif name == 'multistage':
+            schedule = MultistageCheckpointSchedule(
+                self.nb_timesteps, self.nb_checkpoints_in_ram, self.nb_checkpoints_on_disk)
+        elif name == 'memory':
+            schedule = SingleMemoryStorageSchedule()
+        elif name == 'disk':
+            schedule = SingleDiskStorageSchedule()
+        else:
+            raise ValueError(f'Unknown checkpointing schedule {name}')
+        if name == 'disk' or (name == 'multistage' and self.nb_checkpoints_on_disk > 0):
+            enable_disk_checkpointing(dirname=self.checkpoint_directory)
+        tape.enable_checkpointing(schedule)
+
+    def ensemble_sum(self, value):
+        """
+        Sum a scalar value over all ensemble members, if any.
+        """
+        if self.ensemble is None:
+            return value
+        return self.ensemble.ensemble_comm.allreduce(float(value), op=MPI.SUM)
+
+    @property
+    def export_progress(self):
+        """
+        Whether this process stores the optimization progress to disk.
+        """
+        return not self.no_exports and self.is_main_member
+
     def initialize(self):
-        if not self.no_exports:
+        if self.export_progress:
             if self.real:
                 raise ValueError("Exports are not supported in Real mode.")
             create_directory(self.output_dir)
@@ -95,7 +322,7 @@ class InversionManager(FrozenHasTraits):
         """
         self.control_coeff_list.append(f)
         self.control_list.append(Control(f))
-        if isinstance(f, fd.Function) and not self.no_exports:
+        if isinstance(f, fd.Function) and self.export_progress:
             j = len(self.control_coeff_list) - 1
             prefix = f'control_{j:02d}'
             self.control_exporters.append(
@@ -119,11 +346,10 @@ class InversionManager(FrozenHasTraits):
         self.dJdm_list = djdm_list
         self.m_list = m_list
 
-        tape = get_working_tape()
-        reg_blocks = tape.get_blocks(tag="reg_eval")
-        self.J_reg = sum([b.get_outputs()[0].saved_output for b in reg_blocks])
-        misfit_blocks = tape.get_blocks(tag="misfit_eval")
-        self.J_misfit = sum([b.get_outputs()[0].saved_output for b in misfit_blocks])
+        self.J_reg = 0
+        if self.reg_manager is not None:
+            self.J_reg = self.ensemble_sum(sum(self.reg_manager.values))
+        self.J_misfit = self.ensemble_sum(sum(self.sta_manager.misfit_values))
 
     def start_clock(self):
         self.tic = time_mod.perf_counter()
@@ -163,7 +389,7 @@ class InversionManager(FrozenHasTraits):
         self.J_misfit_progress.append(self.J_misfit)
         self.dJdm_progress.append(djdm)
         comm = self.control_coeff_list[0].comm
-        if comm.rank == 0 and not self.no_exports:
+        if comm.rank == 0 and self.export_progress:
             if self.real:
                 numpy.save(f'{self.output_dir}/m_progress', self.m_progress)
             numpy.save(f'{self.output_dir}/J_progress', self.J_progress)
@@ -178,7 +404,7 @@ class InversionManager(FrozenHasTraits):
                      f'J={self.J:.3e}, dJdm={djdm}, '
                      f'grad_ev={self.nb_grad_evals}, duration {elapsed}')
 
-        if not self.no_exports:
+        if self.export_progress:
             # control output
             for j in range(len(self.control_coeff_list)):
                 m = self.m_list[j]
@@ -246,6 +472,9 @@ class InversionManager(FrozenHasTraits):
             self.J_reg = self.reg_manager.eval_cost_function()
         self.J = self.J_reg
 
+        if self.checkpoint_schedule is not None:
+            solver_obj.add_callback(EndTimestepCallback(solver_obj), eval_interval='timestep')
+
         if weight_by_variance:
             var = fd.Function(self.sta_manager.fs_points_0d)
             for i, j in enumerate(self.sta_manager.local_station_index):
@@ -265,7 +494,11 @@ class InversionManager(FrozenHasTraits):
         Create a Pyadjoint :class:`ReducedFunctional` for the optimization.
         """
         if self.Jhat is None:
-            self.Jhat = ReducedFunctional(self.J, self.control_list, **self.rf_kwargs)
+            if self.ensemble is None:
+                self.Jhat = ReducedFunctional(self.J, self.control_list, **self.rf_kwargs)
+            else:
+                self.Jhat = EnsembleSumReducedFunctional(
+                    self.J, self.control_list, self.ensemble, **self.rf_kwargs)
         return self.Jhat
 
     def stop_annotating(self):
@@ -322,8 +555,9 @@ class InversionManager(FrozenHasTraits):
         """
         print_output("Running consistency test")
         J = self.reduced_functional(self.control_coeff_list)
-        if not numpy.isclose(J, self.J):
-            raise ValueError(f"Consistency test failed (expected {self.J}, got {J})")
+        J_expected = self.ensemble_sum(self.J)
+        if not numpy.isclose(J, J_expected):
+            raise ValueError(f"Consistency test failed (expected {J_expected}, got {J})")
         print_output("Consistency test passed!")
 
     def taylor_test(self):
@@ -367,12 +601,17 @@ class StationObservationManager:
         self.output_directory = output_directory
         # keep observation time series in memory
         self.obs_func_list = []
-        # keep model time series in memory during optimization progress
-        self.station_value_progress = []
         # model time when cost function was evaluated
         self.simulation_time = []
+        # model values at the stations, one entry per cost function evaluation
+        self.model_values = []
+        # misfit terms, one entry per cost function evaluation
+        self.misfit_values = []
         self.model_observation_field = None
+        # index of the ensemble member, if any, included in the file names
+        self.ensemble_member = None
         self.initialized = False
+        self._progress_file_initialized = False
 
     def register_observation_data(self, station_names, variable, time,
                                   values, x, y, start_times=None, end_times=None):
@@ -454,15 +693,21 @@ class StationObservationManager:
         Indicate which stations are in use at the current time.
 
         An entry of unity indicates use, whereas zero indicates disuse.
+        The indicator field is only updated if the set of active stations
+        has changed since the previous call.
         """
         if not hasattr(self, 'obs_start_times'):
             self.construct_evaluator()
-        in_use = fd.Function(self.fs_points_0d)
-        in_use.dat.data[:] = numpy.array(
-            numpy.bitwise_and(
-                self.obs_start_times <= t, t <= self.obs_end_times
-            ), dtype=float)
-        self.indicator_0d.assign(in_use)
+        # NOTE the global station list is known on all processes, so all of
+        # them take the same branch here
+        in_use = numpy.bitwise_and(
+            numpy.asarray(self._start_times) <= t, t <= numpy.asarray(self._end_times))
+        if self._stations_in_use is not None and numpy.array_equal(in_use, self._stations_in_use):
+            return
+        self._stations_in_use = in_use
+        indicator = fd.Function(self.fs_points_0d)
+        indicator.dat.data[:] = numpy.array(in_use[self.local_station_index], dtype=float)
+        self.indicator_0d.assign(indicator)
 
     def construct_evaluator(self):
         """
@@ -475,60 +720,98 @@ class StationObservationManager:
         self.obs_values_0d = fd.Function(self.fs_points_0d, name='observations')
         self.mod_values_0d = fd.Function(self.fs_points_0d, name='model values')
         self.indicator_0d = fd.Function(self.fs_points_0d, name='station use indicator')
-        self.indicator_0d.assign(1.0)
+        self._stations_in_use = None
         self.cost_function_scaling_0d = fd.Constant(0.0, domain=mesh0d)
-        self.cost_function_scaling_0d.assign(self.cost_function_scaling)
         self.station_weight_0d = fd.Function(self.fs_points_0d, name='station-wise weighting')
-        self.station_weight_0d.assign(1.0)
-        interp_kw = {}
-        if numpy.isfinite(self._start_times).any() or numpy.isfinite(self._end_times).any():
-            interp_kw.update({'bounds_error': False, 'fill_value': 0.0})
-
-        # Construct timeseries interpolator
-        self.station_interpolators = []
-        self.local_station_index = []
-        for i in range(self.fs_points_0d.dof_dset.size):
-            # loop over local DOFs and match coordinates to observations
-            # NOTE this must be done manually as VertexOnlyMesh reorders points
-            x_mesh, y_mesh = mesh0d.coordinates.dat.data[i, :]
-            xy_diff = xy - numpy.array([x_mesh, y_mesh])
-            xy_dist = numpy.sqrt(xy_diff[:, 0]**2 + xy_diff[:, 1]**2)
-            j = numpy.argmin(xy_dist)
-            self.local_station_index.append(j)
-
+        # NOTE initial values are not annotated so that the evaluator can be
+        # constructed before adjoint checkpointing is enabled
+        with stop_annotating():
+            self.indicator_0d.assign(1.0)
+            self.cost_function_scaling_0d.assign(self.cost_function_scaling)
+            self.station_weight_0d.assign(1.0)
+        self._fill_out_of_bounds = \
+            numpy.isfinite(self._start_times).any() or numpy.isfinite(self._end_times).any()
+
+        # match local DOFs to observations with a single nearest point query
+        # NOTE this must be done manually as VertexOnlyMesh reorders points
+        xy_mesh = mesh0d.coordinates.dat.data_ro.reshape(-1, 2)
+        _, ix = cKDTree(xy).query(xy_mesh)
+        self.local_station_index = ix
+        bad = numpy.flatnonzero(~numpy.isclose(xy[ix, :], xy_mesh).all(axis=1))
+        if len(bad) > 0:
+            i = bad[0]
+            j = ix[i]
             x, y = xy[j, :]
-            t = self.observation_time[j]
-            v = self.observation_values[j]
-            x_mesh, y_mesh = mesh0d.coordinates.dat.data[i, :]
-
+            x_mesh, y_mesh = xy_mesh[i, :]
             msg = 'bad station location ' \
                 f'{j} {i} {x} {x_mesh} {y} {y_mesh} {x-x_mesh} {y-y_mesh}'
-            assert numpy.allclose([x, y], [x_mesh, y_mesh]), msg
-            # create temporal interpolator
-            ip = interp1d(t, v, **interp_kw)
-            self.station_interpolators.append(ip)
+            raise AssertionError(msg)
+
+        # store observation time series as padded (nstations, ntimes) arrays
+        nb_obs = numpy.array([len(self.observation_time[j]) for j in ix], dtype=int)
+        max_nb_obs = max(nb_obs.max(initial=0), 1)
+        self._obs_time = numpy.full((len(ix), max_nb_obs), numpy.inf)
+        self._obs_values = numpy.zeros((len(ix), max_nb_obs))
+        for i, j in enumerate(ix):
+            self._obs_time[i, :nb_obs[i]] = self.observation_time[j]
+            self._obs_values[i, :nb_obs[i]] = self.observation_values[j]
+        self._obs_last_index = numpy.maximum(nb_obs - 1, 0)
+        # index of the left end point of the current interpolation interval
+        self._obs_cursor = numpy.zeros(len(ix), dtype=int)
+        # ranks of the observation times among all distinct times, offset
+        # per station so that a single sorted array holds all stations
+        self._obs_time_union = numpy.unique(self._obs_time[numpy.isfinite(self._obs_time)])
+        nb_union = len(self._obs_time_union)
+        ranks = numpy.searchsorted(self._obs_time_union, self._obs_time)
+        self._obs_rank_offset = numpy.arange(len(ix), dtype=numpy.int64)*(nb_union + 1)
+        self._obs_rank_flat = (ranks + self._obs_rank_offset[:, numpy.newaxis]).ravel()
 
         # Process start and end times for observations
-        self.obs_start_times = numpy.array([
-            self._start_times[i] for i in self.local_station_index
-        ])
-        self.obs_end_times = numpy.array([
-            self._end_times[i] for i in self.local_station_index
-        ])
+        self.obs_start_times = numpy.asarray(self._start_times)[ix]
+        self.obs_end_times = numpy.asarray(self._end_times)[ix]
 
         # expressions for cost function
         self.misfit_expr = self.obs_values_0d - self.mod_values_0d
         self.initialized = True
 
+    def _update_observation_cursor(self, t):
+        """
+        Find the interpolation interval of each station at time `t`.
+
+        The left end point is the last observation time before `t`, but
+        not the last observation of the station. All stations are searched
+        at once with a binary search over the time ranks.
+        """
+        rank = numpy.searchsorted(self._obs_time_union, t)
+        nb_before = numpy.searchsorted(self._obs_rank_flat, rank + self._obs_rank_offset)
+        nb_before -= numpy.arange(self._obs_time.shape[0])*self._obs_time.shape[1]
+        numpy.clip(nb_before - 1, 0, numpy.maximum(self._obs_last_index - 1, 0), out=self._obs_cursor)
+
     def eval_observation_at_time(self, t):
         """
         Evaluate observation time series at the given time.
 
+        All stations are linearly interpolated in time at once.
+
         :arg t: model simulation time
-        :returns: list of observation time series values at time `t`
+        :returns: array of observation time series values at time `t`
         """
         self.update_stations_in_use(t)
-        return [float(ip(t)) for ip in self.station_interpolators]
+        self._update_observation_cursor(t)
+        rows = numpy.arange(self._obs_time.shape[0])
+        i0 = self._obs_cursor
+        i1 = numpy.minimum(i0 + 1, self._obs_last_index)
+        t0, t1 = self._obs_time[rows, i0], self._obs_time[rows, i1]
+        v0, v1 = self._obs_values[rows, i0], self._obs_values[rows, i1]
+        dt = numpy.where(t1 > t0, t1 - t0, 1.0)
+        values = v0 + (t - t0)/dt*(v1 - v0)
+        out_of_bounds = numpy.logical_or(
+            t < self._obs_time[:, 0], t > self._obs_time[rows, self._obs_last_index])
+        if out_of_bounds.any():
+            if not self._fill_out_of_bounds:
+                raise ValueError(f'Time {t} is outside the observation time series.')
+            values[out_of_bounds] = 0.0
+        return values
 
     def eval_cost_function(self, t):
         """
@@ -538,7 +821,10 @@ class StationObservationManager:
         """
         assert self.initialized, 'Not initialized, call construct_evaluator first.'
         assert self.model_observation_field is not None, 'Model field not set.'
+        index = len(self.simulation_time)
         self.simulation_time.append(t)
+        self.model_values.append(None)
+        self.misfit_values.append(0.0)
         # evaluate observations at simulation time and stash the result
         obs_func = fd.Function(self.fs_points_0d)
         obs_func.dat.data[:] = self.eval_observation_at_time(t)
@@ -549,6 +835,16 @@ class StationObservationManager:
         self.mod_values_0d.interpolate(self.model_observation_field, ad_block_tag='observation')
         s = self.cost_function_scaling_0d * self.indicator_0d * self.station_weight_0d
         self.J_misfit = fd.assemble(s * self.misfit_expr ** 2 * fd.dx, ad_block_tag='misfit_eval')
+
+        # record the values whenever the tape is recomputed
+        def record_model_values(f):
+            self.model_values[index] = f.dat.data_ro.copy()
+
+        def record_misfit(j):
+            self.misfit_values[index] = float(j)
+
+        record_value(self.mod_values_0d, record_model_values, ad_block_tag='observation_record')
+        record_value(self.J_misfit, record_misfit, ad_block_tag='misfit_record')
         return self.J_misfit
 
     def dump_time_series(self):
@@ -556,41 +852,55 @@ class StationObservationManager:
         Stores model time series to disk.
 
         Obtains station time series from the last optimization iteration,
-        and stores the data to disk.
+        and appends the data to the output file.
 
-        The output files are have the format
-        `{odir}/diagnostic_timeseries_progress_{station_name}_{variable}.hdf5`
+        The output file has the format
+        `{odir}/diagnostic_timeseries_progress_{variable}.hdf5`, or
+        `{odir}/diagnostic_timeseries_progress_{variable}_member{index}.hdf5`
+        if the cost function is evaluated by an ensemble.
 
         The file contains the simulation time in the `time` array, and the
-        station name and coordinates as attributes. The time series data is
-        stored as a 2D (n_iterations, n_time_steps) array.
+        station names and coordinates in the `station_names`, `x` and `y`
+        arrays. The time series data is stored as a 3D (n_iterations,
+        n_stations, n_time_steps) array, which is extended by one iteration
+        on each call.
         """
         assert self.station_names is not None
 
         create_directory(self.output_directory)
-        tape = get_working_tape()
-        blocks = tape.get_blocks(tag='observation')
-        ts_data = [b.get_outputs()[0].saved_output.dat.data for b in blocks]
-        # shape (ntimesteps, nstations)
-        ts_data = numpy.array(ts_data)
-        # append
-        self.station_value_progress.append(ts_data)
+        comm = self.mesh.comm
+        # shape (nlocalstations, ntimesteps)
+        ts_data = numpy.array(self.model_values).reshape(
+            (len(self.model_values), len(self.local_station_index))).T
+        gathered = comm.gather((self.local_station_index, ts_data), root=0)
+        if comm.rank != 0:
+            return
+        nb_stations = len(self.station_names)
+        nb_timesteps = len(self.simulation_time)
+        values = numpy.full((nb_stations, nb_timesteps), numpy.nan)
+        for station_index, data in gathered:
+            values[station_index, :] = data
         var = self.variable
-        for ilocal, iglobal in enumerate(self.local_station_index):
-            name = self.station_names[iglobal]
-            # collect time series data, shape (niters, ntimesteps)
-            ts = numpy.array([s[:, ilocal] for s in self.station_value_progress])
-            fn = f'diagnostic_timeseries_progress_{name}_{var}.hdf5'
-            fn = os.path.join(self.output_directory, fn)
+        fn = f'diagnostic_timeseries_progress_{var}'
+        if self.ensemble_member is not None:
+            fn += f'_member{self.ensemble_member}'
+        fn = f'{fn}.hdf5'
+        fn = os.path.join(self.output_directory, fn)
+        if not self._progress_file_initialized:
             with h5py.File(fn, 'w') as hdf5file:
-                hdf5file.create_dataset(var, data=ts)
+                hdf5file.create_dataset(
+                    var, (0, nb_stations, nb_timesteps),
+                    maxshape=(None, nb_stations, nb_timesteps),
+                    chunks=(1, nb_stations, nb_timesteps))
                 hdf5file.create_dataset('time', data=numpy.array(self.simulation_time))
-                attrs = {
-                    'x': self.observation_x[iglobal],
-                    'y': self.observation_y[iglobal],
-                    'location_name': name,
-                }
-                hdf5file.attrs.update(attrs)
+                hdf5file.create_dataset('station_names', data=numpy.array(self.station_names, dtype='S'))
+                hdf5file.create_dataset('x', data=numpy.array(self.observation_x))
+                hdf5file.create_dataset('y', data=numpy.array(self.observation_y))
+            self._progress_file_initialized = True
+        with h5py.File(fn, 'a') as hdf5file:
+            ds = hdf5file[var]
+            ds.resize(ds.shape[0] + 1, axis=0)
+            ds[-1, :, :] = values
 
 
 class RegularizationCalculator(abc.ABC):
@@ -613,10 +923,16 @@ class RegularizationCalculator(abc.ABC):
         # calculate mesh area (to scale the cost function)
         self.mesh_area = fd.assemble(fd.Constant(1.0, domain=self.mesh) * fd.dx)
         self.name = function.name()
+        self.value = 0.0
+
+    def _record_value(self, j):
+        self.value = float(j)
 
     def eval_cost_function(self):
         expr = self.scaling * self.regularization_expr / self.mesh_area * fd.dx
-        return fd.assemble(expr, ad_block_tag="reg_eval")
+        j = fd.assemble(expr, ad_block_tag="reg_eval")
+        record_value(j, self._record_value, ad_block_tag="reg_record")
+        return j
 
 
 class HessianRegularizationCalculator(RegularizationCalculator):
@@ -702,5 +1018,12 @@ class ControlRegularizationManager:
             for f, g in zip(function_list, gamma_list)
         ]
 
+    @property
+    def values(self):
+        """
+        Regularization term values of the latest cost function evaluation
+        """
+        return [r.value for r in self.reg_calculators]
+
     def eval_cost_function(self):
         return sum([r.eval_cost_function() for r in self.reg_calculators])
@@ -3,7 +3,6 @@ Slope limiters for discontinuous fields
 """
 from .utility import *
 from firedrake import VertexBasedLimiter
-from pyop2.profiling import timed_stage
 import numpy
 
 
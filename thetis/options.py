@@ -559,6 +559,21 @@ class NonhydrostaticModelOptions(FrozenHasTraits):
         'pc_factor_mat_solver_type': 'mumps',
         'mat_mumps_icntl_14': 200,
     }).tag(config=True)
+    reuse_poisson_preconditioner = Bool(False, help="""
+        Reuse the preconditioner of the non-hydrostatic pressure solver
+        (e.g. the LU factorization or the AMG hierarchy) across time steps.
+
+        The preconditioner is rebuilt when the total depth has changed by more
+        than `poisson_preconditioner_update_tolerance` since the previous
+        rebuild. If `ksp_type` is `preonly` it is replaced by `gmres` so that
+        the reused preconditioner is iterated to convergence. In this mode,
+        velocities in DG spaces are updated with the element-wise inverse
+        mass matrix instead of a linear solve. This mode is not annotated for
+        the adjoint.
+        """).tag(config=True)
+    poisson_preconditioner_update_tolerance = PositiveFloat(0.05, help="""
+        Relative change in total depth (in the maximum norm) that triggers a rebuild
+        of the reused non-hydrostatic pressure preconditioner""").tag(config=True)
 
 
 class CommonModelOptions(FrozenConfigurable):
@@ -665,6 +680,73 @@ class CommonModelOptions(FrozenConfigurable):
         trait=Unicode(),
         default_value=[],
         help="Fields to export in HDF5 format").tag(config=True)
+    hdf5_compression = Enum(
+        ['gzip', 'lzf'], default_value=None, allow_none=True,
+        help="""
+        Compression filter of HDF5 field exports
+
+        If None, the datasets are stored uncompressed. Otherwise each file is
+        rewritten with compressed datasets after it has been written, in a
+        separate process on the first rank, so that the time loop is not
+        delayed. The rewrite reads and writes the file once more. Files
+        compressed with 'lzf' can only be read with h5py, so fields needed for
+        restarting a simulation always use 'gzip'.
+        """).tag(config=True)
+    hdf5_compression_level = BoundedInteger(
+        4, bounds=[0, 9], help="gzip compression level of HDF5 field exports").tag(config=True)
+    hdf5_shuffle = Bool(
+        True, help="Apply the shuffle filter before compressing HDF5 field exports").tag(config=True)
+    hdf5_chunk_size = PositiveInteger(
+        None, allow_none=True, help="""
+        Number of rows per chunk in compressed HDF5 field exports
+
+        If None, the chunk shape is chosen automatically.
+        """).tag(config=True)
+    state_report_fields = List(
+        trait=Unicode(), default_value=None, allow_none=True, help="""
+        Fields reported on stdout at every export
+
+        If None, the elevation and velocity (or the tracers in tracer only
+        mode) are reported.
+        """).tag(config=True)
+    state_report_statistics = List(
+        trait=Enum(['norm', 'min', 'max', 'nan']), default_value=['norm'],
+        help="""
+        Statistics of the reported fields
+
+        'norm' is the L2 norm, 'min' and 'max' are the extreme nodal values
+        and 'nan' is 1 if the field contains NaN values.
+        """).tag(config=True)
+    export_state_report = Bool(
+        False, help="""
+        Store the reported statistics and the CPU time of each export in
+        diagnostic_state.hdf5 in the output directory
+        """).tag(config=True)
+    telemetry_file = Unicode(
+        None, allow_none=True, help="""
+        File for the performance telemetry stream of the time loop
+
+        Relative paths are relative to the output directory. Files with '.h5'
+        or '.hdf5' suffix are written in HDF5 format, other files as JSON
+        lines. If None, telemetry is disabled. See :class:`.Telemetry`.
+        """).tag(config=True)
+    telemetry_interval = PositiveInteger(
+        10, help="Number of time steps between telemetry records").tag(config=True)
+    telemetry_events = List(
+        trait=Unicode(), default_value=[], help="""
+        PETSc log events whose time and count are included in the telemetry
+
+        E.g. 'thetis.FlowSolver2d.export' or 'KSPSolve'.
+        """).tag(config=True)
+    report_compilation_cache = Bool(
+        False, help="""
+        Report the compilation cache statistics after the first time step
+
+        Counts the kernels created since the function spaces were created and
+        the entries added to the disk caches, see
+        :class:`.CompilationCacheMonitor`. The disk cache directories are
+        scanned, which may be slow on shared file systems.
+        """).tag(config=True)
     verbose = Integer(0, help="Verbosity level").tag(config=True)
     linear_drag_coefficient = FiredrakeScalarExpression(
         None, allow_none=True, help=r"""
@@ -761,6 +843,14 @@ class SedimentModelOptions(FrozenHasTraits):
         Accounts for mismatch between depth-averaged product of velocity with sediment
         and product of depth-averaged velocity with depth-averaged sediment
         """).tag(config=True)
+    use_fused_update = Bool(False, help="""
+        Update the sediment model fields with cached operators
+
+        The velocity and total depth are projected to P1 with a lumped mass
+        matrix instead of a global solve, and all pointwise sediment
+        diagnostics are evaluated in a single kernel. The erosion
+        concentration is interpolated instead of projected.
+        """).tag(config=True)
     porosity = FiredrakeCoefficient(
         Constant(0.4), help="Bed porosity for exner equation").tag(config=True)
     max_angle = FiredrakeConstantTraitlet(
@@ -923,6 +1013,33 @@ class ModelOptions2d(CommonModelOptions):
         False, help="Use SUPG stabilisation in tracer advection").tag(config=True)
     tracer_picard_iterations = PositiveInteger(
         1, help="Number of Picard iterations taken for tracer equations.").tag(config=True)
+    subcycling_intervals = Dict(
+        value_trait=PositiveInteger(1), default_value={}, help="""
+        Number of shallow water time steps between updates of each subsystem
+
+        Keys are 'tracer' (all tracer fields), a tracer system label,
+        'sediment' or 'exner'. Omitted subsystems are updated every time step.
+        A subsystem with interval N is advanced with time step N*dt. If the
+        Exner equation is subcycled, it is forced by the bedload and
+        erosion/deposition fluxes averaged over the intervening time steps.
+        """).tag(config=True)
+    tune_solver_parameters = Bool(
+        False, help="""
+        Choose the solver parameters of the implicit time steppers automatically
+
+        Before the time loop, a few time steps are run with each candidate
+        solver configuration of :data:`.solver_tuning.solver_catalogue` and
+        with the given solver parameters. The fastest robust configuration is
+        used and stored in :attr:`solver_tuning_cache_file`.
+        """).tag(config=True)
+    solver_tuning_steps = PositiveInteger(
+        3, help="Number of time steps run with each candidate solver configuration").tag(config=True)
+    solver_tuning_cache_file = Unicode(
+        None, allow_none=True, help="""
+        JSON file where the chosen solver configurations are stored
+
+        If None, thetis/solver_tuning.json in the user cache directory is used.
+        """).tag(config=True)
 
     def __init__(self, *args, **kwargs):
         self.tracer = OrderedDict()
@@ -1067,6 +1184,13 @@ class ModelOptions3d(CommonModelOptions):
         help="""Smagorinsky viscosity coefficient :math:`C_S`
 
         See :class:`.SmagorinskyViscosity`.""").tag(config=True)
+    use_local_smagorinsky_evaluation = Bool(
+        False, help="""
+        Evaluate the Smagorinsky viscosity cell-wise without solving a linear system
+
+        The viscosity is interpolated or projected with a lumped mass matrix.
+        Requires a velocity that is at least linear in the horizontal
+        direction. See :class:`.SmagorinskyViscosity`.""").tag(config=True)
 
     use_limiter_for_velocity = Bool(
         True, help="Apply P1DG limiter for 3D horizontal velocity field").tag(config=True)
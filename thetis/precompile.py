@@ -0,0 +1,78 @@
+"""
+Compiles the kernels of a model setup into the compilation disk caches.
+
+The configuration file is a Python file that defines a function
+``create_solver()``, which returns a :class:`.FlowSolver2d` or
+:class:`.FlowSolver` object with all options, boundary conditions and initial
+conditions set, but does not call ``iterate``. The solver is built and the
+residual and Jacobian forms of all its variational solvers are assembled
+once, and the auxiliary operators of the 3D model are run once, without time
+stepping, so that the kernels are compiled and stored in the disk caches.
+
+Running the precompilation as a cheap serial job warms the caches of a large
+parallel run, provided that both use the same cache directory, e.g. on a
+shared file system::
+
+    python -m thetis.precompile config.py --cache-dir /shared/thetis-cache
+    export FIREDRAKE_TSFC_KERNEL_CACHE_DIR=/shared/thetis-cache/tsfc
+    export PYOP2_CACHE_DIR=/shared/thetis-cache/pyop2
+    mpiexec -n 256 python run.py
+
+Note that the compiled PyOP2 libraries can only be shared between nodes that
+use the same compiler and architecture.
+
+Usage:
+
+    python -m thetis.precompile config.py [--cache-dir DIR]
+        [--function create_solver]
+"""
+from .utility import *
+from .compilation_cache import (cache_env_variables, get_cache_dirs, set_cache_dir,
+                                CompilationCacheMonitor, compile_solver)
+import argparse
+import runpy
+
+
+def precompile(config_file, function='create_solver', cache_dir=None):
+    """
+    Builds the solver of a configuration file and compiles its kernels
+
+    :arg str config_file: Python file that defines the solver factory
+    :kwarg str function: name of the function that returns the solver object
+    :kwarg str cache_dir: directory of the disk caches. If None, the
+        current cache directories are used.
+    :returns: the compilation cache statistics, see
+        :meth:`.CompilationCacheMonitor.get_stats`
+    """
+    if cache_dir is not None:
+        set_cache_dir(cache_dir)
+    cache_dirs = get_cache_dirs()
+    print_output('Compilation cache directories:')
+    for k, v in cache_env_variables.items():
+        print_output('  {:} = {:}'.format(v, cache_dirs[k]))
+
+    monitor = CompilationCacheMonitor()
+    config = runpy.run_path(config_file, run_name='thetis_precompile_config')
+    if function not in config:
+        raise ValueError('Configuration file {:} does not define function "{:}"'.format(config_file, function))
+    solver_obj = config[function]()
+    nsolvers = compile_solver(solver_obj)
+    print_output('Compiled {:d} variational solvers'.format(nsolvers))
+    return monitor.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compile the kernels of a Thetis model setup into the compilation caches')
+    parser.add_argument('config_file',
+                        help='Python file that defines a function returning the solver object')
+    parser.add_argument('--function', default='create_solver',
+                        help='name of the function that returns the solver object')
+    parser.add_argument('--cache-dir',
+                        help='directory of the compilation caches, shared with the model run')
+    args = parser.parse_args()
+    precompile(args.config_file, function=args.function, cache_dir=args.cache_dir)
+
+
+if __name__ == '__main__':
+    main()
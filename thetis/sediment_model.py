@@ -90,6 +90,9 @@ class SedimentModel(object):
         self.use_slope_mag_correction = options.sediment_model_options.use_slope_mag_correction
         self.use_advective_velocity_correction = options.sediment_model_options.use_advective_velocity_correction
         self.use_secondary_current = options.sediment_model_options.use_secondary_current
+        self.use_fused_update = options.sediment_model_options.use_fused_update
+        # time-averaged forcing of the Exner equation, see setup_forcing_average
+        self.average_forcing = None
 
         self.mesh2d = mesh2d
 
@@ -196,9 +199,10 @@ class SedimentModel(object):
                                                      (self.rhow*Constant(0.5)*self.qfc*self.unorm*self.mu - self.taucr)/self.taucr,
                                                      Constant(-1))
 
-            self.erosion_concentration = Function(self.P1DG_2d).project(Constant(0.015)*(self.average_size/self.a)
-                                                                        * ((max_value(self.transport_stage_param, Constant(0)))**1.5)
-                                                                        / (self.dstar**0.3))
+            self.erosion_concentration_expr = (Constant(0.015)*(self.average_size/self.a)
+                                               * ((max_value(self.transport_stage_param, Constant(0)))**1.5)
+                                               / (self.dstar**0.3))
+            self.erosion_concentration = Function(self.P1DG_2d).project(self.erosion_concentration_expr)
 
             if self.use_advective_velocity_correction:
                 self.correction_factor_model = CorrectiveVelocityFactor(self.depth_tot, ksp,
@@ -219,6 +223,122 @@ class SedimentModel(object):
                 # slope effect angle correction due to gravity
                 self.stress = Function(self.P1DG_2d).interpolate(self.rhow*Constant(0.5)*self.qfc*self.unorm)
 
+        if self.use_fused_update:
+            self._setup_fused_update()
+
+    def _setup_fused_update(self):
+        """
+        Set up the cached operators used by :meth:`update` in fused mode
+
+        The velocity and total depth are projected to P1 together, using the
+        lumped P1 mass matrix. All the pointwise diagnostics are evaluated
+        into one P1 vector function. P1DG fields are then filled by copying
+        the vertex values, as all the inputs are continuous.
+        """
+        p1v3_2d = VectorFunctionSpace(self.mesh2d, 'CG', 1, dim=3)
+        self._proj_source = as_vector([self.uv[0], self.uv[1],
+                                       self.depth.get_total_depth(self.elev)])
+        self._proj_form = inner(self._proj_source, TestFunction(p1v3_2d))*dx
+        self._proj_rhs = Cofunction(p1v3_2d.dual())
+        self._lumped_mass = assemble(TestFunction(self.P1_2d)*dx).dat.data_ro_with_halos.copy()
+
+        targets = [
+            (self.old_bathymetry_2d, self.depth.bathymetry_2d),
+            (self.bed_stress, self.rhow*Constant(0.5)*self.qfc*self.unorm),
+        ]
+        if self.solve_suspended_sediment:
+            targets.append((self.erosion_concentration, self.erosion_concentration_expr))
+            targets.append((self.equilibrium_tracer, self.erosion_concentration_expr/self.integrated_rouse))
+            if self.use_advective_velocity_correction:
+                targets.append((self.velocity_correction_factor,
+                                self.correction_factor_model.velocity_correction_factor_expr))
+        if self.use_bedload:
+            targets.append((self.calfa, self.uv_cg[0]/sqrt(self.unorm)))
+            targets.append((self.salfa, self.uv_cg[1]/sqrt(self.unorm)))
+            if self.use_angle_correction:
+                targets.append((self.stress, self.rhow*Constant(0.5)*self.qfc*self.unorm))
+        self._fused_targets = [f for f, e in targets]
+        self._fused_expr = as_vector([e for f, e in targets])
+        self._fused_values = Function(VectorFunctionSpace(self.mesh2d, 'CG', 1, dim=len(targets)))
+
+        # P1 node of each P1DG node
+        dg_map = self.P1DG_2d.cell_node_map().values_with_halo
+        cg_map = self.P1_2d.cell_node_map().values_with_halo
+        self._dg_to_cg = numpy.empty(self.P1DG_2d.dof_dset.total_size, dtype=cg_map.dtype)
+        self._dg_to_cg[dg_map] = cg_map
+
+    @PETSc.Log.EventDecorator("thetis.SedimentModel._fused_update")
+    def _fused_update(self):
+        """Update all functions with the cached operators"""
+        assemble(self._proj_form, tensor=self._proj_rhs)
+        proj = self._proj_rhs.dat.data_ro_with_halos/self._lumped_mass[:, numpy.newaxis]
+        self.uv_cg.dat.data_with_halos[:] = proj[:, :2]
+        self.depth_tot.dat.data_with_halos[:] = proj[:, 2]
+
+        self._fused_values.interpolate(self._fused_expr)
+        values = self._fused_values.dat.data_ro_with_halos
+        for i, f in enumerate(self._fused_targets):
+            if f.function_space() == self.P1DG_2d:
+                f.dat.data_with_halos[:] = values[self._dg_to_cg, i]
+            else:
+                f.dat.data_with_halos[:] = values[:, i]
+
+    def setup_forcing_average(self, sediment=None, depth_integrated_sediment=False):
+        """
+        Set up time-averaging of the forcing of the Exner equation
+
+        Used when the Exner equation is updated less frequently than the
+        hydrodynamics. The bedload flux and the erosion and deposition fluxes
+        are accumulated by :meth:`accumulate_forcing` on every call, and the
+        Exner equation is forced by their averages instead of the
+        instantaneous values. The bed slope effects on the averaged bedload
+        flux are evaluated with the bathymetry of the previous Exner update.
+
+        Must be called before the Exner equation is created.
+
+        :kwarg sediment: sediment field, required with suspended sediment
+        :kwarg bool depth_integrated_sediment: whether the sediment field is
+            depth-integrated
+        """
+        self.average_forcing = OrderedDict()
+        if self.use_bedload:
+            qbx, qby = self._get_bedload_flux(self.old_bathymetry_2d)
+            f = Function(VectorFunctionSpace(self.mesh2d, 'DG', 1), name='Averaged bedload flux')
+            self.average_forcing['bedload'] = (f, as_vector((qbx, qby)))
+        if self.solve_suspended_sediment:
+            deposition = self.get_deposition_coefficient()*sediment
+            if depth_integrated_sediment:
+                deposition = deposition/self.depth.get_total_depth(self.elev)
+            f = Function(self.P1DG_2d, name='Averaged sediment source')
+            self.average_forcing['source'] = (f, self.get_erosion_term() - deposition)
+        self._nb_averaged = 0
+        self._average_weight = Constant(1.0)
+
+    @PETSc.Log.EventDecorator("thetis.SedimentModel.accumulate_forcing")
+    def accumulate_forcing(self):
+        """
+        Adds the current forcing of the Exner equation to the time average
+
+        Should be called after :meth:`update`.
+        """
+        self._nb_averaged += 1
+        self._average_weight.assign(1.0/self._nb_averaged)
+        for f, expr in self.average_forcing.values():
+            f.interpolate(f + self._average_weight*(expr - f))
+
+    def reset_forcing_average(self):
+        """Restarts the time averaging of the Exner forcing"""
+        self._nb_averaged = 0
+
+    def get_averaged_bedload_term(self):
+        """Returns the time-averaged bedload transport :math:`(qbx, qby)`"""
+        f = self.average_forcing['bedload'][0]
+        return f[0], f[1]
+
+    def get_averaged_source_term(self):
+        """Returns the time-averaged (depth-integrated) erosion minus deposition"""
+        return self.average_forcing['source'][0]
+
     def get_bedload_term(self, bathymetry):
         """
         Returns expression for bedload transport :math:`(qbx, qby)` to be used in the Exner equation.
@@ -227,6 +347,12 @@ class SedimentModel(object):
         :arg bathymetry: Bathymetry of the domain. Bathymetry stands for
             the bedlevel (positive downwards).
         """
+        return self._get_bedload_flux(bathymetry)
+
+    def _get_bedload_flux(self, bathymetry):
+        """
+        Returns expression for bedload transport :math:`(qbx, qby)` for the given bathymetry
+        """
 
         # define bed gradient
         dzdx = self.old_bathymetry_2d.dx(0)
@@ -389,6 +515,9 @@ class SedimentModel(object):
 
         This repeats all projection and interpolations steps based on the current values
         of the `uv` and `elev` functions, provided in __init__."""
+        if self.use_fused_update:
+            self._fused_update()
+            return
 
         self.uv_cg.project(self.uv)
 
@@ -398,9 +527,7 @@ class SedimentModel(object):
         self.bed_stress.interpolate(self.rhow*Constant(0.5)*self.qfc*self.unorm)
 
         if self.solve_suspended_sediment:
-            self.erosion_concentration.project(Constant(0.015)*(self.average_size/self.a)
-                                               * ((max_value(self.transport_stage_param, Constant(0)))**1.5)
-                                               / (self.dstar**0.3))
+            self.erosion_concentration.project(self.erosion_concentration_expr)
 
             self.equilibrium_tracer.interpolate(self.erosion_concentration/self.integrated_rouse)
 
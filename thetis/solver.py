@@ -16,6 +16,9 @@ import weakref
 from .field_defs import field_metadata
 from .options import ModelOptions3d
 from . import callback
+from .state_reporter import StateReporter
+from .telemetry import Telemetry
+from .compilation_cache import CompilationCacheMonitor
 from .log import *
 from collections import OrderedDict
 import numpy
@@ -77,6 +80,10 @@ class FlowSolver(FrozenClass):
 
     See the manual for more complex examples.
     """
+    restart_fields = ['uv_2d', 'elev_2d', 'uv_3d',
+                      'salt_3d', 'temp_3d', 'tke_3d', 'psi_3d']
+    """Fields needed to restart a simulation, always stored in double precision"""
+
     @unfrozen
     @PETSc.Log.EventDecorator("thetis.FlowSolver.__init__")
     def __init__(self, mesh2d, bathymetry_2d, n_layers,
@@ -94,6 +101,8 @@ class FlowSolver(FrozenClass):
         :kwarg bool keep_log: append to an existing log file, or overwrite it?
         """
         self._initialized = False
+        self.compilation_cache_monitor = None
+        """Reports the compilation cache statistics after the first time step"""
 
         self.bathymetry_cg_2d = bathymetry_2d
 
@@ -129,6 +138,7 @@ class FlowSolver(FrozenClass):
         self.simulation_time = 0
         self.iteration = 0
         self.i_export = 0
+        self.state_reporter = None
         self.next_export_t = self.simulation_time + self.options.simulation_export_time
 
         self.bnd_functions = {'shallow_water': {},
@@ -413,6 +423,8 @@ class FlowSolver(FrozenClass):
         Function spaces are accessible via :attr:`.function_spaces`
         object.
         """
+        if self.options.report_compilation_cache:
+            self.compilation_cache_monitor = CompilationCacheMonitor(self.comm)
         # ----- function spaces: elev in H, uv in U, mixed is W
         self.function_spaces.P0 = get_functionspace(self.mesh, 'DG', 0, 'DG', 0, name='P0')
         self.function_spaces.P1 = get_functionspace(self.mesh, 'CG', 1, 'CG', 1, name='P1')
@@ -832,7 +844,8 @@ class FlowSolver(FrozenClass):
             self.smagorinsky_diff_solver = SmagorinskyViscosity(self.fields.uv_3d, self.fields.smag_visc_3d,
                                                                 self.options.smagorinsky_coefficient, self.fields.h_elem_size_3d,
                                                                 self.fields.max_h_diff,
-                                                                weak_form=True)
+                                                                weak_form=True,
+                                                                local_evaluation=self.options.use_local_smagorinsky_evaluation)
 
     @unfrozen
     @PETSc.Log.EventDecorator("thetis.FlowSolver.create_timestepper")
@@ -887,13 +900,23 @@ class FlowSolver(FrozenClass):
                                        preproc_funcs=self._field_preproc_funcs)
             self.exporters['vtk'] = e
             hdf5_dir = os.path.join(self.options.output_directory, 'hdf5')
+            hdf5_compression = None
+            if self.options.hdf5_compression is not None:
+                hdf5_compression = {
+                    'compression': self.options.hdf5_compression,
+                    'compression_opts': self.options.hdf5_compression_level,
+                    'shuffle': self.options.hdf5_shuffle,
+                    'chunk_size': self.options.hdf5_chunk_size,
+                }
             e = exporter.ExportManager(hdf5_dir,
                                        self.options.fields_to_export_hdf5,
                                        self.fields,
                                        field_metadata,
                                        export_type='hdf5',
                                        verbose=self.options.verbose > 0,
-                                       preproc_funcs=self._field_preproc_funcs)
+                                       preproc_funcs=self._field_preproc_funcs,
+                                       restart_fields=self.restart_fields,
+                                       hdf5_compression=hdf5_compression)
             self.exporters['hdf5'] = e
 
     def initialize(self):
@@ -1047,11 +1070,9 @@ class FlowSolver(FrozenClass):
             outputdir = self.options.output_directory
         self._simulation_continued = True
         # create new ExportManager with desired outputdir
-        state_fields = ['uv_2d', 'elev_2d', 'uv_3d',
-                        'salt_3d', 'temp_3d', 'tke_3d', 'psi_3d']
         hdf5_dir = os.path.join(outputdir, 'hdf5')
         e = exporter.ExportManager(hdf5_dir,
-                                   state_fields,
+                                   self.restart_fields,
                                    self.fields,
                                    field_metadata,
                                    export_type='hdf5',
@@ -1105,6 +1126,21 @@ class FlowSolver(FrozenClass):
         for e in self.exporters.values():
             e.set_next_export_ix(self.i_export + offset)
 
+    def create_state_reporter(self):
+        """
+        Creates the :class:`.StateReporter` used by :meth:`print_state`
+
+        Reports the fields and statistics defined in
+        :attr:`.ModelOptions3d.state_report_fields` and
+        :attr:`.ModelOptions3d.state_report_statistics`.
+        """
+        if self.options.state_report_fields is not None:
+            fields = OrderedDict((f, self.fields[f]) for f in self.options.state_report_fields)
+        else:
+            fields = OrderedDict([('eta', self.fields.elev_2d), ('u', self.fields.uv_3d)])
+        return StateReporter(fields, statistics=self.options.state_report_statistics,
+                             comm=self.comm)
+
     def print_state(self, cputime, print_header=False):
         """
         Print a summary of the model state on stdout
@@ -1131,22 +1167,25 @@ class FlowSolver(FrozenClass):
                 ('time', time_str, '15s'),
             ]
 
-        norm_h = norm(self.fields.elev_2d)
-        norm_u = norm(self.fields.uv_3d)
-        # list of entries to print: (header, value, format)
-        entries += [
-            ('eta norm', norm_h, '14.4f'),
-            ('u norm', norm_u, '14.4f'),
-            ('Tcpu', cputime, '6.2f'),
-        ]
-
+        if self.state_reporter is None:
+            self.state_reporter = self.create_state_reporter()
+        values = self.state_reporter.evaluate()
+        entries += self.state_reporter.get_entries(values)
+        entries.append(('Tcpu', cputime, '6.2f'))
+        if self.options.export_state_report and not self.options.no_exports:
+            fname = os.path.join(self.options.output_directory, 'diagnostic_state.hdf5')
+            self.state_reporter.export(values, fname, self.simulation_time, cputime,
+                                       self.iteration, new_file=self.i_export == 0)
+
+        # column widths
+        widths = [max(len(e[0]), len(f'{e[1]:{e[2]}}')) for e in entries]
         if print_header:
             # generate header
-            header = ' '.join([e[0].rjust(len(f'{e[1]:{e[2]}}')) for e in entries])
+            header = ' '.join([e[0].rjust(w) for e, w in zip(entries, widths)])
             print_output(header)
 
         # generate line
-        line = ' '.join([f'{e[1]:{e[2]}}' for e in entries])
+        line = ' '.join([f'{e[1]:{e[2]}}'.rjust(w) for e, w in zip(entries, widths)])
         print_output(line)
         sys.stdout.flush()
 
@@ -1291,27 +1330,45 @@ class FlowSolver(FrozenClass):
             if 'vtk' in self.exporters:
                 self.exporters['vtk'].export_bathymetry(self.fields.bathymetry_2d)
 
+        telemetry_file = self.options.telemetry_file
+        if telemetry_file is not None:
+            telemetry_file = os.path.join(self.options.output_directory, telemetry_file)
+        telemetry = Telemetry(telemetry_file, interval=self.options.telemetry_interval,
+                              events=self.options.telemetry_events, comm=self.comm,
+                              new_file=self.i_export == 0)
+
         while self.simulation_time <= self.options.simulation_end_time - t_epsilon:
 
-            self.timestepper.advance(self.simulation_time,
-                                     update_forcings, update_forcings3d)
+            telemetry.start_step()
+            with telemetry.phase('advance'):
+                self.timestepper.advance(self.simulation_time,
+                                         update_forcings, update_forcings3d)
 
             # Move to next time step
             self.iteration += 1
             internal_iteration += 1
             self.simulation_time = initial_simulation_time + internal_iteration*self.dt
 
-            self.callbacks.evaluate(mode='timestep')
+            with telemetry.phase('callbacks'):
+                self.callbacks.evaluate(mode='timestep')
 
             # Write the solution to file
             if self.simulation_time >= self.next_export_t - t_epsilon:
-                self.i_export += 1
-                self.next_export_t += self.options.simulation_export_time
+                with telemetry.phase('export'):
+                    self.i_export += 1
+                    self.next_export_t += self.options.simulation_export_time
+
+                    cputime = time_mod.perf_counter() - cputimestamp
+                    cputimestamp = time_mod.perf_counter()
+                    self.print_state(cputime)
+
+                    self.export()
+                    if export_func is not None:
+                        export_func()
 
-                cputime = time_mod.perf_counter() - cputimestamp
-                cputimestamp = time_mod.perf_counter()
-                self.print_state(cputime)
+            telemetry.end_step(self.iteration, self.simulation_time)
+            if self.compilation_cache_monitor is not None:
+                self.compilation_cache_monitor.report()
+                self.compilation_cache_monitor = None
 
-                self.export()
-                if export_func is not None:
-                    export_func()
+        telemetry.flush(self.iteration, self.simulation_time)
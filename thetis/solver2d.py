@@ -18,6 +18,10 @@ from .turbines import TidalTurbineFarm, DiscreteTidalTurbineFarm
 from .field_defs import field_metadata
 from .options import ModelOptions2d
 from . import callback
+from .state_reporter import StateReporter
+from .solver_tuning import SolverTuner
+from .telemetry import Telemetry
+from .compilation_cache import CompilationCacheMonitor
 from .log import *
 from collections import OrderedDict
 import thetis.limiter as limiter
@@ -76,6 +80,9 @@ class FlowSolver2d(FrozenClass):
 
     See the manual for more complex examples.
     """
+    restart_fields = ['uv_2d', 'elev_2d']
+    """Fields needed to restart a simulation, always stored in double precision"""
+
     @unfrozen
     @PETSc.Log.EventDecorator("thetis.FlowSolver2d.__init__")
     def __init__(self, mesh2d, bathymetry_2d, options=None, keep_log=False):
@@ -90,6 +97,8 @@ class FlowSolver2d(FrozenClass):
         :kwarg bool keep_log: append to an existing log file, or overwrite it?
         """
         self._initialized = False
+        self.compilation_cache_monitor = None
+        """Reports the compilation cache statistics after the first time step"""
         self.mesh2d = mesh2d
         self.comm = mesh2d.comm
 
@@ -111,6 +120,8 @@ class FlowSolver2d(FrozenClass):
         self.simulation_time = 0
         self.iteration = 0
         self.i_export = 0
+        self.state_reporter = None
+        self.solver_tuner = None
         self.next_export_t = self.simulation_time + self.options.simulation_export_time
 
         self.callbacks = callback.CallbackManager()
@@ -311,6 +322,8 @@ class FlowSolver2d(FrozenClass):
         Function spaces are accessible via :attr:`.function_spaces`
         object.
         """
+        if self.options.report_compilation_cache:
+            self.compilation_cache_monitor = CompilationCacheMonitor(self.comm)
         on_the_sphere = self.mesh2d.geometric_dimension() == 3
         if on_the_sphere:
             assert self.options.element_family in ['rt-dg', 'bdm-dg'], \
@@ -516,6 +529,10 @@ class FlowSolver2d(FrozenClass):
 
         # Exner equation for bedload transport
         if sediment_options.solve_exner:
+            if self.options.subcycling_intervals.get('exner', 1) > 1:
+                self.sediment_model.setup_forcing_average(
+                    sediment=self.fields.get('sediment_2d'),
+                    depth_integrated_sediment=sediment_options.use_sediment_conservative_form)
             if element_continuity(self.fields.bathymetry_2d.function_space().ufl_element()).horizontal in ['cg']:
                 self.equations.exner = exner_eq.ExnerEquation(
                     self.fields.bathymetry_2d.function_space(), self.depth,
@@ -674,7 +691,9 @@ class FlowSolver2d(FrozenClass):
             self.poisson_solver = DepthIntegratedPoissonSolver(
                 self.fields.q_2d, self.fields.uv_2d, self.fields.w_2d,
                 self.fields.elev_2d, self.depth, self.dt, self.bnd_functions,
-                solver_parameters=self.options.nh_model_options.solver_parameters
+                solver_parameters=self.options.nh_model_options.solver_parameters,
+                reuse_preconditioner=self.options.nh_model_options.reuse_poisson_preconditioner,
+                preconditioner_update_tolerance=self.options.nh_model_options.poisson_preconditioner_update_tolerance,
             )
             self.timestepper = coupled_timeintegrator_2d.NonHydrostaticTimeIntegrator2D(
                 weakref.proxy(self), steppers[self.options.swe_timestepper_type],
@@ -718,13 +737,23 @@ class FlowSolver2d(FrozenClass):
                                        preproc_funcs=self._field_preproc_funcs)
             self.exporters['vtk'] = e
             hdf5_dir = os.path.join(self.options.output_directory, 'hdf5')
+            hdf5_compression = None
+            if self.options.hdf5_compression is not None:
+                hdf5_compression = {
+                    'compression': self.options.hdf5_compression,
+                    'compression_opts': self.options.hdf5_compression_level,
+                    'shuffle': self.options.hdf5_shuffle,
+                    'chunk_size': self.options.hdf5_chunk_size,
+                }
             e = exporter.ExportManager(hdf5_dir,
                                        self.options.fields_to_export_hdf5,
                                        self.fields,
                                        field_metadata,
                                        export_type='hdf5',
                                        verbose=self.options.verbose > 0,
-                                       preproc_funcs=self._field_preproc_funcs)
+                                       preproc_funcs=self._field_preproc_funcs,
+                                       restart_fields=self.restart_fields,
+                                       hdf5_compression=hdf5_compression)
             self.exporters['hdf5'] = e
 
     def initialize(self):
@@ -856,10 +885,9 @@ class FlowSolver2d(FrozenClass):
         if outputdir is None:
             outputdir = self.options.output_directory
         # create new ExportManager with desired outputdir
-        state_fields = ['uv_2d', 'elev_2d']
         hdf5_dir = os.path.join(outputdir, 'hdf5')
         e = exporter.ExportManager(hdf5_dir,
-                                   state_fields,
+                                   self.restart_fields,
                                    self.fields,
                                    field_metadata,
                                    export_type='hdf5',
@@ -891,6 +919,24 @@ class FlowSolver2d(FrozenClass):
         for e in self.exporters.values():
             e.set_next_export_ix(self.i_export + offset)
 
+    def create_state_reporter(self):
+        """
+        Creates the :class:`.StateReporter` used by :meth:`print_state`
+
+        Reports the fields and statistics defined in
+        :attr:`.ModelOptions2d.state_report_fields` and
+        :attr:`.ModelOptions2d.state_report_statistics`.
+        """
+        if self.options.state_report_fields is not None:
+            fields = OrderedDict((f, self.fields[f]) for f in self.options.state_report_fields)
+        elif self.options.tracer_only:
+            fields = OrderedDict((label, self.fields[label]) for label in self.options.tracer)
+        else:
+            uv, elev = self.fields.solution_2d.subfunctions
+            fields = OrderedDict([('eta', elev), ('u', uv)])
+        return StateReporter(fields, statistics=self.options.state_report_statistics,
+                             comm=self.comm)
+
     def print_state(self, cputime, print_header=False):
         """
         Print a summary of the model state on stdout
@@ -917,27 +963,25 @@ class FlowSolver2d(FrozenClass):
             entries += [
                 ('time', time_str, '15s'),
             ]
-        if self.options.tracer_only:
-            for label in self.options.tracer:
-                norm_q = norm(self.fields[label])
-                e = (label, norm_q, '10.4f')
-                entries.append(e)
-        else:
-            norm_h = norm(self.fields.solution_2d.subfunctions[1])
-            norm_u = norm(self.fields.solution_2d.subfunctions[0])
-            entries += [
-                ('eta norm', norm_h, '14.4f'),
-                ('u norm', norm_u, '14.4f'),
-            ]
+        if self.state_reporter is None:
+            self.state_reporter = self.create_state_reporter()
+        values = self.state_reporter.evaluate()
+        entries += self.state_reporter.get_entries(values)
         entries.append(('Tcpu', cputime, '6.2f'))
+        if self.options.export_state_report and not self.options.no_exports:
+            fname = os.path.join(self.options.output_directory, 'diagnostic_state.hdf5')
+            self.state_reporter.export(values, fname, self.simulation_time, cputime,
+                                       self.iteration, new_file=self.i_export == 0)
 
+        # column widths
+        widths = [max(len(e[0]), len(f'{e[1]:{e[2]}}')) for e in entries]
         if print_header:
             # generate header
-            header = ' '.join([e[0].rjust(len(f'{e[1]:{e[2]}}')) for e in entries])
+            header = ' '.join([e[0].rjust(w) for e, w in zip(entries, widths)])
             print_output(header)
 
         # generate line
-        line = ' '.join([f'{e[1]:{e[2]}}' for e in entries])
+        line = ' '.join([f'{e[1]:{e[2]}}'.rjust(w) for e, w in zip(entries, widths)])
         print_output(line)
         sys.stdout.flush()
 
@@ -1040,25 +1084,48 @@ class FlowSolver2d(FrozenClass):
             if 'vtk' in self.exporters and isinstance(self.fields.bathymetry_2d, Function):
                 self.exporters['vtk'].export_bathymetry(self.fields.bathymetry_2d)
 
+        if self.options.tune_solver_parameters and self.solver_tuner is None:
+            self.solver_tuner = SolverTuner(self, steps=self.options.solver_tuning_steps,
+                                            cache_file=self.options.solver_tuning_cache_file)
+            self.solver_tuner.tune(update_forcings)
+
+        telemetry_file = self.options.telemetry_file
+        if telemetry_file is not None:
+            telemetry_file = os.path.join(self.options.output_directory, telemetry_file)
+        telemetry = Telemetry(telemetry_file, interval=self.options.telemetry_interval,
+                              events=self.options.telemetry_events, comm=self.comm,
+                              new_file=self.i_export == 0)
+
         while self.simulation_time <= self.options.simulation_end_time - t_epsilon:
-            self.timestepper.advance(self.simulation_time, update_forcings)
+            telemetry.start_step()
+            with telemetry.phase('advance'):
+                self.timestepper.advance(self.simulation_time, update_forcings)
 
             # Move to next time step
             self.iteration += 1
             internal_iteration += 1
             self.simulation_time = initial_simulation_time + internal_iteration*self.dt
 
-            self.callbacks.evaluate(mode='timestep')
+            with telemetry.phase('callbacks'):
+                self.callbacks.evaluate(mode='timestep')
 
             # Write the solution to file
             if self.simulation_time >= next_export_t - t_epsilon:
-                self.i_export += 1
-                next_export_t += self.options.simulation_export_time
+                with telemetry.phase('export'):
+                    self.i_export += 1
+                    next_export_t += self.options.simulation_export_time
+
+                    cputime = time_mod.perf_counter() - cputimestamp
+                    cputimestamp = time_mod.perf_counter()
+                    self.print_state(cputime)
+
+                    self.export()
+                    if export_func is not None:
+                        export_func()
 
-                cputime = time_mod.perf_counter() - cputimestamp
-                cputimestamp = time_mod.perf_counter()
-                self.print_state(cputime)
+            telemetry.end_step(self.iteration, self.simulation_time)
+            if self.compilation_cache_monitor is not None:
+                self.compilation_cache_monitor.report()
+                self.compilation_cache_monitor = None
 
-                self.export()
-                if export_func is not None:
-                    export_func()
+        telemetry.flush(self.iteration, self.simulation_time)
@@ -0,0 +1,431 @@
+"""
+Automatic selection of the PETSc solver parameters of implicit time steppers.
+"""
+from .utility import *
+from . import timeintegrator
+from . import rungekutta
+from firedrake.exceptions import ConvergenceError
+import traitlets
+import copy
+import hashlib
+import json
+import time as time_mod
+
+__all__ = ['SolverTuner', 'solver_catalogue', 'get_solver_candidates', 'get_options_hash']
+
+_bjacobi_ilu = {
+    'ksp_type': 'preonly',
+    'pc_type': 'bjacobi',
+    'sub_pc_type': 'ilu',
+}
+
+# candidate solver parameters, equation type: name: (parameters, element families or None)
+solver_catalogue = {
+    'shallow_water': OrderedDict([
+        ('fieldsplit-multiplicative-ilu', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'fieldsplit',
+            'pc_fieldsplit_type': 'multiplicative',
+            'fieldsplit_U_2d': _bjacobi_ilu,
+            'fieldsplit_H_2d': _bjacobi_ilu,
+        }, None)),
+        ('fieldsplit-schur-gamg', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'fieldsplit',
+            'pc_fieldsplit_type': 'schur',
+            'pc_fieldsplit_schur_fact_type': 'full',
+            'pc_fieldsplit_schur_precondition': 'selfp',
+            'fieldsplit_U_2d': _bjacobi_ilu,
+            'fieldsplit_H_2d': {'ksp_type': 'preonly', 'pc_type': 'gamg'},
+        }, ('dg-dg', 'dg-cg'))),
+        ('fieldsplit-schur-hypre', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'fieldsplit',
+            'pc_fieldsplit_type': 'schur',
+            'pc_fieldsplit_schur_fact_type': 'full',
+            'pc_fieldsplit_schur_precondition': 'selfp',
+            'fieldsplit_U_2d': _bjacobi_ilu,
+            'fieldsplit_H_2d': {'ksp_type': 'preonly', 'pc_type': 'hypre',
+                                'pc_hypre_type': 'boomeramg'},
+        }, ('dg-dg', 'dg-cg'))),
+        ('gmres-bjacobi-ilu0', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'bjacobi',
+            'sub_pc_type': 'ilu',
+            'sub_pc_factor_levels': 0,
+        }, None)),
+        ('gmres-bjacobi-ilu1', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'bjacobi',
+            'sub_pc_type': 'ilu',
+            'sub_pc_factor_levels': 1,
+        }, None)),
+        ('gmres-asm-ilu1', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'asm',
+            'pc_asm_overlap': 1,
+            'sub_pc_type': 'ilu',
+            'sub_pc_factor_levels': 1,
+        }, None)),
+        ('lu-mumps', ({
+            'ksp_type': 'preonly',
+            'pc_type': 'lu',
+            'pc_factor_mat_solver_type': 'mumps',
+            'mat_type': 'aij',
+        }, None)),
+    ]),
+    'scalar': OrderedDict([
+        ('gmres-sor', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'sor',
+        }, None)),
+        ('gmres-bjacobi-ilu0', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'bjacobi',
+            'sub_pc_type': 'ilu',
+            'sub_pc_factor_levels': 0,
+        }, None)),
+        ('gmres-bjacobi-ilu1', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'bjacobi',
+            'sub_pc_type': 'ilu',
+            'sub_pc_factor_levels': 1,
+        }, None)),
+        ('gmres-gamg', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'gamg',
+        }, None)),
+        ('gmres-hypre', ({
+            'ksp_type': 'gmres',
+            'pc_type': 'hypre',
+            'pc_hypre_type': 'boomeramg',
+        }, None)),
+        ('lu-mumps', ({
+            'ksp_type': 'preonly',
+            'pc_type': 'lu',
+            'pc_factor_mat_solver_type': 'mumps',
+            'mat_type': 'aij',
+        }, None)),
+    ]),
+}
+"""
+Catalogue of candidate solver parameters
+
+Keys are the equation types: 'shallow_water' for the coupled velocity and
+elevation system, 'scalar' for tracer, sediment, Exner and free surface
+equations. Each candidate is a tuple of the solver parameters and the
+element families it applies to, or None if it applies to all families.
+"""
+
+# time steppers whose solver parameters can be tuned
+tunable_timesteppers = (
+    timeintegrator.CrankNicolson,
+    timeintegrator.SteadyState,
+    rungekutta.DIRKGeneric,
+    rungekutta.DIRKGenericUForm,
+)
+
+
+def get_external_packages(params):
+    """
+    Returns the external PETSc packages used by solver parameters
+
+    :arg dict params: solver parameters, possibly nested
+    :returns: set of package names, e.g. {'hypre', 'mumps'}
+    """
+    packages = set()
+    for key, value in params.items():
+        if isinstance(value, dict):
+            packages |= get_external_packages(value)
+        elif key.endswith('pc_type') and value == 'hypre':
+            packages.add('hypre')
+        elif key.endswith('mat_solver_type') and value not in ('petsc', None):
+            packages.add(value)
+    return packages
+
+
+def get_solver_candidates(equation_type, element_family, catalogue=None):
+    """
+    Returns the candidate solver parameters of an equation type
+
+    Candidates that use an external package that is not available in the
+    PETSc build, e.g. hypre or MUMPS, are skipped.
+
+    :arg str equation_type: 'shallow_water' or 'scalar'
+    :arg str element_family: element family of the solver, e.g. 'dg-dg'
+    :kwarg catalogue: dict of candidates, by default :data:`solver_catalogue`
+    :returns: :class:`OrderedDict` of candidate name: solver parameters
+    """
+    if catalogue is None:
+        catalogue = solver_catalogue
+    return OrderedDict((name, params) for name, (params, families) in catalogue[equation_type].items()
+                       if (families is None or element_family in families)
+                       and all(PETSc.Sys.hasExternalPackage(p) for p in get_external_packages(params)))
+
+
+# options that do not affect the tuned solvers
+untuned_options = (
+    'solver_parameters', 'output_directory', 'fields_to_export', 'fields_to_export_hdf5',
+    'no_exports', 'export_diagnostics', 'log_output', 'verbose', 'simulation_export_time',
+    'simulation_end_time', 'simulation_initial_date', 'simulation_end_date',
+    'tune_solver_parameters', 'solver_tuning_steps', 'solver_tuning_cache_file',
+    'report_compilation_cache', 'state_report_fields', 'export_state_report',
+    'config', 'parent', 'log',
+)
+untuned_option_prefixes = ('hdf5_', 'telemetry_', 'check_')
+
+
+def _option_state(options):
+    """Returns a JSON-serializable summary of model options"""
+    def summarize(value):
+        if isinstance(value, traitlets.HasTraits):
+            return _option_state(value)
+        if isinstance(value, Constant):
+            return numpy.asarray(value.values()).tolist()
+        if isinstance(value, dict):
+            return {str(k): summarize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [summarize(v) for v in value]
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        # Functions and expressions are represented by their type only
+        return type(value).__name__
+
+    return {name: summarize(getattr(options, name)) for name in sorted(options.trait_names())
+            if name not in untuned_options and not name.startswith(untuned_option_prefixes)}
+
+
+def get_options_hash(options):
+    """
+    Returns a hash of the model options that may affect the solvers
+
+    Output, tuning and solver parameter options are excluded. Constants are
+    represented by their values, other Firedrake objects only by their type.
+
+    :arg options: a :class:`.ModelOptions2d` object
+    :returns: hexadecimal digest
+    """
+    state = json.dumps(_option_state(options), sort_keys=True)
+    return hashlib.sha1(state.encode()).hexdigest()
+
+
+def get_default_cache_file():
+    """Returns the default solver tuning cache file in the user cache directory"""
+    cache_dir = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_dir, 'thetis', 'solver_tuning.json')
+
+
+class SolverTuner(object):
+    """
+    Selects the fastest robust solver parameters of the implicit time steppers
+
+    For each tunable time stepper of a :class:`.FlowSolver2d`, a short burst
+    of time steps is run with every candidate of :data:`solver_catalogue`
+    and with the solver parameters given in the options. The model state is
+    restored after each burst. A candidate is robust if all nonlinear and
+    linear solves converge and the solution remains finite. Other errors,
+    e.g. a preconditioner that is not available in the PETSc build, are not
+    caught, as they may be raised on some ranks only. The fastest
+    robust candidate, measured by the wall time per time step without the
+    first (warm-up) step, is assigned to the time stepper.
+
+    The choice is stored in a JSON cache file, keyed by the number of
+    degrees of freedom and mesh cells, the number of MPI ranks, the time
+    stepper and equation types, the element family, the polynomial degree,
+    the time step and a hash of the model options (see
+    :func:`get_options_hash`). Later runs with the same key use the cached
+    parameters without tuning.
+
+    .. code-block:: python
+
+        tuner = SolverTuner(solver_obj, steps=3)
+        tuner.tune(update_forcings)
+        print(tuner.choices)
+
+    """
+    def __init__(self, solver_obj, steps=3, cache_file=None, catalogue=None):
+        """
+        :arg solver_obj: a :class:`.FlowSolver2d` object
+        :kwarg int steps: number of time steps run with each candidate
+        :kwarg str cache_file: JSON file where the choices are stored. If
+            None, the file is thetis/solver_tuning.json in the user cache
+            directory.
+        :kwarg catalogue: dict of candidates, by default
+            :data:`solver_catalogue`
+        """
+        self.solver_obj = solver_obj
+        self.steps = steps
+        self.cache_file = cache_file or get_default_cache_file()
+        self.catalogue = catalogue
+        self.comm = solver_obj.comm
+        self.choices = OrderedDict()
+        """Chosen candidate of each time stepper"""
+        self.results = OrderedDict()
+        """Time per step, linear iterations per step and robustness of each candidate"""
+        PETSc.Log.begin()
+        self._events = [PETSc.Log.Event(e) for e in ['KSPSolve', 'PCApply']]
+
+    def get_timesteppers(self):
+        """
+        Returns the tunable time steppers
+
+        :returns: :class:`OrderedDict` of name: (time stepper, equation type)
+        """
+        timestepper = self.solver_obj.timestepper
+        if hasattr(timestepper, 'timesteppers'):
+            steppers = timestepper.timesteppers
+        else:
+            steppers = {'swe2d': timestepper}
+        return OrderedDict((name, (s, 'shallow_water' if name == 'swe2d' else 'scalar'))
+                           for name, s in steppers.items()
+                           if isinstance(s, tunable_timesteppers))
+
+    def get_key(self, name, stepper, equation_type):
+        """
+        Returns the cache key of a time stepper
+
+        :returns: (hash, key dict) tuple
+        """
+        options = self.solver_obj.options
+        element_family = options.element_family
+        if equation_type == 'scalar' and name != 'exner':
+            element_family = options.tracer_element_family
+        mesh2d = self.solver_obj.mesh2d
+        key = OrderedDict([
+            ('stepper', stepper.name),
+            ('equation_type', equation_type),
+            ('dofs', stepper.equation.function_space.dim()),
+            ('cells', self.comm.allreduce(mesh2d.cell_set.size, op=MPI.SUM)),
+            ('nranks', self.comm.size),
+            ('element_family', element_family),
+            ('polynomial_degree', options.polynomial_degree),
+            ('timestep', float(stepper.dt)),
+            ('options', get_options_hash(options)),
+        ])
+        digest = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+        return digest, key
+
+    def _read_cache(self):
+        """Reads the cache file on rank 0 and broadcasts it"""
+        cache = {}
+        if self.comm.rank == 0 and os.path.exists(self.cache_file):
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+        return self.comm.bcast(cache, root=0)
+
+    def _write_cache(self, cache):
+        """Writes the cache file on rank 0"""
+        create_directory(os.path.dirname(os.path.abspath(self.cache_file)), comm=self.comm)
+        if self.comm.rank == 0:
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(cache, f, indent=1)
+            os.replace(tmp_file, self.cache_file)
+
+    def _save_state(self):
+        """Returns copies of all fields"""
+        return {k: f.copy(deepcopy=True) for k, f in self.solver_obj.fields.items()
+                if isinstance(f, Function)}
+
+    def _restore_state(self, state):
+        """Restores the fields and reinitializes the time stepper"""
+        for k, f in state.items():
+            self.solver_obj.fields[k].assign(f)
+        self.solver_obj.timestepper.initialize(self.solver_obj.fields.solution_2d)
+
+    @staticmethod
+    def _set_parameters(stepper, params):
+        """Replaces the solver parameters of a time stepper and rebuilds its solvers"""
+        solver_parameters = stepper.solver_parameters
+        snes_type = solver_parameters.get('snes_type')
+        solver_parameters.clear()
+        solver_parameters.update(copy.deepcopy(params))
+        if snes_type is not None:
+            solver_parameters.setdefault('snes_type', snes_type)
+        stepper.update_solver()
+
+    def _run_candidate(self, stepper, update_forcings):
+        """
+        Runs a burst of time steps with the current solver parameters
+
+        :returns: (time per step, linear iterations per step, robust) tuple
+        """
+        t = self.solver_obj.simulation_time
+        times = []
+        events_start = [e.getPerfInfo()['count'] for e in self._events]
+        robust = True
+        try:
+            for i in range(self.steps):
+                t0 = time_mod.perf_counter()
+                stepper.advance(t + i*stepper.dt, update_forcings=update_forcings)
+                times.append(time_mod.perf_counter() - t0)
+            robust = bool(numpy.all(numpy.isfinite(stepper.solution.dat.data_ro)))
+        except ConvergenceError:
+            # raised on all ranks, as the convergence test is collective
+            robust = False
+        robust = self.comm.allreduce(robust, op=MPI.LAND)
+        if not robust:
+            return numpy.inf, numpy.nan, False
+        if len(times) > 1:
+            times = times[1:]
+        time_per_step = self.comm.allreduce(numpy.mean(times), op=MPI.MAX)
+        ksp_solves, pc_applications = [e.getPerfInfo()['count'] - c
+                                       for e, c in zip(self._events, events_start)]
+        iterations = (pc_applications - ksp_solves)/self.steps
+        return time_per_step, iterations, True
+
+    @PETSc.Log.EventDecorator("thetis.SolverTuner.tune")
+    def tune(self, update_forcings=None):
+        """
+        Chooses the solver parameters of all tunable time steppers
+
+        :kwarg update_forcings: user-defined function that takes the
+            simulation time and updates any time-dependent forcings
+        :returns: dict of the chosen candidate name of each time stepper
+        """
+        cache = self._read_cache()
+        cache_modified = False
+        for name, (stepper, equation_type) in self.get_timesteppers().items():
+            digest, key = self.get_key(name, stepper, equation_type)
+            if digest in cache:
+                entry = cache[digest]
+                self._set_parameters(stepper, entry['solver_parameters'])
+                self.choices[name] = entry['candidate']
+                print_output('{:}: using cached solver parameters "{:}"'.format(name, entry['candidate']))
+                continue
+
+            element_family = key['element_family']
+            candidates = OrderedDict([('initial', copy.deepcopy(stepper.solver_parameters))])
+            candidates.update(get_solver_candidates(equation_type, element_family, self.catalogue))
+            state = self._save_state()
+            results = OrderedDict()
+            print_output('{:}: tuning solver parameters with {:} time steps'.format(name, self.steps))
+            print_output('  {:32s} {:>12s} {:>10s}'.format('candidate', 's/step', 'its/step'))
+            for cand_name, params in candidates.items():
+                self._set_parameters(stepper, params)
+                results[cand_name] = self._run_candidate(stepper, update_forcings)
+                self._restore_state(state)
+                time_per_step, iterations, robust = results[cand_name]
+                if robust:
+                    print_output('  {:32s} {:12.4e} {:10.1f}'.format(cand_name, time_per_step, iterations))
+                else:
+                    print_output('  {:32s} {:>12s}'.format(cand_name, 'failed'))
+
+            robust = [n for n, r in results.items() if r[2]]
+            if len(robust) == 0:
+                raise ValueError('No robust solver parameters found for time stepper {:}'.format(name))
+            best = min(robust, key=lambda n: results[n][0])
+            self._set_parameters(stepper, candidates[best])
+            print_output('{:}: chose solver parameters "{:}"'.format(name, best))
+            self.choices[name] = best
+            self.results[name] = results
+            cache[digest] = {
+                'key': key,
+                'candidate': best,
+                'solver_parameters': candidates[best],
+                'time_per_step': results[best][0],
+            }
+            cache_modified = True
+        if cache_modified:
+            self._write_cache(cache)
+        return self.choices
@@ -36,7 +36,6 @@ http://dx.doi.org/10.1357/002224003322005087
 """
 import numpy
 from abc import ABC, abstractmethod
-from scipy.optimize import minimize
 from .log import print_output
 
 
@@ -49,6 +48,7 @@ __all__ = [
     'GOTMStabilityFunctionCanutoB',
     'GOTMStabilityFunctionCheng',
     'GOTMStabilityFunctionKanthaClayson',
+    'StabilityFunctionTable',
     'compute_normalized_frequencies'
 ]
 
@@ -103,6 +103,7 @@ class StabilityFunctionBase(ABC):
         self.lim_alpha_buoy = lim_alpha_buoy
         self.smooth_alpha_buoy_lim = smooth_alpha_buoy_lim
         self.alpha_buoy_crit = alpha_buoy_crit
+        self.lookup_table = None
         # for plotting and such
         self.description = []
         if self.lim_alpha_shear:
@@ -161,6 +162,7 @@ class StabilityFunctionBase(ABC):
                 s_m, s_h = self.eval_funcs(a_buoy, a_shear)
                 res = s_m*a_shear - s_h*a_buoy - 1.0
                 return res**2
+            from scipy.optimize import minimize
             p = minimize(cost, 1.0)
             assert p.success, 'solving alpha_shear failed, Ri_st={:}'.format(ri_st)
             a_shear = p.x[0]
@@ -229,6 +231,7 @@ class StabilityFunctionBase(ABC):
                 s_m, s_h = self.eval_funcs(a_buoy, a_shear)
                 res = s_m*a_shear - 1.0
                 return res**2
+            from scipy.optimize import minimize
             p = minimize(cost, 1.0)
             assert p.success, 'solving alpha_shear failed'
             a_shear = p.x[0]
@@ -328,18 +331,18 @@ class StabilityFunctionBase(ABC):
         c_mu_p = (self.nb0 + self.nb1*alpha_buoy + self.nb2*alpha_shear) / den
         return c_mu, c_mu_p
 
-    def evaluate(self, shear2, buoy2, k, eps):
+    def evaluate_normalized(self, alpha_buoy, alpha_shear):
         r"""
-        Evaluate stability functions from dimensional variables.
+        Evaluate stability functions from normalized frequencies.
 
         Applies limiters on :math:`\alpha_N` and :math:`\alpha_M`.
 
-        :arg shear2: shear frequency squared, :math:`M^2`
-        :arg buoy2: buoyancy frequency squared,:math:`N^2`
-        :arg k: turbulent kinetic energy, :math:`k`
-        :arg eps: TKE dissipation rate, :math:`\varepsilon`
+        :arg alpha_buoy: normalized buoyancy frequency :math:`\alpha_N`
+        :arg alpha_shear: normalized shear frequency :math:`\alpha_M`
+        :returns: :math:`S_m`, :math:`S_\rho`
         """
-        alpha_buoy, alpha_shear = compute_normalized_frequencies(shear2, buoy2, k, eps)
+        alpha_buoy = numpy.array(alpha_buoy, dtype=float)
+        alpha_shear = numpy.array(alpha_shear, dtype=float)
         if self.lim_alpha_buoy:
             # limit min (negative) alpha_buoy (Umlauf and Burchard, 2005)
             if not self.smooth_alpha_buoy_lim:
@@ -347,10 +350,9 @@ class StabilityFunctionBase(ABC):
                 numpy.maximum(alpha_buoy, self.get_alpha_buoy_min(), alpha_buoy)
             else:
                 # do smooth limiting instead (Buchard and Petersen, 1999, eq 19)
-                ab_smooth_min = self.get_alpha_buoy_smooth_min(alpha_buoy)
                 # NOTE this must be applied to values alpha_buoy < ab_crit only!
                 ix = alpha_buoy < self.alpha_buoy_crit
-                alpha_buoy[ix] = ab_smooth_min[ix]
+                alpha_buoy[ix] = self.get_alpha_buoy_smooth_min(alpha_buoy[ix])
 
         if self.lim_alpha_shear:
             # limit max alpha_shear (Umlauf and Burchard, 2005, eq 44)
@@ -359,6 +361,146 @@ class StabilityFunctionBase(ABC):
 
         return self.eval_funcs(alpha_buoy, alpha_shear)
 
+    def enable_lookup_table(self, **kwargs):
+        """
+        Evaluate the stability functions from a lookup table.
+
+        Keyword arguments are passed to :class:`StabilityFunctionTable`.
+        """
+        self.lookup_table = StabilityFunctionTable(self, **kwargs)
+        return self.lookup_table
+
+    def evaluate(self, shear2, buoy2, k, eps):
+        r"""
+        Evaluate stability functions from dimensional variables.
+
+        Applies limiters on :math:`\alpha_N` and :math:`\alpha_M`. If a lookup
+        table has been enabled, the functions are interpolated from the table.
+
+        :arg shear2: shear frequency squared, :math:`M^2`
+        :arg buoy2: buoyancy frequency squared,:math:`N^2`
+        :arg k: turbulent kinetic energy, :math:`k`
+        :arg eps: TKE dissipation rate, :math:`\varepsilon`
+        """
+        alpha_buoy, alpha_shear = compute_normalized_frequencies(shear2, buoy2, k, eps)
+        if self.lookup_table is not None:
+            return self.lookup_table.evaluate(alpha_buoy, alpha_shear)
+        return self.evaluate_normalized(alpha_buoy, alpha_shear)
+
+
+class StabilityFunctionTable(object):
+    r"""
+    Lookup table for stability functions.
+
+    The limited stability functions :math:`S_m`, :math:`S_\rho` are tabulated
+    over :math:`(\alpha_N, \alpha_M)` and evaluated with bilinear
+    interpolation. The limiters are included in the tabulated values.
+
+    The table nodes are uniformly spaced in :math:`\sinh^{-1}(\alpha)`, which
+    concentrates resolution near zero while covering large values. The table
+    is refined until the interpolation error, estimated at the cell centers,
+    is below ``tolerance``. The error elsewhere in a cell can be a few times
+    larger than this estimate. Values outside the table domain are evaluated
+    directly.
+
+    .. note::
+        The table is not faster than the direct evaluation: in
+        ``benchmarks/bench_stability_functions.py`` the table lookup is 2-5
+        times slower than :meth:`StabilityFunctionBase.evaluate_normalized`.
+        It is not used by the turbulence models and is kept for
+        benchmarking.
+    """
+    def __init__(self, stability_func, alpha_buoy_range=(-10.0, 1000.0),
+                 alpha_shear_range=(0.0, 1000.0), tolerance=1e-3,
+                 initial_size=65, max_size=1025):
+        r"""
+        :arg stability_func: :class:`StabilityFunctionBase` instance
+        :kwarg alpha_buoy_range: (min, max) of tabulated :math:`\alpha_N`
+        :kwarg alpha_shear_range: (min, max) of tabulated :math:`\alpha_M`
+        :kwarg float tolerance: tolerance of the interpolation error, estimated
+            at the cell centers
+        :kwarg int initial_size: initial number of nodes in each direction
+        :kwarg int max_size: maximum number of nodes in each direction
+        """
+        self.stability_func = stability_func
+        self.alpha_buoy_range = alpha_buoy_range
+        self.alpha_shear_range = alpha_shear_range
+        self.tolerance = tolerance
+        t_buoy = numpy.arcsinh(alpha_buoy_range)
+        t_shear = numpy.arcsinh(alpha_shear_range)
+        n = initial_size
+        while True:
+            self._build(t_buoy, t_shear, n)
+            self.error = self._estimate_error()
+            if self.error <= tolerance or 2*n - 1 > max_size:
+                break
+            n = 2*n - 1
+        if self.error > tolerance:
+            print_output('Stability function table error {:.2e} exceeds tolerance {:.2e}'.format(self.error, tolerance))
+
+    def _build(self, t_buoy, t_shear, n):
+        """Tabulates the functions on n x n nodes"""
+        self.size = n
+        self.t_buoy = numpy.linspace(t_buoy[0], t_buoy[1], n)
+        self.t_shear = numpy.linspace(t_shear[0], t_shear[1], n)
+        a_buoy, a_shear = numpy.meshgrid(numpy.sinh(self.t_buoy),
+                                         numpy.sinh(self.t_shear), indexing='ij')
+        values = numpy.array(self.stability_func.evaluate_normalized(a_buoy, a_shear))
+        # NOTE store both functions of a node next to each other
+        self.values = numpy.ascontiguousarray(numpy.moveaxis(values, 0, -1).reshape(-1, 2))
+
+    def _estimate_error(self):
+        """Estimates the maximum interpolation error at the cell centers"""
+        t_b = 0.5*(self.t_buoy[1:] + self.t_buoy[:-1])
+        t_s = 0.5*(self.t_shear[1:] + self.t_shear[:-1])
+        a_buoy, a_shear = numpy.meshgrid(numpy.sinh(t_b), numpy.sinh(t_s), indexing='ij')
+        exact = numpy.array(self.stability_func.evaluate_normalized(a_buoy, a_shear))
+        approx = numpy.array(self.interpolate(a_buoy.ravel(), a_shear.ravel()))
+        return numpy.abs(exact.reshape(2, -1) - approx).max()
+
+    def interpolate(self, alpha_buoy, alpha_shear):
+        """
+        Bilinear interpolation in the table.
+
+        Values outside the table domain are extrapolated from the boundary
+        cells.
+        """
+        def cell_index(t, nodes):
+            delta = nodes[1] - nodes[0]
+            f = (t - nodes[0])/delta
+            i = numpy.clip(numpy.floor(f).astype(int), 0, len(nodes) - 2)
+            return i, (f - i)[:, numpy.newaxis]
+
+        i, wi = cell_index(numpy.arcsinh(numpy.ravel(alpha_buoy)), self.t_buoy)
+        j, wj = cell_index(numpy.arcsinh(numpy.ravel(alpha_shear)), self.t_shear)
+        n = self.size
+        k = i*n + j
+        v = self.values
+        f = ((1.0 - wi)*((1.0 - wj)*v[k] + wj*v[k + 1])
+             + wi*((1.0 - wj)*v[k + n] + wj*v[k + n + 1]))
+        shape = numpy.shape(alpha_buoy)
+        return f[:, 0].reshape(shape), f[:, 1].reshape(shape)
+
+    def evaluate(self, alpha_buoy, alpha_shear):
+        """
+        Evaluate stability functions from normalized frequencies.
+
+        :arg alpha_buoy: normalized buoyancy frequency :math:`\alpha_N`
+        :arg alpha_shear: normalized shear frequency :math:`\alpha_M`
+        :returns: :math:`S_m`, :math:`S_\rho`
+        """
+        alpha_buoy = numpy.asarray(alpha_buoy, dtype=float)
+        alpha_shear = numpy.asarray(alpha_shear, dtype=float)
+        c_mu, c_mu_p = self.interpolate(alpha_buoy, alpha_shear)
+        outside = ((alpha_buoy < self.alpha_buoy_range[0])
+                   | (alpha_buoy > self.alpha_buoy_range[1])
+                   | (alpha_shear < self.alpha_shear_range[0])
+                   | (alpha_shear > self.alpha_shear_range[1]))
+        if numpy.any(outside):
+            c_mu[outside], c_mu_p[outside] = self.stability_func.evaluate_normalized(
+                alpha_buoy[outside], alpha_shear[outside])
+        return c_mu, c_mu_p
+
 
 class GOTMStabilityFunctionBase(StabilityFunctionBase, ABC):
     """
@@ -0,0 +1,126 @@
+"""
+Summary statistics of the model state, reported on every export.
+"""
+from .utility import *
+from .callback import DiagnosticHDF5
+
+__all__ = ['StateReporter']
+
+
+class StateReporter(object):
+    """
+    Computes summary statistics of a set of fields with batched reductions
+
+    Supported statistics are
+
+    - 'norm': L2 norm of the field
+    - 'min', 'max': minimum and maximum nodal value, over all components
+    - 'nan': 1 if the field contains NaN values, 0 otherwise
+
+    The L2 norms of all fields on the same mesh are computed with a single
+    assembly of a vector-valued functional. The nodal statistics of all
+    fields are combined in a single MPI reduction.
+
+    .. code-block:: python
+
+        reporter = StateReporter({'eta': elev_2d, 'u': uv_2d},
+                                 statistics=['norm', 'max'])
+        values = reporter.evaluate()
+        print(values['eta', 'norm'])
+
+    """
+    available_statistics = ['norm', 'min', 'max', 'nan']
+    formats = {'norm': '14.4f', 'min': '12.4f', 'max': '12.4f', 'nan': '3d'}
+
+    def __init__(self, fields, statistics=('norm', ), comm=COMM_WORLD):
+        """
+        :arg fields: dict of fields to report, label: :class:`Function`
+        :kwarg statistics: list of statistics to compute
+        :kwarg comm: MPI communicator
+        """
+        for s in statistics:
+            if s not in self.available_statistics:
+                raise ValueError('Unknown statistic "{:}", must be one of {:}'.format(s, self.available_statistics))
+        self.fields = OrderedDict(fields)
+        self.statistics = list(statistics)
+        self.comm = comm
+        self.hdf_exporter = None
+
+        # one vector-valued functional per mesh for all L2 norms
+        self._norm_forms = []
+        if 'norm' in self.statistics:
+            labels_by_mesh = OrderedDict()
+            for label, f in self.fields.items():
+                labels_by_mesh.setdefault(f.function_space().mesh(), []).append(label)
+            for mesh, labels in labels_by_mesh.items():
+                fs = get_functionspace(mesh, 'R', 0, vector=True, dim=len(labels))
+                test = TestFunction(fs)
+                form = sum(inner(self.fields[l], self.fields[l])*test[i]*dx
+                           for i, l in enumerate(labels))
+                self._norm_forms.append((labels, form, Cofunction(fs.dual())))
+
+    @property
+    def keys(self):
+        """List of reported (label, statistic) pairs"""
+        return [(label, s) for label in self.fields for s in self.statistics]
+
+    @PETSc.Log.EventDecorator("thetis.StateReporter.evaluate")
+    def evaluate(self):
+        """
+        Computes all statistics
+
+        :returns: dict of values with (label, statistic) keys
+        """
+        values = {}
+        for labels, form, result in self._norm_forms:
+            assemble(form, tensor=result)
+            for label, v in zip(labels, result.dat.data_ro):
+                values[label, 'norm'] = numpy.sqrt(v)
+
+        nodal_stats = [s for s in self.statistics if s != 'norm']
+        if nodal_stats:
+            # -min, max and nan flag of every field, reduced with MAX
+            local = numpy.empty((len(self.fields), 3))
+            for i, f in enumerate(self.fields.values()):
+                data = numpy.concatenate([d.data_ro.ravel() for d in f.dat])
+                nan_mask = numpy.isnan(data)
+                data = data[~nan_mask]
+                local[i] = (-numpy.min(data, initial=numpy.inf),
+                            numpy.max(data, initial=-numpy.inf),
+                            nan_mask.any())
+            reduced = numpy.empty_like(local)
+            self.comm.Allreduce(local, reduced, op=MPI.MAX)
+            for i, label in enumerate(self.fields):
+                values[label, 'min'] = -reduced[i, 0]
+                values[label, 'max'] = reduced[i, 1]
+                values[label, 'nan'] = int(reduced[i, 2])
+        return OrderedDict((k, values[k]) for k in self.keys)
+
+    def get_entries(self, values):
+        """
+        Returns the print_state entries of the given values
+
+        :arg values: dict returned by :meth:`evaluate`
+        :returns: list of (header, value, format) tuples
+        """
+        return [('{:} {:}'.format(label, s), v, self.formats[s])
+                for (label, s), v in values.items()]
+
+    def export(self, values, filename, time, cputime, iteration, new_file=True):
+        """
+        Appends the values and the cputime to an HDF5 log file
+
+        :arg values: dict returned by :meth:`evaluate`
+        :arg str filename: HDF5 file name
+        :arg float time: simulation time
+        :arg float cputime: CPU time since the previous export
+        :arg int iteration: time step index
+        :kwarg bool new_file: create a new file on the first call, otherwise
+            append to an existing file
+        """
+        if self.hdf_exporter is None:
+            varnames = ['{:}_{:}'.format(label, s) for label, s in values]
+            varnames += ['cputime', 'iteration']
+            self.hdf_exporter = DiagnosticHDF5(filename, varnames, comm=self.comm,
+                                               new_file=new_file)
+        self.hdf_exporter.export(list(values.values()) + [cputime, iteration], time=time)
@@ -0,0 +1,160 @@
+"""
+Parameter sweeps that reuse one 2D solver object.
+"""
+from .utility import *
+from .configuration import FiredrakeConstantTraitlet, FiredrakeCoefficient, FiredrakeScalarExpression
+
+__all__ = ['ParameterSweep']
+
+updatable_traitlets = (FiredrakeConstantTraitlet, FiredrakeCoefficient, FiredrakeScalarExpression)
+
+
+class ParameterSweep(object):
+    """
+    Runs a 2D solver repeatedly with different parameters and initial conditions
+
+    The equations, forms, compiled kernels and variational solvers of the
+    solver object are built once. Between the runs only the values of the
+    declared parameters are updated, the model state is reset, and new
+    initial conditions and boundary forcings are assigned, so that every run
+    costs only its time stepping.
+
+    Parameters are model options declared as
+    :class:`.FiredrakeConstantTraitlet`, :class:`.FiredrakeCoefficient` or
+    :class:`.FiredrakeScalarExpression`, e.g. ``'manning_drag_coefficient'``
+    or ``'sediment_model_options.average_sediment_size'``. They must be
+    declared before the equations are created and be set to a
+    :class:`Constant` or a :class:`Function`; the sweep replaces them by
+    private copies that are updated in place. Other :class:`Constant` or
+    :class:`Function` objects used by the model, e.g. boundary forcings, can
+    also be updated in each run.
+
+    .. code-block:: python
+
+        solver_obj.options.manning_drag_coefficient = Constant(0.02)
+        sweep = ParameterSweep(solver_obj, ['manning_drag_coefficient'])
+        solver_obj.bnd_functions['shallow_water'] = {1: {'elev': tide_elev}}
+        solver_obj.assign_initial_conditions(elev=elev_init)
+        for n in [0.02, 0.025, 0.03]:
+            sweep.run({'manning_drag_coefficient': n, tide_elev: 0.5})
+            record_result(solver_obj.fields.elev_2d)
+
+    All runs start from the model state at the first call of :meth:`run`.
+    The simulation time, iteration and export counters are reset too, so
+    exported files are overwritten by every run.
+    """
+    def __init__(self, solver_obj, parameters):
+        """
+        :arg solver_obj: a :class:`.FlowSolver2d` object whose equations
+            have not been created yet
+        :arg parameters: names of the model options that are updated between
+            the runs. Options of nested option objects are given with dots.
+        """
+        if hasattr(solver_obj, 'equations'):
+            raise ValueError('Sweep parameters must be declared before the equations are created')
+        self.solver_obj = solver_obj
+        self.parameters = OrderedDict()
+        """Updatable objects of the declared parameters"""
+        for name in parameters:
+            self.parameters[name] = self._declare(name)
+        self.initial_state = None
+
+    def _declare(self, name):
+        """Replaces a model option by a private updatable copy"""
+        path = name.split('.')
+        options = self.solver_obj.options
+        for p in path[:-1]:
+            options = getattr(options, p)
+        key = path[-1]
+        if not options.has_trait(key):
+            raise ValueError('Unknown option "{:}"'.format(name))
+        if not isinstance(options.traits()[key], updatable_traitlets):
+            raise ValueError('Option "{:}" is not a Firedrake Constant or expression'.format(name))
+        value = getattr(options, key)
+        if isinstance(value, Constant):
+            copy = Constant(numpy.reshape(value.values(), value.ufl_shape))
+        elif isinstance(value, Function):
+            copy = value.copy(deepcopy=True)
+        else:
+            raise ValueError('Option "{:}" must be a Constant or a Function to be updated, '
+                             'got {:}'.format(name, value))
+        setattr(options, key, copy)
+        return copy
+
+    def _save_state(self):
+        """Stores the model fields and counters"""
+        solver_obj = self.solver_obj
+        if not solver_obj._initialized:
+            solver_obj.initialize()
+        fields = {k: f.copy(deepcopy=True) for k, f in solver_obj.fields.items()
+                  if isinstance(f, Function)}
+        counters = {k: getattr(solver_obj, k)
+                    for k in ['simulation_time', 'iteration', 'i_export', 'next_export_t']}
+        self.initial_state = (fields, counters)
+
+    def _restore_state(self):
+        """Restores the model fields and counters"""
+        fields, counters = self.initial_state
+        for k, f in fields.items():
+            self.solver_obj.fields[k].assign(f)
+        for k, v in counters.items():
+            setattr(self.solver_obj, k, v)
+
+    @staticmethod
+    def _assign(target, value):
+        """Assigns a new value to a Constant or a Function"""
+        if isinstance(target, Function) and isinstance(value, ufl.core.expr.Expr) \
+                and not isinstance(value, (Constant, Function)):
+            target.interpolate(value)
+        else:
+            target.assign(value)
+
+    def update(self, values):
+        """
+        Assigns new values to the parameters
+
+        :arg values: dict of new values. Keys are declared parameter names or
+            :class:`Constant` or :class:`Function` objects used by the model.
+            Values are numbers, :class:`Constant`\\s, :class:`Function`\\s or,
+            for :class:`Function` targets, UFL expressions.
+        """
+        for key, value in values.items():
+            if isinstance(key, str):
+                if key not in self.parameters:
+                    raise ValueError('Parameter "{:}" was not declared in the sweep'.format(key))
+                target = self.parameters[key]
+            elif isinstance(key, (Constant, Function)):
+                target = key
+            else:
+                raise ValueError('Cannot update {:}: not a parameter name, Constant or Function'.format(key))
+            self._assign(target, value)
+
+    @PETSc.Log.EventDecorator("thetis.ParameterSweep.run")
+    def run(self, values=None, initial_conditions=None, update_forcings=None, export_func=None):
+        """
+        Runs the model with new parameter values
+
+        :kwarg values: new parameter values, see :meth:`update`
+        :kwarg initial_conditions: dict of initial conditions, passed to
+            :meth:`.FlowSolver2d.assign_initial_conditions`. If None, the
+            initial state of the first run is used.
+        :kwarg update_forcings: User-defined function that takes simulation
+            time as an argument and updates time-dependent boundary
+            conditions (if any).
+        :kwarg export_func: User-defined function (with no arguments) that
+            will be called on every export.
+        """
+        solver_obj = self.solver_obj
+        if self.initial_state is None:
+            self._save_state()
+        else:
+            self._restore_state()
+        if values is not None:
+            self.update(values)
+        if initial_conditions is not None:
+            solver_obj.assign_initial_conditions(**initial_conditions)
+        else:
+            if solver_obj.sediment_model is not None:
+                solver_obj.sediment_model.update()
+            solver_obj.timestepper.initialize(solver_obj.fields.solution_2d)
+        solver_obj.iterate(update_forcings=update_forcings, export_func=export_func)
@@ -0,0 +1,206 @@
+"""
+Performance telemetry stream of the time loop.
+"""
+from .utility import *
+from .callback import DiagnosticHDF5
+from contextlib import contextmanager
+import json
+import time as time_mod
+
+__all__ = ['Telemetry']
+
+
+def _io_write_bytes():
+    """Returns the number of bytes written by this process, or nan if unknown"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return numpy.nan
+
+
+class Telemetry(object):
+    """
+    Records performance metrics of the time loop and streams them to a file
+
+    On every time step the wall clock time of the step and of its phases
+    (e.g. 'advance', 'callbacks', 'export') is recorded. Every ``interval``
+    steps, the following metrics of the interval are gathered on rank 0 and
+    their minimum, maximum and mean over all ranks are written to the output
+    file:
+
+    - wall time of the steps and of each phase
+    - wall time of the PETSc log stages entered with :func:`.timed_stage`,
+      e.g. the stages of the 3D time integrators ('mode2d', 'momentum_eq',
+      ...), reported as 'wall_stage_<name>'. Nested stages are included in
+      the time of the enclosing stage.
+    - time and count of the given PETSc log events, summed over all log
+      stages
+    - number of nonlinear solves, Jacobian evaluations, linear solves and
+      preconditioner applications, i.e. the counts of the SNESSolve,
+      SNESJacobianEval, KSPSolve and PCApply events. The latter two
+      approximate the number of SNES and KSP iterations.
+    - bytes written by the process, if available from the operating system
+
+    Files with '.h5' or '.hdf5' suffix are written in HDF5 format, one
+    dataset per metric. The metrics are fixed by the first record, so stages
+    entered for the first time later on are not included. Otherwise a JSON
+    record is appended per interval.
+
+    If ``filename`` is None telemetry is disabled and all methods are no-ops.
+    """
+    solver_events = ['SNESSolve', 'SNESJacobianEval', 'KSPSolve', 'PCApply']
+
+    def __init__(self, filename, interval=10, phases=('advance', 'callbacks', 'export'),
+                 events=(), comm=COMM_WORLD, new_file=True):
+        """
+        :arg str filename: output file, or None to disable telemetry
+        :kwarg int interval: number of time steps between writes
+        :kwarg phases: names of the phases of the time step. Phases are
+            reported in every record, with zero time if they did not occur.
+        :kwarg events: names of PETSc log events to report, e.g. names of
+            :class:`PETSc.Log.EventDecorator` events or 'SNESSolve'
+        :kwarg comm: MPI communicator
+        :kwarg bool new_file: create a new file, otherwise append to an
+            existing one
+        """
+        self.enabled = filename is not None
+        self.filename = filename
+        self.interval = interval
+        self.comm = comm
+        self.new_file = new_file
+        self.phases = list(phases)
+        self.event_names = list(events)
+        self.hdf_exporter = None
+        self.hdf5_varnames = None
+        if not self.enabled:
+            return
+        PETSc.Log.begin()
+        self.events = [PETSc.Log.Event(e) for e in self.event_names + self.solver_events]
+        # stage ids are consecutive, so this hidden stage bounds the ids of
+        # all stages registered so far, also those not entered with timed_stage
+        self._stage_bound = PETSc.Log.Stage('thetis.Telemetry')
+        self._stage_bound.setVisible(False)
+        self.hdf5_format = os.path.splitext(filename)[1] in ['.h5', '.hdf5']
+        create_directory(os.path.dirname(os.path.abspath(filename)), comm=comm)
+        if comm.rank == 0 and new_file and not self.hdf5_format:
+            open(filename, 'w').close()
+        self._reset()
+
+    def _event_state(self):
+        """Returns cumulative time and count of all events, summed over all log stages"""
+        nb_stages = max([self._stage_bound.id] + [s.id for s, t in log_stages.values()]) + 1
+        state = numpy.zeros((len(self.events), 2))
+        for i, e in enumerate(self.events):
+            for stage in range(nb_stages):
+                info = e.getPerfInfo(stage)
+                state[i] += info['time'], info['count']
+        return state
+
+    @staticmethod
+    def _stage_times():
+        """Returns cumulative wall time of the stages entered with timed_stage"""
+        return OrderedDict((name, t) for name, (s, t) in log_stages.items())
+
+    def _reset(self):
+        """Starts a new interval"""
+        self.nb_steps = 0
+        self.phase_times = OrderedDict((p, 0.) for p in self.phases)
+        self.step_time = 0.
+        self._events_start = self._event_state()
+        self._stages_start = self._stage_times()
+        self._io_start = _io_write_bytes()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Context manager that records the wall time of a phase of the time step
+
+        :arg str name: name of the phase, one of the declared phases
+        """
+        if not self.enabled:
+            yield
+            return
+        t0 = time_mod.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[name] += time_mod.perf_counter() - t0
+
+    def start_step(self):
+        """Marks the start of a time step"""
+        if self.enabled:
+            self._step_start = time_mod.perf_counter()
+
+    def end_step(self, iteration, time):
+        """
+        Marks the end of a time step, and writes the metrics every ``interval`` steps
+
+        :arg int iteration: time step index
+        :arg float time: simulation time
+        """
+        if not self.enabled:
+            return
+        self.step_time += time_mod.perf_counter() - self._step_start
+        self.nb_steps += 1
+        if self.nb_steps >= self.interval:
+            self.flush(iteration, time)
+
+    @PETSc.Log.EventDecorator("thetis.Telemetry.flush")
+    def flush(self, iteration, time):
+        """
+        Writes the metrics of the current interval
+
+        :arg int iteration: time step index
+        :arg float time: simulation time
+        """
+        if not self.enabled or self.nb_steps == 0:
+            return
+        names = ['wall_step'] + ['wall_' + p for p in self.phase_times]
+        values = [self.step_time] + list(self.phase_times.values())
+        for name, t in self._stage_times().items():
+            names.append('wall_stage_' + name.replace(' ', '_'))
+            values.append(t - self._stages_start.get(name, 0.))
+        events = self._event_state() - self._events_start
+        for e, (t, c) in zip(self.event_names + self.solver_events, events):
+            if e in self.event_names:
+                names.append(e + '_time')
+                values.append(t)
+            names.append(e + '_count')
+            values.append(c)
+        names.append('io_write_bytes')
+        values.append(_io_write_bytes() - self._io_start)
+
+        all_values = self.comm.gather(dict(zip(names, values)), root=0)
+        if self.comm.rank == 0:
+            record = OrderedDict([('iteration', iteration), ('time', time),
+                                  ('steps', self.nb_steps), ('nranks', self.comm.size)])
+            for name in names:
+                v = numpy.array([d.get(name, 0.) for d in all_values])
+                record[name] = OrderedDict([('min', v.min()), ('max', v.max()), ('mean', v.mean())])
+            self._write(record)
+        self._reset()
+
+    def _write(self, record):
+        """Writes a record on rank 0"""
+        if self.hdf5_format:
+            varnames = ['iteration', 'steps', 'nranks']
+            values = [record['iteration'], record['steps'], record['nranks']]
+            for name, stats in record.items():
+                if isinstance(stats, dict):
+                    for s, v in stats.items():
+                        varnames.append('{:}_{:}'.format(name, s))
+                        values.append(v)
+            if self.hdf_exporter is None:
+                self.hdf_exporter = DiagnosticHDF5(self.filename, varnames, comm=MPI.COMM_SELF,
+                                                   new_file=self.new_file)
+                self.hdf5_varnames = varnames
+            values = dict(zip(varnames, values))
+            values = [values.get(v, numpy.nan) for v in self.hdf5_varnames]
+            self.hdf_exporter.export(values, time=record['time'])
+        else:
+            with open(self.filename, 'a') as f:
+                f.write(json.dumps(record) + '\n')
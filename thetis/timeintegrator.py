@@ -4,7 +4,7 @@ Generic time integration schemes to advance equations in time.
 from .utility import *
 from abc import ABC, abstractmethod
 import numpy
-from pyop2.profiling import timed_region, timed_stage
+from pyop2.profiling import timed_region
 
 CFL_UNCONDITIONALLY_STABLE = numpy.inf
 # CFL coefficient for unconditionally stable methods
@@ -2,14 +2,20 @@
 Timezone definitions and conversion methods
 """
 import datetime
-import pytz
 
-epoch = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+# pytz is exported for compatibility, and imported on first access
+__all__ = ['datetime', 'epoch', 'FixedTimeZone', 'datetime_to_epoch', 'epoch_to_datetime']
+__all__ += ['pytz']  # NOQA
 
+epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
 
-class FixedTimeZone(pytz._FixedOffset):
+
+class FixedTimeZone(datetime.tzinfo):
     """
     Class that represents a fixed time zone defined by UTC offset in hours.
+
+    Provides the ``localize`` and ``normalize`` methods of :mod:`pytz` time
+    zones.
     """
     def __init__(self, offset, name):
         """
@@ -17,13 +23,33 @@ class FixedTimeZone(pytz._FixedOffset):
         arg str name: timezone name
         """
         self._offset_hours = offset
-        offset_minutes = offset*60
-        super(FixedTimeZone, self).__init__(offset_minutes)
+        self._offset = datetime.timedelta(hours=offset)
         self.zone = name
 
+    def utcoffset(self, dt):
+        return self._offset
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
     def tzname(self, dt):
         return self.zone
 
+    def localize(self, dt, is_dst=False):
+        """Attaches this time zone to a naive datetime"""
+        if dt.tzinfo is not None:
+            raise ValueError('Not naive datetime (tzinfo is already set)')
+        return dt.replace(tzinfo=self)
+
+    def normalize(self, dt, is_dst=False):
+        """Converts an aware datetime to this time zone"""
+        if dt.tzinfo is None:
+            raise ValueError('Naive time - no tzinfo set')
+        return dt.astimezone(self)
+
+    def __reduce__(self):
+        return FixedTimeZone, (self._offset_hours, self.zone)
+
     def __repr__(self):
         return 'FixedTimeZone({:}, {:})'.format(self._offset_hours, self.zone)
 
@@ -40,3 +66,11 @@ def epoch_to_datetime(t):
     Convert python datetime object to epoch time stamp.
     """
     return epoch + datetime.timedelta(seconds=t)
+
+
+def __getattr__(name):
+    # pytz is imported on first access, e.g. timezone.pytz.utc
+    if name == 'pytz':
+        import pytz
+        return pytz
+    raise AttributeError("module 'thetis.timezone' has no attribute '{:}'".format(name))
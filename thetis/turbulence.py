@@ -146,7 +146,6 @@ from .log import *
 from .options import GLSModelOptions, PacanowskiPhilanderModelOptions
 import numpy
 from abc import ABC, abstractmethod
-from pyop2.profiling import timed_stage
 
 
 def set_func_min_val(f, minval):
@@ -167,6 +166,10 @@ class VerticalGradSolver(object):
     """
     Computes vertical gradient in the weak sense.
 
+    If the solution is in a P0 space the mass matrix is diagonal and the
+    gradient only couples the cell to its neighbours in the same column. The
+    gradient is then evaluated by assembling the right hand side and scaling
+    by the cell volume, without solving a linear system.
     """
     @PETSc.Log.EventDecorator("thetis.VerticalGradSolver.__init__")
     def __init__(self, source, solution, solver_parameters=None):
@@ -199,13 +202,35 @@ class VerticalGradSolver(object):
         l = -inner(p, Dx(test, 2))*dx
         l += avg(p)*jump(test, normal[2])*dS_h
         l += p*test*normal[2]*(ds_t + ds_b)
-        prob = LinearVariationalProblem(a, l, self.solution, constant_jacobian=True)
-        self.weak_grad_solver = LinearVariationalSolver(prob, solver_parameters=solver_parameters)
+        self.cellwise = self.fs.finat_element.space_dimension() == 1
+        if self.cellwise:
+            self.rhs_form = l
+            self.mass_form = test*dx
+            self.rhs = Cofunction(self.fs.dual())
+            self.mass = Cofunction(self.fs.dual())
+        else:
+            prob = LinearVariationalProblem(a, l, self.solution, constant_jacobian=True)
+            self.weak_grad_solver = LinearVariationalSolver(prob, solver_parameters=solver_parameters)
+
+    def evaluate(self):
+        """
+        Returns the gradient as an array, without storing it in the solution.
+
+        Only available if the solution is in a P0 space.
+        """
+        assert self.cellwise, 'Cell-wise evaluation requires a P0 space'
+        # NOTE mass must be reassembled as the mesh may have moved
+        assemble(self.rhs_form, tensor=self.rhs)
+        assemble(self.mass_form, tensor=self.mass)
+        return self.rhs.dat.data_ro/self.mass.dat.data_ro
 
     @PETSc.Log.EventDecorator("thetis.VerticalGradSolver.solve")
     def solve(self):
         """Computes the gradient"""
-        self.weak_grad_solver.solve()
+        if self.cellwise:
+            self.solution.dat.data[:] = self.evaluate()
+        else:
+            self.weak_grad_solver.solve()
 
 
 class ShearFrequencySolver(object):
@@ -255,10 +280,19 @@ class ShearFrequencySolver(object):
         """
         with timed_stage('shear_freq_solv'):
             mu_comp = [self.mu, self.mv]
+            gamma = self.relaxation if not init_solve else 1.0
+            if all(solver.cellwise for solver in self.var_solvers):
+                m2 = 0.0
+                for i_comp, solver in enumerate(self.var_solvers):
+                    mu = mu_comp[i_comp].dat.data
+                    mu[:] = gamma*solver.evaluate() + (1.0 - gamma)*mu
+                    m2 = m2 + mu*mu
+                # crop small/negative values
+                self.m2.dat.data[:] = numpy.maximum(m2, self.minval)
+                return
             self.m2.assign(0.0)
             for i_comp, solver in enumerate(self.var_solvers):
                 solver.solve()
-                gamma = self.relaxation if not init_solve else 1.0
                 mu_comp[i_comp].assign(gamma*self.mu_tmp
                                        + (1.0 - gamma)*mu_comp[i_comp])
                 self.m2.interpolate(self.m2 + mu_comp[i_comp]*mu_comp[i_comp])
@@ -273,9 +307,12 @@ class BuoyFrequencySolver(object):
 
     .. math::
         N^2 = -\frac{g}{\rho_0}\frac{\partial \rho}{\partial z}
+
+    Optionally splits :math:`N^2` to positive and negative parts.
     """
     @PETSc.Log.EventDecorator("thetis.BuoyFrequencySolver.__init__")
-    def __init__(self, rho, n2, n2_tmp, relaxation=1.0, minval=1e-12):
+    def __init__(self, rho, n2, n2_tmp, relaxation=1.0, minval=1e-12,
+                 n2_pos=None, n2_neg=None):
         """
         :arg rho: water density field
         :type rho: :class:`Function`
@@ -286,6 +323,12 @@ class BuoyFrequencySolver(object):
         :kwarg float relaxation: relaxation coefficient for mixing old and new
             values N2 = relaxation*N2_new + (1-relaxation)*N2_old
         :kwarg float minval: minimum value for :math:`N^2`
+        :kwarg n2_pos: field for the positive part of :math:`N^2`, set to
+            ``minval`` where :math:`N^2` is negative
+        :type n2_pos: :class:`Function`
+        :kwarg n2_neg: field for the negative part of :math:`N^2`, set to zero
+            where :math:`N^2` is positive
+        :type n2_neg: :class:`Function`
         """
         self._no_op = False
         if rho is None:
@@ -295,6 +338,9 @@ class BuoyFrequencySolver(object):
 
             self.n2 = n2
             self.n2_tmp = n2_tmp
+            self.n2_pos = n2_pos
+            self.n2_neg = n2_neg
+            self.minval = minval
             self.relaxation = relaxation
 
             g = physical_constants['g_grav']
@@ -313,10 +359,20 @@ class BuoyFrequencySolver(object):
         """
         with timed_stage('buoy_freq_solv'):
             if not self._no_op:
-                self.var_solver.solve()
                 gamma = self.relaxation if not init_solve else 1.0
-                self.n2.assign(gamma*self.n2_tmp
-                               + (1.0 - gamma)*self.n2)
+                if self.var_solver.cellwise:
+                    n2 = self.n2.dat.data
+                    n2[:] = gamma*self.var_solver.evaluate() + (1.0 - gamma)*n2
+                else:
+                    self.var_solver.solve()
+                    self.n2.assign(gamma*self.n2_tmp
+                                   + (1.0 - gamma)*self.n2)
+                    n2 = self.n2.dat.data_ro
+                # split to positive and negative parts
+                if self.n2_pos is not None:
+                    self.n2_pos.dat.data[:] = numpy.where(n2 >= 0.0, n2, self.minval)
+                if self.n2_neg is not None:
+                    self.n2_neg.dat.data[:] = numpy.minimum(n2, 0.0)
 
 
 class TurbulenceModel(ABC):
@@ -455,7 +511,9 @@ class GenericLengthScaleModel(TurbulenceModel):
                                                            self.mu_tmp)
         if self.rho is not None:
             self.buoy_frequency_solver = BuoyFrequencySolver(self.rho, self.n2,
-                                                             self.n2_tmp)
+                                                             self.n2_tmp,
+                                                             n2_pos=self.n2_pos,
+                                                             n2_neg=self.n2_neg)
         print_output(self.options)
         self._initialized = False
 
@@ -498,13 +556,8 @@ class GenericLengthScaleModel(TurbulenceModel):
         self.shear_frequency_solver.solve(init_solve=init_solve)
 
         if self.rho is not None:
+            # also splits N2 to positive and negative parts
             self.buoy_frequency_solver.solve(init_solve=init_solve)
-            # split to positive and negative parts
-            self.n2_pos.assign(1e-12)
-            self.n2_neg.assign(0.0)
-            pos_ix = self.n2.dat.data[:] >= 0.0
-            self.n2_pos.dat.data[pos_ix] = self.n2.dat.data[pos_ix]
-            self.n2_neg.dat.data[~pos_ix] = self.n2.dat.data[~pos_ix]
 
     @PETSc.Log.EventDecorator("thetis.GenericLengthScaleModel.postprocess")
     def postprocess(self):
@@ -916,7 +969,8 @@ class PacanowskiPhilanderModel(TurbulenceModel):
                                                            self.mu_tmp)
         if self.rho is not None:
             self.buoy_frequency_solver = BuoyFrequencySolver(self.rho, self.n2,
-                                                             self.n2_tmp)
+                                                             self.n2_tmp,
+                                                             n2_pos=self.n2_pos)
 
         self.initialize()
         print_output(self.options)
@@ -941,11 +995,8 @@ class PacanowskiPhilanderModel(TurbulenceModel):
         self.shear_frequency_solver.solve(init_solve=init_solve)
 
         if self.rho is not None:
+            # also computes positive part of N2
             self.buoy_frequency_solver.solve(init_solve=init_solve)
-            # split to positive and negative parts
-            self.n2_pos.assign(1e-12)
-            pos_ix = self.n2.dat.data[:] >= 0.0
-            self.n2_pos.dat.data[pos_ix] = self.n2.dat.data[pos_ix]
 
     @PETSc.Log.EventDecorator("thetis.PacanowskiPhilanderModel.postprocess")
     def postprocess(self):
@@ -10,9 +10,10 @@ import ufl  # NOQA
 from firedrake import *
 from firedrake.petsc import PETSc
 from mpi4py import MPI  # NOQA
-from pyop2.profiling import timed_stage  # NOQA
 import numpy
 from functools import wraps
+from contextlib import contextmanager
+import time as time_mod
 from pyadjoint.tape import no_annotations
 
 from .field_defs import field_metadata
@@ -22,6 +23,31 @@ from .physical_constants import physical_constants
 ds_surf = ds_t
 ds_bottom = ds_b
 
+log_stages = OrderedDict()
+"""PETSc log stages entered with :func:`timed_stage`, name: [stage, wall time]"""
+
+
+@contextmanager
+def timed_stage(name):
+    """
+    Context manager that runs the enclosed code in a PETSc log stage
+
+    Like :func:`pyop2.profiling.timed_stage`, but also accumulates the wall
+    time spent in the stage in :data:`log_stages`. The time of nested
+    stages is included in the time of the enclosing stage.
+
+    :arg str name: name of the stage
+    """
+    if name not in log_stages:
+        log_stages[name] = [PETSc.Log.Stage(name), 0.]
+    entry = log_stages[name]
+    t0 = time_mod.perf_counter()
+    with entry[0]:
+        try:
+            yield
+        finally:
+            entry[1] += time_mod.perf_counter() - t0
+
 
 class FrozenClass(object):
     """
@@ -322,6 +348,138 @@ def get_facet_mask(function_space, facet='bottom'):
     return indices
 
 
+class ColumnMap(object):
+    """
+    Maps the nodes of a 2D function space to the vertical node columns of a
+    3D function space on the extruded mesh.
+
+    The column layout is computed once from the cell node maps, so it does not
+    depend on a particular DOF ordering. Transfers between 2D and 3D fields are
+    then vectorized NumPy gather/scatter operations.
+
+    Column maps should be obtained with :func:`get_column_map` which caches
+    them on the 3D mesh.
+    """
+    def __init__(self, fs_2d, fs_3d):
+        """
+        :arg fs_2d: 2D :class:`FunctionSpace`
+        :arg fs_3d: 3D :class:`FunctionSpace` on the extruded mesh
+        """
+        self.fs_2d = fs_2d
+        self.fs_3d = fs_3d
+        mesh = fs_3d.mesh()
+        assert not mesh.variable_layers, 'variable layers are not supported'
+        self.n_layers = mesh.layers - 1
+        # top/bottom nodes of the extruded element
+        self.bottom_nodes = get_facet_mask(fs_3d, 'bottom')
+        self.top_nodes = get_facet_mask(fs_3d, 'top')
+        self.nodes_2d = fs_2d.finat_element.space_dimension()
+        assert len(self.bottom_nodes) == self.nodes_2d, \
+            '2D and 3D spaces do not match'
+        # number of nodes in vertical direction
+        self.n_vert_nodes = fs_3d.finat_element.space_dimension() // self.nodes_2d
+        self.idx = op2.Global(len(self.bottom_nodes), self.bottom_nodes,
+                              dtype=numpy.int32, name='node_idx')
+
+        map_2d = fs_2d.cell_node_map()
+        map_3d = fs_3d.cell_node_map()
+        local = self.bottom_nodes[:, numpy.newaxis] + numpy.arange(self.n_vert_nodes)
+        layers = numpy.arange(self.n_layers)
+        # nodes[cell, node_2d, layer, vert_node]
+        nodes = (map_3d.values_with_halo[:, local][:, :, numpy.newaxis, :]
+                 + layers[:, numpy.newaxis]*map_3d.offset[local][:, numpy.newaxis, :])
+        n_col = self.n_layers*self.n_vert_nodes
+        n_nodes_2d = fs_2d.dof_dset.total_size
+        n_nodes_3d = fs_3d.dof_dset.total_size
+        nodes = nodes.reshape(-1, n_col)
+        cell_nodes_2d = map_2d.values_with_halo.ravel()
+        # 3D nodes in each column, ordered by layer and then vertical node.
+        # If the 3D space is discontinuous but the 2D space is not (e.g. the
+        # coordinates of a periodic mesh), a 2D node has one column in each
+        # adjacent cell, and one of them is used.
+        self.column_nodes = numpy.full((n_nodes_2d, n_col), -1, dtype=map_3d.values.dtype)
+        self.column_nodes[cell_nodes_2d] = nodes
+        # 2D node of each 3D node, from all cells so that every 3D node is
+        # covered regardless of the continuity of the spaces
+        self.parent_nodes = numpy.full(n_nodes_3d, -1, dtype=map_2d.values.dtype)
+        self.parent_nodes[nodes] = cell_nodes_2d[:, numpy.newaxis]
+        assert self.column_nodes.min() >= 0 and self.parent_nodes.min() >= 0, \
+            'column map does not cover all nodes'
+
+    def facet_nodes(self, boundary='top', elem_facet='top'):
+        """
+        Returns the 3D node that corresponds to each 2D node on a layer facet.
+
+        :kwarg str boundary: 'top'|'bottom', the surface or bottom layer
+        :kwarg str elem_facet: 'top'|'bottom', the facet of the element
+        """
+        layer = self.n_layers - 1 if boundary == 'top' else 0
+        # on interval elements, the end points are the first two dofs
+        vert_node = 1 if elem_facet == 'top' and self.n_vert_nodes > 1 else 0
+        return self.column_nodes[:, layer*self.n_vert_nodes + vert_node]
+
+    @staticmethod
+    def _node_data(func, read_only=False):
+        """Returns the dat data of a function as a (nodes, components) array"""
+        dat = func.dat
+        data = dat.data_ro_with_halos if read_only else dat.data_with_halos
+        return data.reshape(data.shape[0], -1)
+
+    def expand(self, input_2d, output_3d):
+        """
+        Copies a 2D field to 3D, assigning the same value in each column
+
+        :arg input_2d: 2D source field
+        :type input_2d: :class:`Function`
+        :arg output_3d: 3D target field
+        :type output_3d: :class:`Function`
+        """
+        src = self._node_data(input_2d, read_only=True)
+        dst = self._node_data(output_3d)
+        dst[:, :src.shape[1]] = src[self.parent_nodes, :]
+
+    def extract(self, input_3d, output_2d, boundary='top', elem_facet='top'):
+        """
+        Copies the values on a layer facet of a 3D field to a 2D field
+
+        :arg input_3d: 3D source field
+        :type input_3d: :class:`Function`
+        :arg output_2d: 2D target field
+        :type output_2d: :class:`Function`
+        :kwarg str boundary: 'top'|'bottom', the surface or bottom layer
+        :kwarg str elem_facet: 'top'|'bottom'|'average', the facet of the
+            element. 'average' computes the mean of the top and bottom facets.
+        """
+        src = self._node_data(input_3d, read_only=True)
+        dst = self._node_data(output_2d)
+        n = dst.shape[1]
+        if elem_facet == 'average':
+            dst[:] = 0.5*(src[self.facet_nodes(boundary, 'bottom'), :n]
+                          + src[self.facet_nodes(boundary, 'top'), :n])
+        else:
+            dst[:] = src[self.facet_nodes(boundary, elem_facet), :n]
+
+
+def get_column_map(fs_2d, fs_3d):
+    """
+    Returns the :class:`ColumnMap` between a 2D and a 3D function space.
+
+    The map is cached on the 3D mesh.
+
+    :arg fs_2d: 2D :class:`FunctionSpace`
+    :arg fs_3d: 3D :class:`FunctionSpace` on the extruded mesh
+    """
+    mesh = fs_3d.mesh()
+    cache = getattr(mesh, '_thetis_column_maps', None)
+    if cache is None:
+        cache = {}
+        mesh._thetis_column_maps = cache
+    key = (fs_2d.mesh(), fs_2d.ufl_element(), fs_3d.ufl_element())
+    if key not in cache:
+        cache[key] = ColumnMap(fs_2d, fs_3d)
+    return cache[key]
+
+
 @PETSc.Log.EventDecorator("thetis.extrude_mesh_sigma")
 def extrude_mesh_sigma(mesh2d, n_layers, bathymetry_2d, z_stretch_fact=1.0,
                        min_depth=None):
@@ -340,7 +498,6 @@ def extrude_mesh_sigma(mesh2d, n_layers, bathymetry_2d, z_stretch_fact=1.0,
     coordinates = mesh.coordinates
     fs_3d = coordinates.function_space()
     fs_2d = bathymetry_2d.function_space()
-    new_coordinates = Function(fs_3d)
 
     z_stretch_func = Function(fs_2d)
     if isinstance(z_stretch_fact, Function):
@@ -349,47 +506,21 @@ def extrude_mesh_sigma(mesh2d, n_layers, bathymetry_2d, z_stretch_fact=1.0,
     else:
         z_stretch_func.assign(z_stretch_fact)
 
-    # number of nodes in vertical direction
-    n_vert_nodes = fs_3d.finat_element.space_dimension() / fs_2d.finat_element.space_dimension()
-
     min_depth_arr = numpy.ones((n_layers+1, ))*1e22
     if min_depth is not None:
         for i, v in enumerate(min_depth):
             min_depth_arr[i] = v
 
-    nodes = get_facet_mask(fs_3d, 'bottom')
-    idx = op2.Global(len(nodes), nodes, dtype=numpy.int32, name='node_idx')
-    min_depth_op2 = op2.Global(len(min_depth_arr), min_depth_arr, name='min_depth')
-    kernel = op2.Kernel("""
-        void my_kernel(double *new_coords, double *old_coords, double *bath2d, double *z_stretch, int *idx, double *min_depth) {
-            for ( int d = 0; d < %(nodes)d; d++ ) {
-                double s_fact = z_stretch[d];
-                for ( int e = 0; e < %(v_nodes)d; e++ ) {
-                    new_coords[3*(idx[d]+e) + 0] = old_coords[3*(idx[d]+e) + 0];
-                    new_coords[3*(idx[d]+e) + 1] = old_coords[3*(idx[d]+e) + 1];
-                    double sigma = 1.0 - old_coords[3*(idx[d]+e) + 2]; // top 0, bot 1
-                    double new_z = -bath2d[d] * pow(sigma, s_fact) ;
-                    int layer = fmin(fmax(round(sigma*(%(n_layers)d + 1) - 1.0), 0.0), %(n_layers)d);
-                    double max_z = -min_depth[layer];
-                    new_z = fmax(new_z, max_z);
-                    new_coords[3*(idx[d]+e) + 2] = new_z;
-                }
-            }
-        }""" % {'nodes': fs_2d.finat_element.space_dimension(),
-                'v_nodes': n_vert_nodes,
-                'n_layers': n_layers},
-        'my_kernel')
-
-    op2.par_loop(kernel, mesh.cell_set,
-                 new_coordinates.dat(op2.WRITE, fs_3d.cell_node_map()),
-                 coordinates.dat(op2.READ, fs_3d.cell_node_map()),
-                 bathymetry_2d.dat(op2.READ, fs_2d.cell_node_map()),
-                 z_stretch_func.dat(op2.READ, fs_2d.cell_node_map()),
-                 idx(op2.READ),
-                 min_depth_op2(op2.READ),
-                 iteration_region=op2.ALL)
-
-    mesh.coordinates.assign(new_coordinates)
+    column_map = get_column_map(fs_2d, fs_3d)
+    parent_nodes = column_map.parent_nodes
+    coords = coordinates.dat.data_with_halos
+    bath = bathymetry_2d.dat.data_ro_with_halos[parent_nodes]
+    s_fact = z_stretch_func.dat.data_ro_with_halos[parent_nodes]
+    sigma = 1.0 - coords[:, 2]  # top 0, bot 1
+    new_z = -bath*numpy.power(sigma, s_fact)
+    # NOTE round half away from zero, as in C
+    layer = numpy.clip(numpy.floor(sigma*(n_layers + 1) - 0.5), 0, n_layers).astype(int)
+    coords[:, 2] = numpy.maximum(new_z, -min_depth_arr[layer])
 
     return mesh
 
@@ -436,19 +567,19 @@ def get_zcoord_from_mesh(zcoord, solver_parameters=None):
     """
     Evaluates z coordinates from the 3D mesh
 
+    If ``zcoord`` is defined on the nodes of the mesh coordinate field, the
+    nodal z coordinates are copied directly. Otherwise the z coordinate is
+    interpolated. No linear system is solved in either case.
+
     :arg zcoord: scalar :class:`Function` where coordinates will be stored
+    :kwarg solver_parameters: not used, retained for backwards compatibility
     """
-    # TODO coordinates should probably be interpolated instead
-    if solver_parameters is None:
-        solver_parameters = {}
-    solver_parameters.setdefault('ksp_atol', 1e-12)
-    solver_parameters.setdefault('ksp_rtol', 1e-16)
     fs = zcoord.function_space()
-    tri = TrialFunction(fs)
-    test = TestFunction(fs)
-    a = tri*test*dx
-    l = fs.mesh().coordinates[2]*test*dx
-    solve(a == l, zcoord, solver_parameters=solver_parameters)
+    coords = fs.mesh().coordinates
+    if fs.node_set is coords.function_space().node_set:
+        zcoord.dat.data[:] = coords.dat.data_ro[:, 2]
+    else:
+        zcoord.interpolate(coords[2])
     return zcoord
 
 
@@ -556,6 +687,38 @@ class SubdomainProjector(object):
         self.solver.solve()
 
 
+_elem_height_kernels = {}
+
+
+def _get_elem_height_kernel(nodes, func_dim, output_dim):
+    """
+    Returns a PyOP2 kernel that computes the element height on an extruded mesh.
+
+    Kernels are cached, so that repeated calls do not regenerate the code.
+
+    :arg int nodes: number of nodes per element
+    :arg int func_dim: value size of the z coordinate field
+    :arg int output_dim: value size of the output field
+    """
+    key = (nodes, func_dim, output_dim)
+    if key not in _elem_height_kernels:
+        # NOTE height maybe <0 if mesh was extruded like that
+        _elem_height_kernels[key] = op2.Kernel("""
+            void my_kernel(double *func, double *zcoord) {
+                for ( int d = 0; d < %(nodes)d/2; d++ ) {
+                    for ( int c = 0; c < %(func_dim)d; c++ ) {
+                        double dz = fabs(zcoord[%(func_dim)d*(2*d+1) + c] - zcoord[%(func_dim)d*2*d + c]);
+                        func[%(output_dim)d*2*d + c] = dz;
+                        func[%(output_dim)d*(2*d+1) + c] = dz;
+                    }
+                }
+            }""" % {'nodes': nodes,
+                    'func_dim': func_dim,
+                    'output_dim': output_dim},
+            'my_kernel')
+    return _elem_height_kernels[key]
+
+
 @PETSc.Log.EventDecorator("thetis.compute_elem_height")
 def compute_elem_height(zcoord, output):
     """
@@ -569,27 +732,13 @@ def compute_elem_height(zcoord, output):
     fs_in = zcoord.function_space()
     fs_out = output.function_space()
 
-    iterate = op2.ALL
-
-    # NOTE height maybe <0 if mesh was extruded like that
-    kernel = op2.Kernel("""
-        void my_kernel(double *func, double *zcoord) {
-            for ( int d = 0; d < %(nodes)d/2; d++ ) {
-                for ( int c = 0; c < %(func_dim)d; c++ ) {
-                    double dz = fabs(zcoord[%(func_dim)d*(2*d+1) + c] - zcoord[%(func_dim)d*2*d + c]);
-                    func[%(output_dim)d*2*d + c] = dz;
-                    func[%(output_dim)d*(2*d+1) + c] = dz;
-                }
-            }
-        }""" % {'nodes': zcoord.cell_node_map().arity,
-                'func_dim': zcoord.function_space().value_size,
-                'output_dim': output.function_space().value_size},
-        'my_kernel')
+    kernel = _get_elem_height_kernel(zcoord.cell_node_map().arity,
+                                     fs_in.value_size, fs_out.value_size)
     op2.par_loop(
         kernel, fs_out.mesh().cell_set,
         output.dat(op2.WRITE, fs_out.cell_node_map()),
         zcoord.dat(op2.READ, fs_in.cell_node_map()),
-        iteration_region=iterate)
+        iteration_region=op2.ALL)
 
     return output
 
@@ -853,57 +1002,56 @@ def select_and_move_detectors(mesh, detector_locations, detector_names=None,
       moved to this location. By default a maximum distance of 0.0 is used, i.e
       no detectors are moved.
     """
-    # auxilary function to test whether we can interpolate it in the given locations
-    V = FunctionSpace(mesh, "CG", 1)
-    v = Function(V)
-
-    P0 = FunctionSpace(mesh, "DG", 0)
-    VP0 = VectorFunctionSpace(mesh, "DG", 0)
-    dist = Function(P0)
-    loc_const = Constant(detector_locations[0])
-    xy = SpatialCoordinate(mesh)
-    p0xy = Function(VP0).interpolate(xy)
-
-    # comparison operator that sorts on first entry first, etc.
-    def min_lexsort(x, y, datatype):
-        for xi, yi in zip(x, y):
-            if xi < yi:
-                return x
-            elif yi < xi:
-                return y
-        # all entries the same:
-        return x
-    min_lexsort_op = MPI.Op.Create(min_lexsort, commute=False)
-
-    def move_to_nearest_cell_center(location):
-        loc_const.assign(location)
-        dist.interpolate(dot(xy-loc_const, xy-loc_const))
-        ind = dist.dat.data_ro.argmin()
-        # smallest distance to a cell centre location on this process:
-        local_loc = list(p0xy.dat.data_ro[ind])
-        local_dist = numpy.sqrt(dist.dat.data_ro[ind])
-        # select the smallest distance on all processes. If some distances are equal, pick a unique loc. based on lexsort
-        global_dist_loc = mesh.comm.allreduce([local_dist]+local_loc, op=min_lexsort_op)
-        return global_dist_loc[0], global_dist_loc[1:]
+    from scipy.spatial import cKDTree
+
+    gdim = mesh.geometric_dimension()
+    locations = numpy.array(detector_locations, dtype=float).reshape(-1, gdim)
+    n_detectors = locations.shape[0]
+
+    # locate all detectors at once: a detector is within the domain if any
+    # process finds a cell that contains it
+    cells, _, _ = mesh.locate_cells_ref_coords_and_dists(locations)
+    found = numpy.array(numpy.asarray(cells) >= 0, dtype=numpy.int32)
+    mesh.comm.Allreduce(MPI.IN_PLACE, found, op=MPI.MAX)
+    missing = numpy.flatnonzero(found == 0)
+
+    moved_dist = numpy.zeros(n_detectors)
+    moved_locations = {}
+    if len(missing) > 0:
+        # nearest local cell centre of all missing detectors in one query
+        VP0 = VectorFunctionSpace(mesh, "DG", 0)
+        p0xy = Function(VP0).interpolate(SpatialCoordinate(mesh))
+        centres = p0xy.dat.data_ro.reshape(-1, gdim)
+        local_dist_loc = numpy.full((len(missing), 1 + gdim), numpy.inf)
+        if centres.shape[0] > 0:
+            dist, ind = cKDTree(centres).query(locations[missing])
+            local_dist_loc[:, 0] = dist
+            local_dist_loc[:, 1:] = centres[ind]
+        # shape (nprocs, nmissing, 1 + gdim)
+        all_dist_loc = numpy.array(mesh.comm.allgather(local_dist_loc))
+        for k, i in enumerate(missing):
+            candidates = all_dist_loc[:, k, :]
+            # select the smallest distance on all processes. If some distances
+            # are equal, pick a unique location based on lexsort, sorting on
+            # the first entry first, etc.
+            order = numpy.lexsort(candidates.T[::-1])
+            moved_dist[i] = candidates[order[0], 0]
+            moved_locations[i] = list(candidates[order[0], 1:])
 
     accepted_locations = []
     accepted_names = []
     if detector_names is None:
-        names = [None] * len(detector_locations)
+        names = [None] * n_detectors
     else:
         names = detector_names
-    for location, name in zip(detector_locations, names):
-        try:
-            v(location)
-        except PointNotInDomainError:
-            moved_dist, location = move_to_nearest_cell_center(location)
-            if moved_dist > maximum_distance:
+    for i, (location, name) in enumerate(zip(detector_locations, names)):
+        if i in moved_locations:
+            if moved_dist[i] > maximum_distance:
                 continue
+            location = moved_locations[i]
         accepted_locations.append(location)
         accepted_names.append(name)
 
-    min_lexsort_op.Free()
-
     if detector_names is None:
         return accepted_locations
     else:
@@ -993,14 +1141,28 @@ class DepthIntegratedPoissonSolver(object):
 
     where the :math:`H = \eta + d` denotes the water depth
     and the superscript star symbol represents the intermediate level of terms.
+
+    If `reuse_preconditioner` is set, the preconditioner of the pressure
+    solver is only rebuilt when the total depth :math:`H^*` has changed by
+    more than `preconditioner_update_tolerance` (relative change in the
+    maximum norm), and velocities in DG spaces are updated with the
+    element-wise inverse mass matrix.
     """
     @PETSc.Log.EventDecorator("thetis.DepthIntegratedPoissonSolver.__init__")
-    def __init__(self, q_2d, uv_2d, w_2d, elev_2d, depth, dt, bnd_functions=None, solver_parameters=None):
+    def __init__(self, q_2d, uv_2d, w_2d, elev_2d, depth, dt, bnd_functions=None, solver_parameters=None,
+                 reuse_preconditioner=False, preconditioner_update_tolerance=0.05):
         if solver_parameters is None:
             solver_parameters = {'snes_type': 'ksponly',
                                  'ksp_type': 'preonly',
                                  'mat_type': 'aij',
                                  'pc_type': 'lu'}
+        solver_parameters = dict(solver_parameters)
+        if reuse_preconditioner:
+            # the operator is linear in q; iterate with the reused preconditioner
+            solver_parameters['snes_type'] = 'ksponly'
+            if solver_parameters.get('ksp_type', 'preonly') == 'preonly':
+                solver_parameters['ksp_type'] = 'gmres'
+                solver_parameters.setdefault('ksp_rtol', 1e-8)
         rho_0 = physical_constants['rho0']
         self.q_2d = q_2d
         self.uv_2d = uv_2d
@@ -1009,6 +1171,8 @@ class DepthIntegratedPoissonSolver(object):
         self.depth = depth
         self.dt = dt
         self.bnd_functions = bnd_functions
+        self.reuse_preconditioner = reuse_preconditioner
+        self.preconditioner_update_tolerance = preconditioner_update_tolerance
 
         fs_q = self.q_2d.function_space()
         test_q = TestFunction(fs_q)
@@ -1049,37 +1213,81 @@ class DepthIntegratedPoissonSolver(object):
             solver_parameters=solver_parameters,
             options_prefix='poisson_solver'
         )
+        if self.reuse_preconditioner:
+            # total depth at the last preconditioner rebuild
+            self.h_star = Function(fs_q, name='h_star')
+            self.h_star_expr = h_star
+            self.h_star_ref = None
         # horizontal velocity updater
         fs_u = self.uv_2d.function_space()
         tri_u = TrialFunction(fs_u)
         test_u = TestFunction(fs_u)
         a_u = inner(tri_u, test_u)*dx
         l_u = dot(self.uv_2d - 0.5*self.dt/rho_0*(grad(self.q_2d) + grad_hori/h_star*self.q_2d), test_u)*dx
-        prob_u = LinearVariationalProblem(a_u, l_u, self.uv_2d)
-        self.solver_u = LinearVariationalSolver(prob_u)
+        self.updater_u = self._create_mass_updater(a_u, l_u, self.uv_2d)
         # vertical velocity updater
         fs_w = self.w_2d.function_space()
         tri_w = TrialFunction(fs_w)
         test_w = TestFunction(fs_w)
         a_w = inner(tri_w, test_w)*dx
         l_w = dot(self.w_2d + self.dt/rho_0*(self.q_2d/h_star), test_w)*dx
-        prob_w = LinearVariationalProblem(a_w, l_w, self.w_2d)
         sp = {
             "ksp_type": "cg",
             "pc_type": "bjacobi",
             "sub_pc_type": "ilu",
         }
-        self.solver_w = LinearVariationalSolver(prob_w, solver_parameters=sp)
+        self.updater_w = self._create_mass_updater(a_w, l_w, self.w_2d, solver_parameters=sp)
+
+    def _create_mass_updater(self, a, l, output, solver_parameters=None):
+        """
+        Returns a function that solves the mass matrix system `a == l` for `output`.
+
+        If preconditioner reuse is enabled and `output` is in a DG space, the
+        element-wise inverse of the mass matrix is applied directly.
+        Otherwise a :class:`LinearVariationalSolver` is used.
+        """
+        fs = output.function_space()
+        if self.reuse_preconditioner and element_continuity(fs.ufl_element()).horizontal == 'dg':
+            mass_inv = assemble(Tensor(a).inv, mat_type='aij').M.handle
+            rhs = assemble(l)
+
+            def update():
+                assemble(l, tensor=rhs)
+                with rhs.dat.vec_ro as b, output.dat.vec_wo as x:
+                    mass_inv.mult(b, x)
+            return update
+        prob = LinearVariationalProblem(a, l, output)
+        solver = LinearVariationalSolver(prob, solver_parameters=solver_parameters)
+        return solver.solve
+
+    def _update_preconditioner_reuse(self):
+        """
+        Rebuild the preconditioner if the total depth has changed too much.
+        """
+        self.h_star.interpolate(self.h_star_expr)
+        h = self.h_star.dat.data_ro
+        if self.h_star_ref is None:
+            rebuild = True
+        else:
+            comm = self.h_star.comm
+            diff = comm.allreduce(numpy.max(numpy.abs(h - self.h_star_ref), initial=0.0), MPI.MAX)
+            scale = comm.allreduce(numpy.max(numpy.abs(self.h_star_ref), initial=0.0), MPI.MAX)
+            rebuild = diff > self.preconditioner_update_tolerance*scale
+        if rebuild:
+            self.h_star_ref = h.copy()
+        self.solver_q.snes.getKSP().getPC().setReusePreconditioner(not rebuild)
 
     @PETSc.Log.EventDecorator("thetis.DepthIntegratedPoissonSolver.solve")
     def solve(self, solve_w=True):
         # solve non-hydrostatic pressure q
+        if self.reuse_preconditioner:
+            self._update_preconditioner_reuse()
         self.solver_q.solve()
         # update horizontal velocity uv_2d
-        self.solver_u.solve()
+        self.updater_u()
         # update vertical velocity w_2d
         if solve_w:
-            self.solver_w.solve()
+            self.updater_w()
 
 
 @PETSc.Log.EventDecorator("thetis.form2indicator")
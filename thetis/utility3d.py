@@ -420,8 +420,9 @@ class Mesh3DConsistencyCalculator(object):
         self.fs_3d = self.solver_obj.function_spaces.P1DG
         assert self.output.function_space() == self.fs_3d
 
-        nodes = get_facet_mask(self.fs_3d, 'bottom')
-        self.idx = op2.Global(len(nodes), nodes, dtype=numpy.int32, name='node_idx')
+        column_map = get_column_map(self.solver_obj.function_spaces.P1DG_2d, self.fs_3d)
+        nodes = column_map.bottom_nodes
+        self.idx = column_map.idx
         self.kernel = op2.Kernel("""
             void my_kernel(double *output, double *z_field, int *idx) {
                 // compute max delta z on top and bottom facets
@@ -510,27 +511,7 @@ class ExpandFunctionTo3d(object):
         if self.do_hdiv_scaling and elem_height is None:
             raise Exception('elem_height must be provided for HDiv spaces')
 
-        self.iter_domain = op2.ALL
-
-        # number of nodes in vertical direction
-        n_vert_nodes = self.fs_3d.finat_element.space_dimension() / self.fs_2d.finat_element.space_dimension()
-
-        nodes = get_facet_mask(self.fs_3d, 'bottom')
-        self.idx = op2.Global(len(nodes), nodes, dtype=numpy.int32, name='node_idx')
-        self.kernel = op2.Kernel("""
-            void my_kernel(double *func, double *func2d, int *idx) {
-                for ( int d = 0; d < %(nodes)d; d++ ) {
-                    for ( int c = 0; c < %(func2d_dim)d; c++ ) {
-                        for ( int e = 0; e < %(v_nodes)d; e++ ) {
-                            func[%(func3d_dim)d*(idx[d]+e) + c] = func2d[%(func2d_dim)d*d + c];
-                        }
-                    }
-                }
-            }""" % {'nodes': self.fs_2d.finat_element.space_dimension(),
-                    'func2d_dim': self.input_2d.function_space().value_size,
-                    'func3d_dim': self.fs_3d.value_size,
-                    'v_nodes': n_vert_nodes},
-            'my_kernel')
+        self.column_map = get_column_map(self.fs_2d, self.fs_3d)
 
         if self.do_hdiv_scaling:
             solver_parameters = {}
@@ -547,13 +528,7 @@ class ExpandFunctionTo3d(object):
     @PETSc.Log.EventDecorator("thetis.ExpandFunctionTo3d.solve")
     def solve(self):
         with timed_stage('copy_2d_to_3d'):
-            # execute par loop
-            op2.par_loop(
-                self.kernel, self.fs_3d.mesh().cell_set,
-                self.output_3d.dat(op2.WRITE, self.fs_3d.cell_node_map()),
-                self.input_2d.dat(op2.READ, self.fs_2d.cell_node_map()),
-                self.idx(op2.READ),
-                iteration_region=self.iter_domain)
+            self.column_map.expand(self.input_2d, self.output_3d)
 
             if self.do_hdiv_scaling:
                 self.rt_scale_solver.solve()
@@ -634,51 +609,10 @@ class SubFunctionExtractor(object):
             raise Exception('elem_height must be provided for HDiv spaces')
 
         assert elem_facet in ['top', 'bottom', 'average'], 'Unsupported elem_facet: {:}'.format(elem_facet)
-        if elem_facet == 'average':
-            nodes = numpy.hstack((get_facet_mask(self.fs_3d, 'bottom'),
-                                  get_facet_mask(self.fs_3d, 'top')))
-        else:
-            nodes = get_facet_mask(self.fs_3d, elem_facet)
-        if boundary == 'top':
-            self.iter_domain = op2.ON_TOP
-        elif boundary == 'bottom':
-            self.iter_domain = op2.ON_BOTTOM
-
-        out_nodes = self.fs_2d.finat_element.space_dimension()
-
-        if elem_facet == 'average':
-            assert (len(nodes) == 2*out_nodes)
-        else:
-            assert (len(nodes) == out_nodes)
-
-        self.idx = op2.Global(len(nodes), nodes, dtype=numpy.int32, name='node_idx')
-        if elem_facet == 'average':
-            # compute average of top and bottom elem nodes
-            self.kernel = op2.Kernel("""
-                void my_kernel(double *func, double *func3d, int *idx) {
-                    int nnodes = %(nodes)d;
-                    for ( int d = 0; d < nnodes; d++ ) {
-                        for ( int c = 0; c < %(func2d_dim)d; c++ ) {
-                            func[%(func2d_dim)d*d + c] = 0.5*(func3d[%(func3d_dim)d*idx[d] + c] +
-                                              func3d[%(func3d_dim)d*idx[d + nnodes] + c]);
-                        }
-                    }
-                }""" % {'nodes': self.output_2d.cell_node_map().arity,
-                        'func2d_dim': self.output_2d.function_space().value_size,
-                        'func3d_dim': self.fs_3d.value_size},
-                'my_kernel')
-        else:
-            self.kernel = op2.Kernel("""
-                void my_kernel(double *func, double *func3d, int *idx) {
-                    for ( int d = 0; d < %(nodes)d; d++ ) {
-                        for ( int c = 0; c < %(func2d_dim)d; c++ ) {
-                            func[%(func2d_dim)d*d + c] = func3d[%(func3d_dim)d*idx[d] + c];
-                        }
-                    }
-                }""" % {'nodes': self.output_2d.cell_node_map().arity,
-                        'func2d_dim': self.output_2d.function_space().value_size,
-                        'func3d_dim': self.fs_3d.value_size},
-                'my_kernel')
+        assert boundary in ['top', 'bottom'], 'Unsupported boundary: {:}'.format(boundary)
+        self.boundary = boundary
+        self.elem_facet = elem_facet
+        self.column_map = get_column_map(self.fs_2d, self.fs_3d)
 
         if self.do_hdiv_scaling:
             solver_parameters = {}
@@ -695,12 +629,9 @@ class SubFunctionExtractor(object):
     @PETSc.Log.EventDecorator("thetis.SubFunctionExtractor.solve")
     def solve(self):
         with timed_stage('copy_3d_to_2d'):
-            # execute par loop
-            op2.par_loop(self.kernel, self.fs_3d.mesh().cell_set,
-                         self.output_2d.dat(op2.WRITE, self.fs_2d.cell_node_map()),
-                         self.input_3d.dat(op2.READ, self.fs_3d.cell_node_map()),
-                         self.idx(op2.READ),
-                         iteration_region=self.iter_domain)
+            self.column_map.extract(self.input_3d, self.output_2d,
+                                    boundary=self.boundary,
+                                    elem_facet=self.elem_facet)
 
             if self.do_hdiv_scaling:
                 self.rt_scale_solver.solve()
@@ -715,6 +646,11 @@ class ALEMeshUpdater(object):
     projected to continuous space, and this field is used to update the mesh
     coordinates.
 
+    The projection matrix is factorized once and reused, and the projection
+    is skipped if the elevation field has not changed since the previous call.
+    The mesh coordinates, the z coordinate field and the vertical element size
+    are updated in a single par_loop.
+
     This class stores the reference coordinate field and keeps track of the
     updated mesh coordinates. It also provides a method for computing the mesh
     velocity from two adjacent elevation fields.
@@ -727,23 +663,35 @@ class ALEMeshUpdater(object):
         self.solver = solver
         self.fields = solver.fields
         if self.solver.options.use_ale_moving_mesh:
-            # continous elevation
-            self.elev_cg_2d = Function(self.solver.function_spaces.P1_2d,
-                                       name='elev cg 2d')
             # w_mesh at surface
             self.w_mesh_surf_2d = Function(
                 self.fields.bathymetry_2d.function_space(), name='w mesh surf 2d')
             # elevation in coordinate space
+            # NOTE the 2D mesh does not move, the factorization can be reused
+            proj_solver_parameters = {
+                'ksp_type': 'preonly',
+                'pc_type': 'lu',
+                'pc_factor_mat_solver_type': 'mumps',
+            }
+            fs_cg_2d = self.solver.function_spaces.P1_2d
+            if self.fields.elev_cg_2d.function_space() == fs_cg_2d:
+                # project directly to coordinate space
+                self.elev_cg_2d = self.fields.elev_cg_2d
+            else:
+                # continous elevation
+                self.elev_cg_2d = Function(fs_cg_2d, name='elev cg 2d')
             self.proj_elev_to_cg_2d = Projector(self.fields.elev_2d,
-                                                self.elev_cg_2d)
-            self.proj_elev_cg_to_coords_2d = Projector(self.elev_cg_2d,
-                                                       self.fields.elev_cg_2d)
+                                                self.elev_cg_2d,
+                                                solver_parameters=proj_solver_parameters,
+                                                constant_jacobian=True)
+            self._elev_2d_state = None
         self.cp_v_elem_size_to_2d = SubFunctionExtractor(self.fields.v_elem_size_3d,
                                                          self.fields.v_elem_size_2d,
                                                          boundary='top', elem_facet='top')
 
         self.fs_3d = self.fields.z_coord_ref_3d.function_space()
         self.fs_2d = self.fields.elev_cg_2d.function_space()
+        self.fs_coords = self.solver.mesh.coordinates.function_space()
 
         family_2d = self.fs_2d.ufl_element().family()
         base_element_3d = get_extruded_base_element(self.fs_3d.ufl_element())
@@ -755,10 +703,16 @@ class ALEMeshUpdater(object):
         # number of nodes in vertical direction
         n_vert_nodes = self.fs_3d.finat_element.space_dimension() / self.fs_2d.finat_element.space_dimension()
 
-        nodes = get_facet_mask(self.fs_3d, 'bottom')
-        self.idx = op2.Global(len(nodes), nodes, dtype=numpy.int32, name='node_idx')
+        self.column_map = get_column_map(self.fs_2d, self.fs_3d)
+        self.idx = self.column_map.idx
+        self.fs_elem_height = self.fields.v_elem_size_3d.function_space()
+        self.idx_elem_height = get_column_map(self.fields.v_elem_size_2d.function_space(),
+                                              self.fs_elem_height).idx
+        assert n_vert_nodes == 2, 'Only linear vertical coordinate fields are supported'
+        # computes new z coordinates, mesh coordinates and vertical element
+        # size in one pass
         self.kernel_z_coord = op2.Kernel("""
-            void my_kernel(double *z_coord_3d, double *z_ref_3d, double *elev_2d, double *bath_2d, int *idx) {
+            void my_kernel(double *coords, double *z_coord_3d, double *elem_height_3d, double *z_ref_3d, double *elev_2d, double *bath_2d, int *idx, int *idx_h) {
                 for ( int d = 0; d < %(nodes)d; d++ ) {
                     for ( int c = 0; c < %(func2d_dim)d; c++ ) {
                         for ( int e = 0; e < %(v_nodes)d; e++ ) {
@@ -767,31 +721,18 @@ class ALEMeshUpdater(object):
                             double z_ref = z_ref_3d[%(func3d_dim)d*(idx[d]+e) + c];
                             double new_z = eta*(z_ref + bath)/bath + z_ref;
                             z_coord_3d[%(func3d_dim)d*(idx[d]+e) + c] = new_z;
+                            coords[%(coords_dim)d*(idx[d]+e) + %(coords_dim)d - 1] = new_z;
                         }
-                    }
-                }
-            }""" % {'nodes': self.fs_2d.finat_element.space_dimension(),
-                    'func2d_dim': self.fs_2d.value_size,
-                    'func3d_dim': self.fs_3d.value_size,
-                    'v_nodes': n_vert_nodes},
-            'my_kernel')
-
-        self.kernel_w_mesh = op2.Kernel("""
-            void my_kernel(double *w_mesh_3d, double *z_ref_3d, double *w_mesh_surf_2d, double *bath_2d, int *idx) {
-                for ( int d = 0; d < %(nodes)d; d++ ) {
-                    for ( int c = 0; c < %(func2d_dim)d; c++ ) {
+                        double dz = fabs(z_coord_3d[%(func3d_dim)d*(idx[d]+1) + c] - z_coord_3d[%(func3d_dim)d*idx[d] + c]);
                         for ( int e = 0; e < %(v_nodes)d; e++ ) {
-                            double w_mesh_surf = w_mesh_surf_2d[%(func2d_dim)d*d + c];
-                            double bath = bath_2d[%(func2d_dim)d*d + c];
-                            double z_ref = z_ref_3d[%(func3d_dim)d*(idx[d]+e) + c];
-                            double new_w = w_mesh_surf * (z_ref + bath)/bath;
-                            w_mesh_3d[%(func3d_dim)d*(idx[d]+e) + c] = new_w;
+                            elem_height_3d[idx_h[d]+e] = dz;
                         }
                     }
                 }
             }""" % {'nodes': self.fs_2d.finat_element.space_dimension(),
                     'func2d_dim': self.fs_2d.value_size,
                     'func3d_dim': self.fs_3d.value_size,
+                    'coords_dim': self.fs_coords.value_size,
                     'v_nodes': n_vert_nodes},
             'my_kernel')
 
@@ -808,12 +749,30 @@ class ALEMeshUpdater(object):
         compute_elem_height(self.fields.z_coord_3d, self.fields.v_elem_size_3d)
         self.cp_v_elem_size_to_2d.solve()
 
+    @PETSc.Log.EventDecorator("thetis.ALEMeshUpdater.project_elevation")
+    def project_elevation(self):
+        """
+        Projects elev_2d to the coordinate space, ``fields.elev_cg_2d``
+
+        The projection is skipped if elev_2d has not changed since the
+        previous call on any rank.
+        """
+        state = self.fields.elev_2d.dat.data_ro
+        unchanged = self._elev_2d_state is not None and numpy.array_equal(state, self._elev_2d_state)
+        # the projection is collective, all ranks must take the same decision
+        if self.solver.comm.allreduce(unchanged, op=MPI.LAND):
+            return
+        self._elev_2d_state = state.copy()
+        self.proj_elev_to_cg_2d.project()
+        if self.elev_cg_2d is not self.fields.elev_cg_2d:
+            # continuous field is exactly representable in coordinate space
+            self.fields.elev_cg_2d.interpolate(self.elev_cg_2d)
+
     @PETSc.Log.EventDecorator("thetis.ALEMeshUpdater.compute_mesh_velocity_begin")
     def compute_mesh_velocity_begin(self):
         """Stores the current 2D elevation state as the "old" field"""
         assert self.solver.options.use_ale_moving_mesh
-        self.proj_elev_to_cg_2d.project()
-        self.proj_elev_cg_to_coords_2d.project()
+        self.project_elevation()
 
     @PETSc.Log.EventDecorator("thetis.ALEMeshUpdater.compute_mesh_velocity_finalize")
     def compute_mesh_velocity_finalize(self, c=1.0, w_mesh_surf_expr=None):
@@ -829,22 +788,18 @@ class ALEMeshUpdater(object):
             # default formulation
             # w_mesh_surf = (elev_new - elev_old)/dt/c
             self.w_mesh_surf_2d.assign(self.fields.elev_cg_2d)
-            self.proj_elev_to_cg_2d.project()
-            self.proj_elev_cg_to_coords_2d.project()
+            self.project_elevation()
             self.w_mesh_surf_2d += -self.fields.elev_cg_2d
             self.w_mesh_surf_2d *= -1.0/self.solver.dt/c
         else:
             # user-defined formulation
             self.w_mesh_surf_2d.assign(w_mesh_surf_expr)
-        op2.par_loop(
-            self.kernel_w_mesh, self.fs_3d.mesh().cell_set,
-            self.fields.w_mesh_3d.dat(op2.WRITE, self.fs_3d.cell_node_map()),
-            self.fields.z_coord_ref_3d.dat(op2.READ, self.fs_3d.cell_node_map()),
-            self.w_mesh_surf_2d.dat(op2.READ, self.fs_2d.cell_node_map()),
-            self.fields.bathymetry_2d.dat(op2.READ, self.fs_2d.cell_node_map()),
-            self.idx(op2.READ),
-            iteration_region=op2.ALL
-        )
+        # w_mesh = w_mesh_surf*(z_ref + bath)/bath
+        parent_nodes = self.column_map.parent_nodes
+        w_mesh_surf = self.w_mesh_surf_2d.dat.data_ro_with_halos[parent_nodes]
+        bath = self.fields.bathymetry_2d.dat.data_ro_with_halos[parent_nodes]
+        z_ref = self.fields.z_coord_ref_3d.dat.data_ro_with_halos
+        self.fields.w_mesh_3d.dat.data_with_halos[:] = w_mesh_surf*(z_ref + bath)/bath
 
     @PETSc.Log.EventDecorator("thetis.ALEMeshUpdater.update_mesh_coordinates")
     def update_mesh_coordinates(self):
@@ -854,22 +809,24 @@ class ALEMeshUpdater(object):
         elev_2d is first projected to continous space
         """
         assert self.solver.options.use_ale_moving_mesh
-        self.proj_elev_to_cg_2d.project()
-        self.proj_elev_cg_to_coords_2d.project()
+        self.project_elevation()
 
-        # compute new z coordinates -> self.fields.z_coord_3d
+        # compute new z coordinates -> self.fields.z_coord_3d, mesh coordinates
+        # and vertical element size -> self.fields.v_elem_size_3d
         op2.par_loop(
             self.kernel_z_coord, self.fs_3d.mesh().cell_set,
+            self.solver.mesh.coordinates.dat(op2.RW, self.fs_coords.cell_node_map()),
             self.fields.z_coord_3d.dat(op2.WRITE, self.fs_3d.cell_node_map()),
+            self.fields.v_elem_size_3d.dat(op2.WRITE, self.fs_elem_height.cell_node_map()),
             self.fields.z_coord_ref_3d.dat(op2.READ, self.fs_3d.cell_node_map()),
             self.fields.elev_cg_2d.dat(op2.READ, self.fs_2d.cell_node_map()),
             self.fields.bathymetry_2d.dat(op2.READ, self.fs_2d.cell_node_map()),
             self.idx(op2.READ),
+            self.idx_elem_height(op2.READ),
             iteration_region=op2.ALL
         )
-
-        self.solver.mesh.coordinates.dat.data[:, 2] = self.fields.z_coord_3d.dat.data[:]
-        self.update_elem_height()
+        self.cp_v_elem_size_to_2d.solve()
+        # NOTE the spatial index is rebuilt lazily on next point evaluation
         self.solver.mesh.clear_spatial_index()
 
 
@@ -907,7 +864,7 @@ class SmagorinskyViscosity(object):
     """
     @PETSc.Log.EventDecorator("thetis.SmagorinskyViscosity.__init__")
     def __init__(self, uv, output, c_s, h_elem_size, max_val, min_val=1e-10,
-                 weak_form=True, solver_parameters=None):
+                 weak_form=True, solver_parameters=None, local_evaluation=False):
         """
         :arg uv_3d: horizontal velocity
         :type uv_3d: 3D vector :class:`Function`
@@ -922,8 +879,15 @@ class SmagorinskyViscosity(object):
         :kwarg float min_val: Minimum allowed viscosity. Viscosity will be clipped at
             this value.
         :kwarg bool weak_form: Compute velocity shear by integrating by parts.
-            Necessary for some function spaces (e.g. P0).
+            Necessary for some function spaces (e.g. P0). Not used in the
+            local evaluation mode.
         :kwarg dict solver_parameters: PETSc solver options
+        :kwarg bool local_evaluation: Evaluate the velocity shear cell-wise
+            and map it to the output space without solving a linear system.
+            If the output space is discontinuous, the clipped viscosity is
+            interpolated; otherwise it is projected with a lumped mass matrix.
+            Requires a velocity that is at least linear in the horizontal
+            direction.
         """
         if solver_parameters is None:
             solver_parameters = {}
@@ -934,7 +898,16 @@ class SmagorinskyViscosity(object):
         self.max_val = max_val
         self.min_val = min_val
         self.output = output
-        self.weak_form = weak_form
+        fs = output.function_space()
+
+        if local_evaluation:
+            base_element = get_extruded_base_element(uv.function_space().ufl_element())
+            if isinstance(base_element, firedrake.TensorProductElement):
+                base_element = base_element.sub_elements[0]
+            assert base_element.degree() >= 1, \
+                'local evaluation requires a velocity of degree 1 or higher'
+        self.local_evaluation = local_evaluation
+        self.weak_form = weak_form and not self.local_evaluation
 
         if self.weak_form:
             # solve grad(u) weakly
@@ -968,20 +941,40 @@ class SmagorinskyViscosity(object):
             d_t = Dx(uv[0], 0) - Dx(uv[1], 1)
             d_s = Dx(uv[0], 1) + Dx(uv[1], 0)
 
-        fs = output.function_space()
-        tri = TrialFunction(fs)
-        test = TestFunction(fs)
-
         nu = c_s**2*h_elem_size**2 * sqrt(d_t**2 + d_s**2)
 
-        a = test*tri*dx
-        l = test*nu*dx
-        self.prob = LinearVariationalProblem(a, l, output)
-        self.solver = LinearVariationalSolver(self.prob, solver_parameters=solver_parameters)
+        test = TestFunction(fs)
+        continuity = element_continuity(fs.ufl_element())
+        self.interpolate_output = self.local_evaluation and \
+            continuity.horizontal == 'dg' and continuity.vertical == 'dg'
+        if self.interpolate_output:
+            self.nu_expr = min_value(max_value(nu, self.min_val), self.max_val)
+        elif self.local_evaluation:
+            # lumped mass projection: nu_i = int(phi_i nu)/int(phi_i)
+            self.rhs_form = test*nu*dx
+            self.mass_form = test*dx
+            self.rhs = Cofunction(fs.dual())
+            self.mass_lumped = Cofunction(fs.dual())
+        else:
+            tri = TrialFunction(fs)
+            a = test*tri*dx
+            l = test*nu*dx
+            self.prob = LinearVariationalProblem(a, l, output)
+            self.solver = LinearVariationalSolver(self.prob, solver_parameters=solver_parameters)
 
     @PETSc.Log.EventDecorator("thetis.SmagorinskyViscosity.solve")
     def solve(self):
         """Compute viscosity"""
+        if self.interpolate_output:
+            self.output.interpolate(self.nu_expr)
+            return
+        if self.local_evaluation:
+            # NOTE mass must be reassembled as the mesh may have moved
+            assemble(self.rhs_form, tensor=self.rhs)
+            assemble(self.mass_form, tensor=self.mass_lumped)
+            nu = self.rhs.dat.data_ro/self.mass_lumped.dat.data_ro
+            self.output.dat.data[:] = numpy.clip(nu, self.min_val, self.max_val.dat.data_ro)
+            return
         if self.weak_form:
             self.weak_grad_solver.solve()
         self.solver.solve()